@@ -9,7 +9,9 @@ import sys
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
-from models.cohe import generate
+from models.cohe import generate, get_response_cache
+from models.budget import request_budget, get_usage
+from models.telemetry import get_telemetry, format_rows
 from core.tokenizer import tokenizer
 from core.execute import execute
 from core.test import test
@@ -28,6 +30,9 @@ from core.config import ConfigManager
 from core.ui import get_ui, get_logger
 from core.deep_think import DeepThinkMode
 
+# segundos esperando o Enriquecedor antigo terminar o grupo em andamento antes de uma nova varredura
+ENRICHMENT_STOP_WAIT = 30
+
 
 class ChromaBuddyPro:
     """Classe principal da aplicação ChromaBuddy PRO"""
@@ -42,6 +47,8 @@ class ChromaBuddyPro:
         """
         self.config = config_manager
         self.project_root = project_root
+        # descricoes da estrutura do projeto sendo geradas em segundo plano (locate.dds.Enriquecedor)
+        self.enriquecedor = None
         self.ui = get_ui(theme=self.config.get('theme', 'monokai'))
         self.logger = get_logger(verbose=True)
         
@@ -92,12 +99,28 @@ class ChromaBuddyPro:
         Returns:
             Dicionário de resultado
         """
-        try:
-            # Tratar comandos especiais
-            if user_input.startswith('/'):
-                self.session_stats['commands_run'] += 1
+        # Tratar comandos especiais
+        if user_input.startswith('/'):
+            self.session_stats['commands_run'] += 1
+            try:
                 return self._handle_command(user_input)
-            
+            except Exception as e:
+                self.logger.error(f"Command processing failed: {e}")
+                return {'status': 'error', 'error': str(e)}
+        
+        # Orçamento de tokens do pedido inteiro (todas as chamadas ao modelo)
+        with request_budget(self.config.get('request_token_budget', 0)) as usage:
+            result = self._process_request(user_input)
+        
+        if usage.calls:
+            self.logger.info(f"Tokens: {usage.prompt_tokens} prompt + {usage.completion_tokens} resposta "
+                             f"em {usage.calls} chamadas"
+                             + (f" ({usage.truncated} prompts cortados)" if usage.truncated else ""))
+        return result
+    
+    def _process_request(self, user_input: str) -> Dict[str, Any]:
+        """Processa uma solicitação em linguagem natural (tokenizar, executar, testar)"""
+        try:
             # Expandir menções @
             expanded_prompt = user_input
             mention_info = None
@@ -124,15 +147,19 @@ class ChromaBuddyPro:
                     return {'status': 'cancelled'}
             
             # Tokenizar solicitação
-            with self.ui.spinner("Analisando solicitação..."):
-                result = tokenizer(expanded_prompt, self.config.get_api_key(), self.project_root)
+            # O plano de edição aparece em streaming assim que o primeiro trecho chega
+            with self.ui.spinner("Analisando solicitação...") as spinner:
+                plan_printer = self.ui.stream_printer("Execution Plan", spinner=spinner)
+                result = tokenizer(expanded_prompt, self.config.get_api_key(), self.project_root,
+                                   on_token=plan_printer)
+            plan_printer.finish()
             
             if 'error' in result:
                 self.logger.error(result['error'])
                 return {'error': result['error']}
             
             # Exibir análise
-            self._display_analysis(result, mention_info)
+            self._display_analysis(result, mention_info, plan_shown=plan_printer.started)
             
             # Confirmar execução
             if self.config.get('diff_approval', True):
@@ -164,7 +191,7 @@ class ChromaBuddyPro:
             self.logger.error(f"Command processing failed: {e}")
             return {'status': 'error', 'error': str(e)}
     
-    def _display_analysis(self, result: Dict[str, Any], mention_info: Optional[Dict]) -> None:
+    def _display_analysis(self, result: Dict[str, Any], mention_info: Optional[Dict], plan_shown: bool = False) -> None:
         """Display analysis results"""
         self.ui.rule("Analysis Results")
         
@@ -184,8 +211,9 @@ class ChromaBuddyPro:
             mentions = mention_info.get('mentions', {}).get('raw', [])
             self.ui.print(f"[bold]Mentions:[/bold] {', '.join(mentions)}")
         
-        plan = result.get('edit_plan', 'No plan available')
-        self.ui.panel(plan, title="Execution Plan", border_style="cyan")
+        if not plan_shown:
+            plan = result.get('edit_plan', 'No plan available')
+            self.ui.panel(plan, title="Execution Plan", border_style="cyan")
     
     def _display_changes(self, changes: Dict[str, Any]) -> None:
         """Display file changes"""
@@ -265,7 +293,7 @@ class ChromaBuddyPro:
             elif cmd == 'pwd':
                 self._show_current_directory()
             elif cmd == 'scan':
-                self._force_scan_project()
+                self._force_scan_project(full=bool(args) and args[0] == 'full')
             else:
                 self.logger.error(f"Comando desconhecido: {cmd}")
                 self._show_help()
@@ -290,7 +318,7 @@ class ChromaBuddyPro:
             ("Navegação", [
                 ("/pwd", "Mostrar diretório atual"),
                 ("/cd <caminho>", "Mudar diretório de trabalho"),
-                ("/scan", "Analisar estrutura do projeto")
+                ("/scan [full]", "Analisar estrutura do projeto (full: descrever tudo de novo)")
             ]),
             ("Análise", [
                 ("/analyze <arquivo>", "Analisar qualidade de código"),
@@ -342,15 +370,26 @@ class ChromaBuddyPro:
         for label, value in stats:
             self.ui.print(f"[bold]{label}:[/bold] {value}")
         
-        # Cache stats
-        cache = get_cache()
-        cache_stats = cache.get_stats()
+        # Cache de respostas do LLM
+        cache_stats = get_response_cache().stats()
         
         self.ui.print(f"\n[bold]Cache:[/bold]")
         self.ui.print(f"  Hit Rate: {cache_stats.get('hit_rate', 0):.1f}%")
         self.ui.print(f"  Entries: {cache_stats.get('entries', 0)}")
         self.ui.print(f"  Memory: {cache_stats.get('memory_mb', 0):.1f} MB")
         
+        # Onde o tempo de LLM foi gasto (por local de origem da chamada)
+        usage = get_usage().snapshot()
+        if usage['calls']:
+            self.ui.print(f"\n[bold]LLM:[/bold] {usage['calls']} chamadas, "
+                          f"{usage['prompt_tokens']} tokens de prompt, {usage['completion_tokens']} de resposta")
+        rows = format_rows(get_telemetry().snapshot())
+        if rows:
+            self.ui.table("Chamadas ao LLM",
+                          ["Origem", "Chamadas", "p50 ms", "p95 ms", "p99 ms", "Total", "Cache", "Compart.",
+                           "Retries", "Erros"],
+                          rows)
+        
         # Memory patterns
         patterns = self.memory.get_patterns()
         if patterns:
@@ -445,10 +484,10 @@ class ChromaBuddyPro:
     
     def _cache_command(self, args: List[str]) -> None:
         """Handle cache command"""
-        cache = get_cache()
+        cache = get_response_cache()
         
         if not args or args[0] == 'stats':
-            stats = cache.get_stats()
+            stats = cache.stats()
             self.ui.print(f"[bold]Cache Statistics:[/bold]")
             self.ui.print(f"  Hit Rate: {stats.get('hit_rate', 0):.1f}%")
             self.ui.print(f"  Total Hits: {stats.get('hits', 0)}")
@@ -458,6 +497,7 @@ class ChromaBuddyPro:
         
         elif args[0] == 'clear':
             cache.clear()
+            get_cache().clear()
             self.logger.success("Cache cleared")
     
     def _toggle_deep_think(self) -> None:
@@ -558,18 +598,15 @@ class ChromaBuddyPro:
         with open(file_path, 'r', encoding='utf-8') as f:
             code = f.read()
         
-        with self.ui.spinner("Generating docstrings..."):
-            documented_code = self.doc_gen.generate_docstrings(code, self.config.get_api_key())
+        # Docstrings e API docs partem do mesmo código: as duas chamadas vão em paralelo
+        with self.ui.spinner("Generating docstrings and API documentation..."):
+            documented_code, api_docs = self.doc_gen.generate_file_docs(code)
         
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(documented_code)
         
         self.logger.success(f"Docstrings added to {filename}")
         
-        # Generate API docs
-        with self.ui.spinner("Generating API documentation..."):
-            api_docs = self.doc_gen.generate_api_docs(code, filename)
-        
         docs_path = os.path.join(self.project_root, 'docs', f'{filename}.md')
         os.makedirs(os.path.dirname(docs_path), exist_ok=True)
         
@@ -772,49 +809,49 @@ class ChromaBuddyPro:
             self.project_root = old_path
             self.logger.error(f"Falha ao mudar diretório: {e}")
     
-    def _analyze_project_structure(self, project_path: str) -> None:
+    def _analyze_project_structure(self, project_path: str, incremental: bool = True) -> None:
         """Analisa a estrutura do projeto usando dds.py"""
-        estrutura_path = os.path.join(project_path, "estrutura_projeto.json")
-        
-        # Verificar se já existe e está recente (menos de 1 hora)
-        if os.path.exists(estrutura_path):
-            import time
-            file_age = time.time() - os.path.getmtime(estrutura_path)
-            if file_age < 3600:  # 1 hora
-                self.logger.info("Estrutura do projeto já existe e está atualizada")
-                return
-        
-        # Executar análise
+        # o indice do AST e gravado na hora; as descricoes chegam em segundo plano
+        # (incremental: so arquivos novos ou alterados desde a ultima vez vao ao modelo)
         try:
-            with self.ui.spinner("Analisando estrutura do projeto..."):
-                from locate.dds import cltdds
-                
-                resultado = cltdds(project_path, self.config.get_api_key())
-                
-                # Salvar resultado
-                with open(estrutura_path, 'w', encoding='utf-8') as f:
-                    import json
-                    json.dump(resultado, f, indent=2, ensure_ascii=False)
-            
-            self.logger.success(f"Estrutura analisada: {len(resultado['estrutura'])} arquivos")
+            # o Enriquecedor da varredura anterior nao pode gravar por cima da nova
+            self.stop_enrichment(replace=True, wait=ENRICHMENT_STOP_WAIT)
+            from locate.dds import cltdds_em_segundo_plano
+            
+            resultado, self.enriquecedor = cltdds_em_segundo_plano(
+                project_path, self.config.get_api_key(), incremental=incremental)
+            
+            varredura = resultado.get('varredura', {})
+            self.logger.success(f"Estrutura indexada: {len(resultado['estrutura'])} arquivos "
+                                f"({varredura.get('reaproveitados', 0)} sem mudanças)")
+            if self.enriquecedor.total:
+                self.ui.print(f"  Descrevendo {self.enriquecedor.total} arquivos em segundo plano (veja /pwd)")
             self.ui.print(f"  Salvo em: estrutura_projeto.json")
             
         except Exception as e:
             self.logger.warning(f"Falha ao analisar estrutura: {e}")
             self.ui.print("  Você pode executar manualmente: python locate/dds.py")
     
-    def _force_scan_project(self) -> None:
-        """Força análise completa da estrutura do projeto"""
-        estrutura_path = os.path.join(self.project_root, "estrutura_projeto.json")
-        
-        # Remover arquivo antigo se existir
-        if os.path.exists(estrutura_path):
-            os.remove(estrutura_path)
-            self.logger.info("Arquivo de estrutura anterior removido")
+    def stop_enrichment(self, replace: bool = False, wait: float = 0) -> None:
+        """
+        Para a geração de descrições em segundo plano (o que já foi descrito fica salvo).
+        replace=True: uma varredura nova vai começar, então o Enriquecedor antigo não grava
+        mais nada; wait espera até tantos segundos a thread terminar o grupo em andamento.
+        """
+        if self.enriquecedor is not None:
+            self.enriquecedor.parar(descartar=replace)
+            if wait:
+                self.enriquecedor.join(wait)
+            self.enriquecedor = None
+    
+    def _force_scan_project(self, full: bool = False) -> None:
+        """Analisa de novo a estrutura do projeto (full=True descreve todos os arquivos de novo)"""
+        if full:
+            self.logger.info("Descrevendo todos os arquivos de novo")
         
         # Executar análise
         self.ui.print(f"\n[bold]Analisando projeto:[/bold] {self.project_root}")
-        self._analyze_project_structure(self.project_root)
+        self._analyze_project_structure(self.project_root, incremental=not full)
     
     def _show_current_directory(self) -> None:
         """Mostrar diretório de trabalho atual"""
@@ -824,23 +861,23 @@ class ChromaBuddyPro:
         
         self.ui.print(f"\n[bold]Caminho:[/bold] {self.project_root}")
         
-        # Verificar se existe estrutura_projeto.json
-        estrutura_path = os.path.join(self.project_root, "estrutura_projeto.json")
-        if os.path.exists(estrutura_path):
+        # Verificar se existe o indice do projeto (estrutura_projeto.db): contagem sem carregar a estrutura
+        from locate.indice import abrir_indice
+        indice = abrir_indice(self.project_root)
+        if indice is not None:
             import time
-            import json
-            
-            file_age = time.time() - os.path.getmtime(estrutura_path)
-            age_minutes = int(file_age / 60)
             
             try:
-                with open(estrutura_path, 'r', encoding='utf-8') as f:
-                    estrutura = json.load(f)
+                file_age = time.time() - (indice.atualizado() or os.path.getmtime(indice.banco))
+                age_minutes = int(file_age / 60)
                 
                 self.ui.print(f"[bold]Estrutura analisada:[/bold] Sim (há {age_minutes} min)")
-                self.ui.print(f"[bold]Arquivos catalogados:[/bold] {len(estrutura.get('estrutura', []))}")
+                self.ui.print(f"[bold]Arquivos catalogados:[/bold] {indice.contar()}")
             except:
                 pass
+            if self.enriquecedor is not None and self.enriquecedor.is_alive():
+                self.ui.print(f"[bold]Descrições:[/bold] {self.enriquecedor.feitos}/{self.enriquecedor.total} "
+                              f"arquivos (em segundo plano)")
         else:
             self.ui.print(f"[bold]Estrutura analisada:[/bold] Não (use /scan)")
         
@@ -64,8 +64,11 @@ class SmartCache:
         for f in self.cache_dir.glob("*.json"):
             f.unlink()
 
-# singleton global
-_cache = SmartCache()
+# singleton global (criado no primeiro uso para não criar a pasta de cache ao importar)
+_cache = None
 
 def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = SmartCache()
     return _cache
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Análise de arquivos grandes em partes (map-reduce).
+
+O código é dividido em fronteiras do AST (classes e funções de topo; classes
+grandes por método), as partes são analisadas em paralelo e as análises são
+juntadas em um relatório único. O prompt de cada parte só contém o código
+dela, então uma parte que não mudou gera o mesmo prompt e volta do cache de
+respostas: reanalisar depois de uma edição pequena só chama o modelo para as
+partes alteradas (e para o relatório final).
+"""
+
+import os
+import sys
+import ast
+import hashlib
+from typing import Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.cohe import generate_many, generate_stream, is_error, prompt_room
+from models.budget import Section, count_tokens, fit_sections
+
+# tokens de codigo por parte; arquivos ate esse tamanho sao analisados numa chamada so
+PARTE_TOKENS = 1500
+# em media uma fronteira a cada N unidades (funcoes/classes), alem das impostas pelo tamanho,
+# e so depois de a parte ter ao menos PARTE_MINIMA tokens (evita chamadas para trechos minusculos)
+FRONTEIRA_MEDIA = 4
+PARTE_MINIMA = 400
+
+PARTE_SYSTEM = ("Você é um especialista em análise de código. Analise este trecho de um arquivo maior: "
+                "qualidade, possíveis problemas e melhorias, em tópicos curtos.")
+RELATORIO_SYSTEM = ("Você é um especialista em análise de código. Junte as análises das partes de um arquivo "
+                    "em um relatório único: visão geral, principais problemas (indicando a parte) e melhorias "
+                    "prioritárias, sem repetições.")
+
+
+def dividir_codigo(codigo: str, max_tokens: int = PARTE_TOKENS) -> List[Dict]:
+    """
+    Divide o código em partes de até `max_tokens` tokens, sem cortar funções
+    ou classes quando possível. Cada parte é um dict com nome, inicio, fim
+    (linhas, a partir de 1) e codigo. Código que não é Python válido é
+    dividido por linhas.
+    """
+    linhas = codigo.splitlines(keepends=True)
+    if not linhas:
+        return []
+    try:
+        arvore = ast.parse(codigo)
+        unidades = list(_unidades(arvore.body, linhas, 1, len(linhas), "", max_tokens))
+    except SyntaxError:
+        unidades = list(_por_linhas(linhas, 1, len(linhas), "linhas", max_tokens))
+    return _agrupar(unidades, linhas, max_tokens)
+
+
+def _inicio(no) -> int:
+    # decorators fazem parte da funcao/classe
+    return min([no.lineno] + [d.lineno for d in getattr(no, "decorator_list", [])])
+
+
+def _nome(no) -> str:
+    if isinstance(no, ast.ClassDef):
+        return f"classe {no.name}"
+    if isinstance(no, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return no.name
+    if isinstance(no, (ast.Import, ast.ImportFrom)):
+        return "imports"
+    return "código de módulo"
+
+
+def _unidades(nos, linhas, inicio, fim, prefixo, max_tokens):
+    # (nome, inicio, fim) cobrindo as linhas inicio..fim; comentarios e linhas em branco
+    # antes de um no vao junto com ele, o resto depois do ultimo no fica com o ultimo
+    for i, no in enumerate(nos):
+        comeco = inicio if i == 0 else nos[i - 1].end_lineno + 1
+        final = fim if i == len(nos) - 1 else no.end_lineno
+        nome = prefixo + _nome(no)
+        if count_tokens("".join(linhas[comeco - 1:final])) <= max_tokens:
+            yield nome, comeco, final
+        elif isinstance(no, ast.ClassDef) and len(no.body) > 1:
+            # classe grande: cabecalho e cada metodo viram unidades proprias
+            corpo = _inicio(no.body[0])
+            if corpo > comeco:
+                yield nome, comeco, corpo - 1
+            yield from _unidades(no.body, linhas, corpo, final, f"{no.name}.", max_tokens)
+        else:
+            yield from _por_linhas(linhas, comeco, final, nome, max_tokens)
+
+
+def _por_linhas(linhas, inicio, fim, nome, max_tokens):
+    # ultimo recurso (funcao enorme ou arquivo que nao e Python): blocos de linhas que cabem
+    comeco, tokens = inicio, 0
+    for numero in range(inicio, fim + 1):
+        custo = count_tokens(linhas[numero - 1])
+        if tokens and tokens + custo > max_tokens:
+            yield nome, comeco, numero - 1
+            comeco, tokens = numero, 0
+        tokens += custo
+    if comeco <= fim:
+        yield nome, comeco, fim
+
+
+def _agrupar(unidades, linhas, max_tokens) -> List[Dict]:
+    # junta unidades vizinhas pequenas; a fronteira depende do conteudo da unidade (hash) e nao
+    # da posicao, para uma edicao mudar so a parte onde ocorreu e nao deslocar as seguintes
+    partes, atual, tokens = [], [], 0
+    for nome, inicio, fim in unidades:
+        texto = "".join(linhas[inicio - 1:fim])
+        custo = count_tokens(texto)
+        if atual and tokens + custo > max_tokens:
+            partes.append(_parte(atual, linhas))
+            atual, tokens = [], 0
+        atual.append((nome, inicio, fim))
+        tokens += custo
+        if (tokens >= min(PARTE_MINIMA, max_tokens)
+                and int(hashlib.md5(texto.encode("utf-8")).hexdigest(), 16) % FRONTEIRA_MEDIA == 0):
+            partes.append(_parte(atual, linhas))
+            atual, tokens = [], 0
+    if atual:
+        partes.append(_parte(atual, linhas))
+    return partes
+
+
+def _parte(unidades, linhas) -> Dict:
+    nomes = list(dict.fromkeys(nome for nome, _, _ in unidades))
+    nome = ", ".join(nomes[:3]) + (f" (+{len(nomes) - 3})" if len(nomes) > 3 else "")
+    inicio, fim = unidades[0][1], unidades[-1][2]
+    return {"nome": nome, "inicio": inicio, "fim": fim, "codigo": "".join(linhas[inicio - 1:fim])}
+
+
+def _parte_prompt(parte: Dict, arquivo: str) -> Dict:
+    # sem numeros de linha: uma edicao acima nao muda o prompt (nem a chave do cache) desta parte
+    return {"system_prompt": PARTE_SYSTEM,
+            "user_prompt": f"Trecho ({parte['nome']}) de {arquivo}:\n\n```\n{parte['codigo']}\n```"}
+
+
+def analisar_partes(api_key: str, partes: List[Dict], arquivo: str,
+                    concurrency: Optional[int] = None) -> List[Optional[str]]:
+    """Análise de cada parte, em paralelo e na mesma ordem (None quando a chamada falhou)."""
+    respostas = generate_many(api_key, [_parte_prompt(p, arquivo) for p in partes], concurrency=concurrency)
+    return [None if is_error(r) else r.strip() for r in respostas]
+
+
+def relatorio(api_key: str, partes: List[Dict], analises: List[Optional[str]], arquivo: str) -> Iterator[str]:
+    """Junta as análises das partes em um relatório, em streaming (como generate_stream)."""
+    template = f"Análises das partes de {arquivo}:\n\n\n\nRelatório:"
+    # cada parte ganha um pedaco do espaco livre; as do inicio do arquivo sao cortadas por ultimo
+    secoes = []
+    for i, (parte, analise) in enumerate(zip(partes, analises)):
+        texto = analise if analise is not None else "(análise indisponível)"
+        secoes.append(Section(str(i), f"### {parte['nome']} (linhas {parte['inicio']}-{parte['fim']})\n{texto}\n",
+                              min_tokens=60))
+    corpo = "\n".join(fit_sections(secoes, prompt_room(RELATORIO_SYSTEM, template)).values())
+    return generate_stream(api_key, RELATORIO_SYSTEM,
+                           f"Análises das partes de {arquivo}:\n\n{corpo}\n\nRelatório:")
+
+
+def cabe_inteiro(codigo: str, room: Optional[int] = None) -> bool:
+    """
+    True quando o arquivo é pequeno o bastante para uma análise numa chamada
+    só: até PARTE_TOKENS e dentro de `room` (espaço livre no prompt, de
+    prompt_room; None = sem limite).
+    """
+    tokens = count_tokens(codigo)
+    return tokens <= PARTE_TOKENS and (room is None or tokens <= room)
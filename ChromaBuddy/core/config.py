@@ -39,13 +39,41 @@ class ConfigManager:
                         return {
                             'api_key': config_data[0].get('api_key', ''),
                             'user_name': 'User',
+                            'backend': 'cohere',
+                            'base_url': '',
                             'model': 'command-r-plus',
+                            'fast_model': '',
+                            'routes': {
+                                'summarize': 'fast',
+                                'rank': 'fast',
+                                'describe': 'fast',
+                                'plan': 'default',
+                                'rewrite': 'default',
+                                'fix': 'default',
+                                'celebrate': 'none'
+                            },
                             'max_tokens': 4000,
                             'temperature': 0.7,
+                            'timeout': 60,
+                            'concurrency': 4,
+                            'max_retries': 3,
+                            'requests_per_minute': 0,
+                            'hedge': False,
+                            'hedge_after': 0,
+                            'max_prompt_tokens': 8000,
+                            'request_token_budget': 0,
+                            'trace_file': '',
                             'deep_think_enabled': False,
                             'deep_think_iterations': 3,
                             'cache_enabled': True,
                             'cache_ttl': 3600,
+                            'response_cache_ttl': 604800,
+                            'response_cache_max_entries': 5000,
+                            'coalesce': True,
+                            'symbol_cache': True,
+                            'symbol_cache_max_entries': 100000,
+                            'scan_call_budget': 0,
+                            'scan_max_file_kb': 256,
                             'auto_test': True,
                             'auto_fix_attempts': 3,
                             'diff_approval': True,
@@ -64,13 +92,41 @@ class ConfigManager:
         default_config = {
             'api_key': '',
             'user_name': 'User',
+            'backend': 'cohere',
+            'base_url': '',
             'model': 'command-r-plus',
+            'fast_model': '',
+            'routes': {
+                'summarize': 'fast',
+                'rank': 'fast',
+                'describe': 'fast',
+                'plan': 'default',
+                'rewrite': 'default',
+                'fix': 'default',
+                'celebrate': 'none'
+            },
             'max_tokens': 4000,
             'temperature': 0.7,
+            'timeout': 60,
+            'concurrency': 4,
+            'max_retries': 3,
+            'requests_per_minute': 0,
+            'hedge': False,
+            'hedge_after': 0,
+            'max_prompt_tokens': 8000,
+            'request_token_budget': 0,
+            'trace_file': '',
             'deep_think_enabled': False,
             'deep_think_iterations': 3,
             'cache_enabled': True,
             'cache_ttl': 3600,
+            'response_cache_ttl': 604800,
+            'response_cache_max_entries': 5000,
+            'coalesce': True,
+            'symbol_cache': True,
+            'symbol_cache_max_entries': 100000,
+            'scan_call_budget': 0,
+            'scan_max_file_kb': 256,
             'auto_test': True,
             'auto_fix_attempts': 3,
             'diff_approval': True,
@@ -121,8 +177,11 @@ class ConfigManager:
         self.save_config()
     
     def get_api_key(self) -> str:
-        """Get Cohere API key"""
+        """Get API key for the configured backend"""
         api_key = self.config.get('api_key', '')
+        if not api_key and self.config.get('backend') == 'local':
+            # the local stand-in server does not check keys
+            return 'local'
         if not api_key:
             raise ValueError("API key not configured. Use /config to set it.")
         return api_key
@@ -145,7 +204,7 @@ class ConfigManager:
     
     def is_configured(self) -> bool:
         """Check if essential configuration is present"""
-        return bool(self.config.get('api_key'))
+        return bool(self.config.get('api_key')) or self.config.get('backend') == 'local'
     
     def display_config(self) -> str:
         """Return formatted configuration for display"""
@@ -159,9 +218,21 @@ class ConfigManager:
         
         lines.append(f"API Key: {masked_key}")
         lines.append(f"User Name: {self.config.get('user_name', 'Not set')}")
+        backend = self.config.get('backend', 'cohere')
+        if self.config.get('base_url'):
+            backend += f" ({self.config.get('base_url')})"
+        lines.append(f"Backend: {backend}")
         lines.append(f"Model: {self.config.get('model', 'Not set')}")
+        lines.append(f"Fast Model: {self.config.get('fast_model') or 'backend default'}")
+        routes = self.config.get('routes') or {}
+        if routes:
+            lines.append("Routes: " + ", ".join(f"{step}={target}" for step, target in routes.items()))
         lines.append(f"Max Tokens: {self.config.get('max_tokens', 'Not set')}")
         lines.append(f"Temperature: {self.config.get('temperature', 'Not set')}")
+        lines.append(f"Timeout: {self.config.get('timeout', 60)}s")
+        budget = self.config.get('request_token_budget', 0)
+        lines.append(f"Token Budget: {self.config.get('max_prompt_tokens', 8000)}/call, "
+                     f"{budget or 'unlimited'}/request")
         lines.append(f"Deep Think: {'Enabled' if self.config.get('deep_think_enabled') else 'Disabled'}")
         lines.append(f"Cache: {'Enabled' if self.config.get('cache_enabled') else 'Disabled'}")
         lines.append(f"Auto Test: {'Enabled' if self.config.get('auto_test') else 'Disabled'}")
@@ -5,7 +5,7 @@ Multi-iteration analysis before code execution
 """
 
 from typing import Dict, List, Any, Optional
-from models.cohe import generate
+from models.cohe import generate, generate_many, is_error, unwrap
 from core.ui import get_ui, get_logger
 import json
 
@@ -16,6 +16,13 @@ class DeepThinkMode:
     before executing code changes
     """
     
+    # Review angle for each validation iteration (3+)
+    VALIDATION_FOCUS = [
+        "correctness and missed edge cases",
+        "error handling and security",
+        "performance and maintainability",
+    ]
+    
     def __init__(self, api_key: str, iterations: int = 3):
         """
         Initialize Deep Think Mode
@@ -45,7 +52,8 @@ class DeepThinkMode:
         
         thoughts = []
         
-        for i in range(self.iterations):
+        # Iterations 1 and 2 build on each other, so they run in sequence
+        for i in range(min(self.iterations, 2)):
             with self.ui.spinner(f"Iteration {i+1}/{self.iterations}: Analyzing..."):
                 thought = self._think_iteration(
                     user_request,
@@ -55,6 +63,11 @@ class DeepThinkMode:
                 )
                 thoughts.append(thought)
         
+        # Validation passes (3+) review the same plan independently: run them concurrently
+        if self.iterations > 2:
+            with self.ui.spinner(f"Iterations 3-{self.iterations}/{self.iterations}: Validating..."):
+                thoughts.extend(self._validation_iterations(user_request, context, thoughts))
+        
         # Final synthesis
         with self.ui.spinner("Synthesizing analysis..."):
             final_plan = self._synthesize(user_request, context, thoughts)
@@ -92,7 +105,7 @@ class DeepThinkMode:
         try:
             # Corrigido: generate(api_key, system_prompt, user_prompt)
             system_prompt = "Você é um assistente de análise de código especialista que realiza análises profundas e detalhadas."
-            response = generate(self.api_key, system_prompt, prompt)
+            response = unwrap(generate(self.api_key, system_prompt, prompt))
             
             return {
                 'iteration': iteration,
@@ -108,6 +121,46 @@ class DeepThinkMode:
                 'timestamp': self._get_timestamp()
             }
     
+    def _validation_iterations(
+        self,
+        user_request: str,
+        context: Dict[str, Any],
+        base_thoughts: List[Dict]
+    ) -> List[Dict[str, Any]]:
+        """
+        Run validation iterations (3+) concurrently
+        
+        Args:
+            user_request: User's request
+            context: Context information
+            base_thoughts: Results from iterations 1 and 2
+            
+        Returns:
+            Thought results, in iteration order
+        """
+        iterations = list(range(3, self.iterations + 1))
+        system_prompt = "Você é um assistente de análise de código especialista que realiza análises profundas e detalhadas."
+        prompts = [
+            (system_prompt, self._build_iteration_prompt(user_request, context, base_thoughts, iteration))
+            for iteration in iterations
+        ]
+        
+        try:
+            responses = generate_many(self.api_key, prompts)
+        except Exception as e:
+            self.logger.error(f"Validation iterations failed: {e}")
+            return [
+                {'iteration': i, 'analysis': '', 'error': str(e), 'timestamp': self._get_timestamp()}
+                for i in iterations
+            ]
+        
+        return [
+            {'iteration': i, 'analysis': '', 'error': str(response), 'timestamp': self._get_timestamp()}
+            if is_error(response) else
+            {'iteration': i, 'analysis': response, 'timestamp': self._get_timestamp()}
+            for i, response in zip(iterations, responses)
+        ]
+    
     def _build_iteration_prompt(
         self,
         user_request: str,
@@ -158,7 +211,8 @@ Task: Provide:
 Be concrete and actionable."""
         
         else:
-            # Third+ iteration: refine and validate
+            # Third+ iteration: refine and validate (each pass with its own focus)
+            focus = self.VALIDATION_FOCUS[(iteration - 3) % len(self.VALIDATION_FOCUS)]
             prev_analyses = '\n\n'.join([
                 f"Iteration {t['iteration']}:\n{t['analysis']}"
                 for t in previous_thoughts
@@ -181,6 +235,8 @@ Task: Perform final validation:
 4. Provide final recommendations
 5. Rate confidence level (1-10)
 
+Focus especially on: {focus}.
+
 Be critical and thorough."""
     
     def _synthesize(
@@ -233,7 +289,7 @@ Be precise and ready for execution."""
         try:
             # Corrigido: generate(api_key, system_prompt, user_prompt)
             system_prompt = "Você é um especialista em sintetizar análises técnicas em planos de execução estruturados."
-            response = generate(self.api_key, system_prompt, synthesis_prompt)
+            response = unwrap(generate(self.api_key, system_prompt, synthesis_prompt))
             
             # Try to parse as JSON
             try:
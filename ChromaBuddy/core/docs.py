@@ -2,31 +2,53 @@
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.cohe import generate
+from models.cohe import generate, generate_many, is_error, unwrap
 
 class DocumentationGenerator:
     def __init__(self, api_key):
         self.api_key = api_key
     
-    def generate_docstrings(self, code):
-        # gerar docstrings para funções/classes
+    def _docstrings_prompt(self, code):
+        # o codigo volta inteiro: acima do limite de tokens a chamada e recusada, nunca cortada
         sys_prompt = """Você é um especialista em documentação Python. 
 Gere docstrings estilo Google para todas funções e classes.
 Retorne APENAS o código com docstrings adicionadas."""
         
         user_prompt = f"Adicione docstrings completas:\n\n```python\n{code}\n```"
-        
+        return {"system_prompt": sys_prompt, "user_prompt": user_prompt, "truncate": False, "step": "rewrite"}
+    
+    def _api_docs_prompt(self, code):
+        sys_prompt = "Gere documentação de API em Markdown para este código Python."
+        user_prompt = f"```python\n{code}\n```"
+        return sys_prompt, user_prompt
+    
+    def _extract_code(self, response):
+        if '```python' in response:
+            return response.split('```python')[1].split('```')[0].strip()
+        elif '```' in response:
+            return response.split('```')[1].strip()
+        return response.strip()
+    
+    def generate_docstrings(self, code):
+        # gerar docstrings para funções/classes
         try:
-            response = generate(self.api_key, sys_prompt, user_prompt)
-            
-            if '```python' in response:
-                return response.split('```python')[1].split('```')[0].strip()
-            elif '```' in response:
-                return response.split('```')[1].strip()
-            return response.strip()
+            response = unwrap(generate(self.api_key, **self._docstrings_prompt(code)))
+            return self._extract_code(response)
         except:
             return code
     
+    def generate_file_docs(self, code):
+        # docstrings e documentação de API do mesmo código, pedidas em paralelo
+        try:
+            documented, api_docs = generate_many(
+                self.api_key, [self._docstrings_prompt(code), self._api_docs_prompt(code)]
+            )
+            documented = code if is_error(documented) else self._extract_code(documented)
+            api_docs = "# API Documentation\n\nEm breve." if is_error(api_docs) else api_docs.strip()
+            return documented, api_docs
+        except:
+            return code, "# API Documentation\n\nEm breve."
+    
     def generate_readme(self, project_root):
         # gerar README.md automático
         sys_prompt = "Você é um especialista em documentação de projetos. Crie um README.md profissional."
@@ -55,7 +77,7 @@ Inclua:
 Retorne em formato Markdown."""
         
         try:
-            return generate(self.api_key, sys_prompt, user_prompt).strip()
+            return unwrap(generate(self.api_key, sys_prompt, user_prompt)).strip()
         except:
             return "# Projeto\n\nDocumentação em breve."
     
@@ -65,7 +87,7 @@ Retorne em formato Markdown."""
         user_prompt = f"```python\n{code}\n```"
         
         try:
-            response = generate(self.api_key, sys_prompt, user_prompt)
+            response = unwrap(generate(self.api_key, sys_prompt, user_prompt, truncate=False, step="rewrite"))
             
             if '```python' in response:
                 return response.split('```python')[1].split('```')[0].strip()
@@ -77,11 +99,8 @@ Retorne em formato Markdown."""
     
     def generate_api_docs(self, code):
         # gerar documentação de API
-        sys_prompt = "Gere documentação de API em Markdown para este código Python."
-        user_prompt = f"```python\n{code}\n```"
-        
         try:
-            return generate(self.api_key, sys_prompt, user_prompt).strip()
+            return unwrap(generate(self.api_key, *self._api_docs_prompt(code))).strip()
         except:
             return "# API Documentation\n\nEm breve."
     
@@ -97,6 +116,6 @@ Retorne em formato Markdown."""
         user_prompt = f"```python\n{code}\n```"
         
         try:
-            return generate(self.api_key, sys_prompt, user_prompt).strip()
+            return unwrap(generate(self.api_key, sys_prompt, user_prompt)).strip()
         except:
             return "Erro ao gerar explicação."
@@ -2,10 +2,9 @@ import os
 import sys
 import ast
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.cohe import generate
+from models.cohe import generate, unwrap, get_response_cache
 from core.diff import DiffManager
 from core.analyzer import CodeAnalyzer
-from core.cache import get_cache
 
 programing_template = """Você é um editor de código Python especialista.
 
@@ -38,7 +37,6 @@ def execute(tokenizer_result, api_key, project_root):
     
     changes = []
     diff_mgr = DiffManager()
-    cache = get_cache()
     analyzer = CodeAnalyzer()
     
     # processar cada arquivo alvo
@@ -67,22 +65,15 @@ def execute(tokenizer_result, api_key, project_root):
         if suggestions:
             analysis_summary += f"Sugestões: {', '.join(suggestions[:3])}"
         
-        # tentar usar cache
-        cache_key = f"rewrite:{file_path}:{tokenizer_result['intention']}"
-        modified_code = cache.get(cache_key, max_age=600)
-        
-        if not modified_code:
-            # gerar código modificado (arquivo completo)
-            modified_code = _rewrite_file(
-                file_path, current_code, 
-                tokenizer_result['intention'], 
-                tokenizer_result['edit_plan'],
-                analysis_summary,
-                api_key
-            )
-            
-            if modified_code:
-                cache.set(cache_key, modified_code, ttl=600)
+        # gerar código modificado (arquivo completo); o cache de respostas do generate
+        # usa o conteúdo atual do arquivo na chave, então nunca devolve uma reescrita velha
+        modified_code = _rewrite_file(
+            file_path, current_code, 
+            tokenizer_result['intention'], 
+            tokenizer_result['edit_plan'],
+            analysis_summary,
+            api_key
+        )
         
         if modified_code and modified_code != current_code:
             # gerar diff
@@ -113,7 +104,7 @@ def execute(tokenizer_result, api_key, project_root):
         'total': len(changes),
         'modified': modified,
         'changes': changes,
-        'cache_stats': cache.stats()
+        'cache_stats': get_response_cache().stats()
     }
 
 def _find_file(project_root, target):
@@ -137,7 +128,9 @@ def _rewrite_file(filepath, current_code, intention, plan, analysis, api_key):
     sys_prompt = "Você é um programador Python expert. Reescreva arquivos com precisão mantendo toda estrutura e lógica necessária."
     
     try:
-        response = generate(api_key, sys_prompt, prompt).strip()
+        # unwrap: um erro do modelo nunca vira conteudo do arquivo
+        # truncate=False: arquivo acima do limite de tokens e recusado, nunca reescrito pela metade
+        response = unwrap(generate(api_key, sys_prompt, prompt, truncate=False, step="rewrite")).strip()
         
         # extrair código da resposta (remover markdown se presente)
         if '```python' in response:
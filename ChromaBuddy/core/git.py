@@ -3,6 +3,10 @@ import os
 import subprocess
 from datetime import datetime
 
+# orcamento em tokens dos diffs enviados ao gerar mensagens de commit e descricoes de PR
+COMMIT_DIFF_TOKENS = 600
+PR_DIFF_TOKENS = 1500
+
 class GitIntegration:
     def __init__(self, project_root):
         self.project_root = project_root
@@ -62,19 +66,22 @@ class GitIntegration:
     
     def auto_commit(self, api_key, files_changed):
         # gerar mensagem de commit automática
-        from models.cohe import generate
+        from models.cohe import generate, unwrap
+        from models.budget import Section, fit_sections
         
-        changes = []
+        # cada diff ganha uma parte do orcamento; os primeiros arquivos sao cortados por ultimo
+        secoes = []
         for f in files_changed:
             diff = self.diff(f)
             if diff:
-                changes.append(f"{f}:\n{diff[:200]}")
+                secoes.append(Section(f, f"{f}:\n{diff}", min_tokens=50))
+        changes = fit_sections(secoes[:5], COMMIT_DIFF_TOKENS).values()
         
         sys_prompt = "Gere uma mensagem de commit git concisa e descritiva (máx 72 chars)."
-        user_prompt = f"Mudanças:\n{chr(10).join(changes[:5])}"
+        user_prompt = f"Mudanças:\n{chr(10).join(changes)}"
         
         try:
-            message = generate(api_key, sys_prompt, user_prompt).strip()
+            message = unwrap(generate(api_key, sys_prompt, user_prompt, step="summarize")).strip()
             # limpar
             message = message.replace('"', '').replace("'", "")[:72]
         except:
@@ -102,7 +109,8 @@ class GitIntegration:
     
     def generate_pr_description(self, api_key):
         # gerar descrição de PR
-        from models.cohe import generate
+        from models.cohe import generate, unwrap
+        from models.budget import truncate_tokens
         
         diff = self.diff()
         log = self.log(5)
@@ -112,7 +120,7 @@ class GitIntegration:
 {chr(10).join(log)}
 
 Diff (resumo):
-{diff[:1000] if diff else 'Sem mudanças'}
+{truncate_tokens(diff, PR_DIFF_TOKENS) if diff else 'Sem mudanças'}
 
 Gere descrição com:
 - Resumo das mudanças
@@ -120,6 +128,6 @@ Gere descrição com:
 - Como testar"""
         
         try:
-            return generate(api_key, sys_prompt, user_prompt).strip()
+            return unwrap(generate(api_key, sys_prompt, user_prompt, step="summarize")).strip()
         except:
             return "Pull Request: Update code"
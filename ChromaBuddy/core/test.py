@@ -4,9 +4,15 @@ import os
 import sys
 import subprocess
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.cohe import generate
+from models.cohe import generate, unwrap
+from models.budget import truncate_tokens
 from core.execute import execute
 
+# tokens do erro enviados ao pedir a correcao (o final do traceback e o que importa)
+ERROR_TOKENS = 400
+# prazo (s) da mensagem de sucesso: depois disso (ou sem modelo no passo "celebrate") vale a mensagem padrao
+SUCCESS_MESSAGE_DEADLINE = 3
+
 def test(execute_result, tokenizer_result, api_key, project_root, max_attempts=3):
     # validar entrada
     if execute_result.get('modified', 0) == 0:
@@ -109,14 +115,16 @@ def _auto_fix(file_path, error, intention, api_key):
 ```
 
 ERRO:
-{error[:500]}
+{truncate_tokens(error, ERROR_TOKENS, keep_end=True)}
 
 INTENÇÃO ORIGINAL: {intention}
 
 Retorne o código completo corrigido em ```python ... ```"""
     
     try:
-        response = generate(api_key, sys_prompt, user_prompt).strip()
+        # o codigo volta inteiro: acima do limite de tokens a chamada e recusada, nunca cortada;
+        # sem cache: uma correcao que ja falhou nao deve voltar igual
+        response = unwrap(generate(api_key, sys_prompt, user_prompt, truncate=False, cache=False, step="fix")).strip()
         
         # extrair código corrigido
         if '```python' in response:
@@ -149,6 +157,7 @@ def _generate_success_message(filename, api_key):
     user_prompt = f"Arquivo '{filename}' foi modificado e testado com sucesso!"
     
     try:
-        return generate(api_key, sys_prompt, user_prompt).strip()
+        return unwrap(generate(api_key, sys_prompt, user_prompt, deadline=SUCCESS_MESSAGE_DEADLINE,
+                               step="celebrate")).strip()
     except:
         return f"✓ {filename} modificado e testado com sucesso!"
\ No newline at end of file
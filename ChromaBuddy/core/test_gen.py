@@ -2,7 +2,11 @@
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.cohe import generate
+from models.cohe import generate, unwrap
+from models.budget import truncate_tokens
+
+# tokens de codigo enviados para sugerir cenarios de teste
+SCENARIO_CODE_TOKENS = 300
 
 class TestGenerator:
     def __init__(self, api_key):
@@ -27,7 +31,7 @@ REGRAS:
 Retorne apenas o código dos testes em ```python ... ```"""
         
         try:
-            response = generate(self.api_key, sys_prompt, user_prompt)
+            response = unwrap(generate(self.api_key, sys_prompt, user_prompt))
             
             # extrair codigo
             if '```python' in response:
@@ -51,7 +55,7 @@ Retorne apenas o código dos testes em ```python ... ```"""
 Gere testes de integração em ```python ... ```"""
         
         try:
-            response = generate(self.api_key, sys_prompt, user_prompt)
+            response = unwrap(generate(self.api_key, sys_prompt, user_prompt))
             
             if '```python' in response:
                 return response.split('```python')[1].split('```')[0].strip()
@@ -64,10 +68,10 @@ Gere testes de integração em ```python ... ```"""
     
     def suggest_test_scenarios(self, code):
         sys_prompt = "Liste cenários de teste importantes (5-10 cenários curtos)"
-        user_prompt = f"Código:\n```python\n{code[:1000]}\n```"
+        user_prompt = f"Código:\n```python\n{truncate_tokens(code, SCENARIO_CODE_TOKENS)}\n```"
         
         try:
-            scenarios = generate(self.api_key, sys_prompt, user_prompt)
+            scenarios = unwrap(generate(self.api_key, sys_prompt, user_prompt))
             return scenarios.strip().split('\n')
         except:
             return []
@@ -77,6 +81,6 @@ Gere testes de integração em ```python ... ```"""
         user_prompt = function_signature
         
         try:
-            return generate(self.api_key, sys_prompt, user_prompt).strip()
+            return unwrap(generate(self.api_key, sys_prompt, user_prompt)).strip()
         except:
             return "{}"
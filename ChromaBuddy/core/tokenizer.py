@@ -5,9 +5,10 @@ import json
 __path__ = [os.path.dirname(os.path.abspath(__file__)), ".."]
 sys.path.extend(__path__)
 
-from models.cohe import generate
-from core.cache import get_cache
+from models.cohe import generate, generate_stream, is_error, skipped, timed_out, prompt_room, get_response_cache
+from models.budget import Section, fit_sections, truncate_tokens
 from core.context import ContextManager
+from locate.indice import abrir_indice, indice_de_estrutura
 
 prompt_template = """Você é um assistente de programação preciso.
 
@@ -29,50 +30,67 @@ Instruções:
 
 Resposta:"""
 
-def tokenizer(text, api_key, project_root=None):
-    cache = get_cache()
-    
-    # 1. resumir intenção (com cache)
-    cache_key = f"intention:{text}"
-    intention = cache.get(cache_key, max_age=3600)
-    
-    if not intention:
-        sys_prompt = "Resuma em 1 frase clara e técnica a intenção do desenvolvedor."
-        intention = generate(api_key, sys_prompt, f"Intenção: {text}").strip()
-        cache.set(cache_key, intention)
-    
-    # 2. localizar estrutura_projeto.json
+# orcamento em tokens do codigo enviado no plano (passo 7) e das partes do prompt final (passo 8)
+PLAN_CODE_TOKENS = 1500
+FINAL_PROMPT_TOKENS = 1000
+
+# prazos (s) de cada passo; depois disso (ou com o passo sem modelo em "routes") usa uma alternativa sem LLM
+INTENTION_DEADLINE = 10
+FILES_DEADLINE = 15
+PLAN_DEADLINE = 20
+
+
+def _limit(budget, room):
+    # menor entre o orcamento do passo e o espaco livre na chamada (room None = sem limite)
+    return budget if room is None else min(budget, room)
+
+def tokenizer(text, api_key, project_root=None, on_token=None):
+    # on_token(trecho): recebe o plano de edicao em streaming, a medida que e gerado
+    # as respostas repetidas (mesmo prompt) vem do cache de respostas do generate
+    
+    # 1. resumir intenção
+    sys_prompt = "Resuma em 1 frase clara e técnica a intenção do desenvolvedor."
+    intention = generate(api_key, sys_prompt, f"Intenção: {text}", deadline=INTENTION_DEADLINE, step="summarize")
+    if timed_out(intention) or skipped(intention):
+        intention = text  # o pedido original serve de intencao
+    elif is_error(intention):
+        return {'error': str(intention)}
+    intention = intention.strip()
+    
+    # 2. localizar o indice do projeto (estrutura_projeto.db): consultas sem carregar a estrutura inteira
     if not project_root:
         project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
     
-    json_path = os.path.join(project_root, 'estrutura_projeto.json')
-    
-    # Tentar carregar estrutura existente ou criar mínima
-    if os.path.exists(json_path):
-        with open(json_path, 'r', encoding='utf-8') as f:
-            estrutura = json.load(f)
-    else:
-        # Estrutura mínima se não existir
-        print(f"[INFO] estrutura_projeto.json não encontrado, usando modo simplificado")
-        estrutura = {
-            "path": project_root,
-            "estrutura": []
-        }
+    indice = abrir_indice(project_root)
+    if indice is None:
+        # projeto varrido antes do indice: o estrutura_projeto.json vira um indice em memoria
+        json_path = os.path.join(project_root, 'estrutura_projeto.json')
+        if os.path.exists(json_path):
+            with open(json_path, 'r', encoding='utf-8') as f:
+                estrutura = json.load(f)
+        else:
+            # Estrutura mínima se não existir
+            print(f"[INFO] estrutura_projeto.json não encontrado, usando modo simplificado")
+            estrutura = {
+                "path": project_root,
+                "estrutura": []
+            }
+        indice = indice_de_estrutura(estrutura)
     
     # 3. analisar contexto profundo
     context_mgr = ContextManager(project_root)
     context_mgr.analyze_project()
     
     # 4. buscar arquivos relevantes usando LLM + contexto
-    context_text = _build_context_summary(estrutura, context_mgr)
-    
-    cache_key_files = f"files:{intention}:{project_root}"
-    relevantes = cache.get(cache_key_files, max_age=1800)
+    context_text = _build_context_summary(indice, context_mgr)
     
-    if not relevantes:
-        sys_prompt2 = "Liste apenas os nomes dos arquivos (separados por vírgula) mais relevantes para a tarefa."
-        relevantes = generate(api_key, sys_prompt2, f"Tarefa: {intention}\n\nArquivos:\n{context_text}")
-        cache.set(cache_key_files, relevantes)
+    sys_prompt2 = "Liste apenas os nomes dos arquivos (separados por vírgula) mais relevantes para a tarefa."
+    relevantes = generate(api_key, sys_prompt2, f"Tarefa: {intention}\n\nArquivos:\n{context_text}",
+                          deadline=FILES_DEADLINE, step="rank")
+    if timed_out(relevantes) or skipped(relevantes):
+        relevantes = ', '.join(_rank_files_locally(intention, indice))
+    elif is_error(relevantes):
+        return {'error': str(relevantes)}
     
     arquivos_alvo = [a.strip() for a in relevantes.split(',') if a.strip()]
     
@@ -88,38 +106,62 @@ def tokenizer(text, api_key, project_root=None):
     files_content = ""
     dependencies_info = ""
     
-    for item in estrutura.get('estrutura', []):
-        if any(alvo in item['caminho'] for alvo in arquivos_alvo):
-            file_path = os.path.join(estrutura['path'], item['caminho'])
-            if os.path.exists(file_path):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # adicionar contexto de simbolos
-                symbols = context_mgr.symbols.get(item['caminho'], [])
-                symbol_summary = ", ".join([s['name'] for s in symbols[:10]])
-                
-                files_content += f"\n### {item['caminho']}\n"
-                files_content += f"Símbolos: {symbol_summary}\n"
-                files_content += f"```python\n{content}\n```\n"
-                
-                # info de dependencias
-                deps = context_mgr.dependencies.get(item['caminho'], [])
-                if deps:
-                    dependencies_info += f"{item['caminho']} → {', '.join(list(deps)[:3])}\n"
-    
-    # 7. gerar análise de onde e o que editar (com cache parcial)
-    sys_prompt3 = "Analise o código e indique: arquivo, linha/função, e mudança exata (máx 3 frases)."
-    onde_editar = generate(api_key, sys_prompt3, 
-                          f"Tarefa: {intention}\n\nCódigo:\n{files_content[:3000]}")
+    caminhos = []
+    for alvo in arquivos_alvo:
+        caminhos += [c for c in indice.procurar_caminho(alvo) if c not in caminhos]
     
-    # 8. montar prompt final
-    final_prompt = prompt_template.format(
-        intention=intention,
-        context=context_text[:500],
-        files_content=files_content[:2000],
-        dependencies=dependencies_info[:300]
-    )
+    for caminho in caminhos:
+        file_path = os.path.join(indice.path, caminho)
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            
+            # adicionar contexto de simbolos
+            symbols = context_mgr.symbols.get(caminho, [])
+            symbol_summary = ", ".join([s['name'] for s in symbols[:10]])
+            
+            files_content += f"\n### {caminho}\n"
+            files_content += f"Símbolos: {symbol_summary}\n"
+            files_content += f"```python\n{content}\n```\n"
+            
+            # info de dependencias
+            deps = context_mgr.dependencies.get(caminho, [])
+            if deps:
+                dependencies_info += f"{caminho} → {', '.join(list(deps)[:3])}\n"
+    
+    # 7. gerar análise de onde e o que editar
+    sys_prompt3 = "Analise o código e indique: arquivo, linha/função, e mudança exata (máx 3 frases)."
+    template3 = f"Tarefa: {intention}\n\nCódigo:\n"
+    codigo = truncate_tokens(files_content, _limit(PLAN_CODE_TOKENS, prompt_room(sys_prompt3, template3)))
+    prompt3 = template3 + codigo
+    # sem plano dentro do prazo: a propria intencao e os arquivos alvo guiam a edicao
+    plano_padrao = f"Editar {', '.join(arquivos_alvo) or 'os arquivos relevantes'} para: {intention}"
+    if on_token:
+        partes = []
+        for trecho in generate_stream(api_key, sys_prompt3, prompt3, deadline=PLAN_DEADLINE, step="plan"):
+            if timed_out(trecho) or skipped(trecho):
+                partes = [plano_padrao]
+                on_token(plano_padrao)
+                break
+            if is_error(trecho):
+                return {'error': str(trecho)}
+            partes.append(trecho)
+            on_token(trecho)
+        onde_editar = "".join(partes)
+    else:
+        onde_editar = generate(api_key, sys_prompt3, prompt3, deadline=PLAN_DEADLINE, step="plan")
+        if timed_out(onde_editar) or skipped(onde_editar):
+            onde_editar = plano_padrao
+        elif is_error(onde_editar):
+            return {'error': str(onde_editar)}
+    
+    # 8. montar prompt final: o codigo e o ultimo a ser cortado, as dependencias o primeiro
+    secoes = fit_sections([
+        Section('files_content', files_content, priority=2, min_tokens=300),
+        Section('context', context_text, priority=1, min_tokens=100),
+        Section('dependencies', dependencies_info, priority=0),
+    ], FINAL_PROMPT_TOKENS)
+    final_prompt = prompt_template.format(intention=intention, **secoes)
     
     return {
         'intention': intention,
@@ -127,13 +169,18 @@ def tokenizer(text, api_key, project_root=None):
         'edit_plan': onde_editar,
         'final_prompt': final_prompt,
         'context': context_mgr.get_summary(),
-        'cache_stats': cache.stats()
+        'cache_stats': get_response_cache().stats()
     }
 
-def _build_context_summary(estrutura, context_mgr):
-    # monta resumo compacto: arquivo -> funções/classes + complexidade
+def _rank_files_locally(intention, indice, limit=3):
+    # alternativa sem LLM: arquivos cujo caminho, descricao e simbolos mais citam as palavras da intencao
+    # (busca de texto do indice do projeto)
+    return indice.buscar(intention, limit)
+
+def _build_context_summary(indice, context_mgr):
+    # monta resumo compacto: arquivo -> funções/classes + complexidade (so os 30 primeiros arquivos entram)
     lines = []
-    for item in estrutura.get('estrutura', []):
+    for item in indice.arquivos(limite=30):
         nome = item.get('caminho', item.get('nome', '?'))
         desc = item.get('descricao', '')[:80]
         funcoes = [f['nome'] for f in item.get('funcoes', [])]
@@ -146,7 +193,7 @@ def _build_context_summary(estrutura, context_mgr):
             parts.append(f"classes: {', '.join(classes[:4])}")
         
         # adicionar complexidade se disponivel
-        file_path = os.path.join(estrutura.get('path', ''), nome)
+        file_path = os.path.join(indice.path, nome)
         if os.path.exists(file_path):
             complexity = context_mgr.get_file_complexity(file_path)
             parts.append(f"score: {complexity['score']}")
@@ -6,13 +6,13 @@ class SmartTools:
     @staticmethod
     def regex_builder(description, api_key):
         # gerar regex a partir de descrição
-        from models.cohe import generate
+        from models.cohe import generate, unwrap
         
         sys_prompt = "Você é um especialista em regex. Gere apenas a expressão regular, sem explicações."
         user_prompt = f"Gere regex para: {description}"
         
         try:
-            regex = generate(api_key, sys_prompt, user_prompt).strip()
+            regex = unwrap(generate(api_key, sys_prompt, user_prompt)).strip()
             # limpar
             regex = regex.replace('```', '').replace('regex:', '').strip()
             return regex
@@ -76,13 +76,13 @@ class SmartTools:
     @staticmethod
     def transform_data(data, transformation, api_key):
         # transformação de dados com IA
-        from models.cohe import generate
+        from models.cohe import generate, unwrap
         
         sys_prompt = "Transforme os dados conforme solicitado. Retorne apenas o resultado."
         user_prompt = f"Dados:\n{data}\n\nTransformação: {transformation}"
         
         try:
-            return generate(api_key, sys_prompt, user_prompt).strip()
+            return unwrap(generate(api_key, sys_prompt, user_prompt)).strip()
         except:
             return data
     
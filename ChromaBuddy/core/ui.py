@@ -11,7 +11,7 @@ from rich.table import Table
 from rich.tree import Tree
 from rich import print as rprint
 from rich.prompt import Prompt, Confirm
-from typing import Optional, Any
+from typing import Optional, Any, Iterable, List
 import time
 
 
@@ -75,6 +75,17 @@ class RichUI:
         """Create spinner context manager"""
         return SpinnerContext(self.console, message)
     
+    def stream_printer(self, title: str = "", spinner: Optional['SpinnerContext'] = None) -> 'StreamPrinter':
+        """Create a callable that prints text chunks as they arrive"""
+        return StreamPrinter(self.console, title, spinner)
+    
+    def stream(self, chunks: Iterable[str], title: str = "") -> str:
+        """Render streamed text chunks as they arrive and return the full text"""
+        printer = self.stream_printer(title)
+        for chunk in chunks:
+            printer(chunk)
+        return printer.finish()
+    
     def progress_bar(self) -> Progress:
         """Create progress bar"""
         return Progress(
@@ -127,6 +138,43 @@ class SpinnerContext:
         """Update spinner message"""
         if self.status:
             self.status.update(f"[bold cyan]{message}[/bold cyan]")
+    
+    def stop(self):
+        """Stop the spinner before the context exits (e.g. when output starts streaming)"""
+        if self.status:
+            self.status.stop()
+
+
+class StreamPrinter:
+    """Prints streamed text chunks as they arrive"""
+    
+    def __init__(self, console: Console, title: str = "", spinner: Optional[SpinnerContext] = None):
+        self.console = console
+        self.title = title
+        self.spinner = spinner
+        self.started = False
+        self.parts: List[str] = []
+    
+    def __call__(self, chunk: str) -> None:
+        if not self.started:
+            # first chunk: the spinner gives way to the text
+            if self.spinner:
+                self.spinner.stop()
+            if self.title:
+                self.console.rule(self.title)
+            self.started = True
+        self.parts.append(chunk)
+        self.console.print(chunk, end="", markup=False, highlight=False, soft_wrap=True)
+    
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+    
+    def finish(self) -> str:
+        """End the streamed block and return the full text"""
+        if self.started:
+            self.console.print()
+        return self.text
 
 
 class Logger:
@@ -1,32 +1,70 @@
 import os
+import re
 import json
 import ast
 import sys
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.cohe import generate
+from models.cohe import generate, generate_many, is_error, get_config
+from models.response_cache import ResponseCache
+from models.budget import count_tokens, truncate_tokens
+from locate.indice import INDICE_ARQUIVO, abrir_indice
 
-def generate_project_description(path, api_key):
+# maximo de itens (arquivo + simbolos) descritos em um unico pedido em lote
+LOTE_MAXIMO = 25
+# maximo de tokens de codigo em um pedido em lote e do trecho usado para descrever um arquivo
+LOTE_TOKENS = 3000
+ARQUIVO_TOKENS = 300
+# threads que leem e preparam os arquivos (as chamadas ao modelo tem o limite do config.json)
+PREPARO_WORKERS = 8
+# pastas nunca percorridas
+PASTAS_IGNORADAS = ['__pycache__', '.git', 'node_modules', 'venv']
+# arquivos descritos por vez pelo Enriquecedor (a estrutura e gravada depois de cada grupo)
+ARQUIVOS_POR_VEZ = 16
+# descricoes de simbolos nao envelhecem: so saem do cache pelo limite de entradas
+SIMBOLOS_TTL = 365 * 24 * 3600
+# cache global (entre projetos) das descricoes de simbolos, na pasta do usuario
+SIMBOLOS_DIR = os.path.join(os.path.expanduser("~"), ".chromabuddy", "symbols")
+# a propria saida do cltdds (e os temporarios da gravacao e o indice) muda a cada varredura e nunca e descrita
+ESTRUTURA_ARQUIVO = 'estrutura_projeto.json'
+# diario do cltdds: um arquivo descrito por linha, compactado no ESTRUTURA_ARQUIVO no fim
+ESTRUTURA_DIARIO = 'estrutura_projeto.jsonl'
+# extensoes nunca lidas nem descritas (mais as de "scan_skip_extensions" no config.json)
+EXTENSOES_BINARIAS = {
+    '.ico', '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.pdf', '.zip', '.gz', '.tar', '.7z',
+    '.rar', '.exe', '.dll', '.so', '.dylib', '.pyc', '.pyo', '.whl', '.egg', '.bin', '.dat', '.db',
+    '.sqlite', '.sqlite3', '.mp3', '.mp4', '.wav', '.avi', '.mov', '.ttf', '.otf', '.woff', '.woff2',
+}
+# bytes lidos do comeco de um arquivo para decidir se e texto
+AMOSTRA_BYTES = 8192
+
+def generate_project_description(path, api_key, cota=None):
     """
     Gera descrição geral do projeto.
     
     Args:
         path: Caminho do diretório do projeto
         api_key: Chave da API Cohere
+        cota: CotaDeChamadas da varredura (sem chamadas restantes, usa o texto padrão)
     
     Returns:
         str: Descrição do projeto
     """
     # Ler README se existir
     readme_path = os.path.join(path, 'README.md')
-    if os.path.exists(readme_path):
+    if os.path.exists(readme_path) and (cota is None or cota.reservar(1)):
         try:
             with open(readme_path, 'r', encoding='utf-8') as f:
-                readme_content = f.read(1000)  # Primeiros 1000 caracteres
+                readme_content = truncate_tokens(f.read(), ARQUIVO_TOKENS)
                 
             system_prompt = "Você é um assistente que analisa projetos de software."
             user_prompt = f"Baseado neste README, descreva brevemente (2-3 frases) o propósito do projeto:\n\n{readme_content}"
             
-            return generate(api_key, system_prompt, user_prompt)
+            descricao = generate(api_key, system_prompt, user_prompt, step="describe")
+            if not is_error(descricao):
+                return descricao
         except:
             pass
     
@@ -42,52 +80,657 @@ def generate_project_description(path, api_key):
     system_prompt = "Você é um assistente que analisa projetos de software."
     user_prompt = f"Baseado nesta estrutura de projeto, descreva brevemente (2-3 frases) seu provável propósito:\n\nPastas: {', '.join(dirs[:10])}\nArquivos: {', '.join(files[:10])}"
     
+    if cota is not None and not cota.reservar(1):
+        return "Projeto de software"
     try:
-        return generate(api_key, system_prompt, user_prompt)
+        descricao = generate(api_key, system_prompt, user_prompt, step="describe")
+        return "Projeto de software" if is_error(descricao) else descricao
     except:
         return "Projeto de software"
 
-def cltdds(path, api_key):
+def cltdds(path, api_key, concurrency=None, anterior=None, incremental=True, diario=True, orcamento=None):
     """
     Coleta informações sobre a estrutura do projeto e gera descrições usando Cohere.
     
+    Cada arquivo leva o hash do seu conteúdo: com incremental=True, os
+    arquivos cujo hash é igual ao da estrutura anterior (`anterior` ou o
+    estrutura_projeto.json já salvo em `path`) são reaproveitados sem
+    chamar o modelo, e só os novos ou alterados são descritos.
+    
+    Os arquivos são descritos do mais central para o menos (ver priorizar);
+    com um limite de chamadas, os que não couberem ficam para a próxima
+    varredura. Com diario=True, cada arquivo descrito é acrescentado ao
+    estrutura_projeto.jsonl assim que fica pronto e, no fim, o diário é
+    compactado no estrutura_projeto.json. Se a varredura for interrompida,
+    a próxima (incremental) continua de onde o diário parou.
+    
     Args:
         path: Caminho do diretório a ser analisado
         api_key: Chave da API Cohere
+        concurrency: Máximo de chamadas simultâneas à API (padrão: config.json)
+        anterior: Estrutura gerada antes (padrão: estrutura_projeto.json de `path`)
+        incremental: False descreve tudo de novo
+        diario: False não grava nada em `path` (só devolve a estrutura)
+        orcamento: Máximo de chamadas ao modelo, novas tentativas incluídas
+            (padrão: "scan_call_budget" do config.json)
     
     Returns:
         dict: Estrutura JSON com informações do projeto
     """
+    resultado, pendentes = indexar(path, anterior, incremental, orcamento)
+    cota = CotaDeChamadas(orcamento)
+    
+    if not diario:
+        # as descricoes sao independentes: todas vao para a API em paralelo
+        resolver_pedidos([p for _, pedidos in pendentes for p in pedidos], api_key, concurrency, cota)
+        _concluir(pendentes)
+        return resultado
+    
+    # grupo a grupo: o que ja foi descrito sobrevive a uma interrupcao (incremental=False recomeca o diario)
+    with open(os.path.join(path, ESTRUTURA_DIARIO), 'a' if incremental else 'w', encoding='utf-8') as f:
+        for grupo in _descrever(pendentes, api_key, concurrency, cota=cota):
+            _anotar(f, grupo)
+    compactar_diario(path, resultado)
+    return resultado
+
+
+def indexar(path, anterior=None, incremental=True, orcamento=None):
+    """
+    Primeira etapa do cltdds, sem chamar o modelo: arquivos, funções,
+    classes, métodos e variáveis globais com as linhas, descrições vindas de
+    docstrings e, com incremental=True, as descrições dos arquivos que não
+    mudaram. Arquivos que ainda precisam de descrições ficam com
+    "pendente": true.
+    
+    Returns:
+        tuple: (estrutura, lista de (info do arquivo, pedidos de descrição
+        pendentes), na ordem de priorizar e dentro do `orcamento`)
+    """
     resultado = {
         "path": path,
         "estrutura": []
     }
+    conhecidos = {}
+    diario = {}
+    if incremental and anterior is None:
+        anterior = carregar_estrutura(path)
+        # arquivos descritos por uma varredura interrompida valem mais que os da estrutura salva
+        diario = ler_diario(path)
+    if incremental and anterior:
+        conhecidos = {item.get("caminho"): item for item in anterior.get("estrutura", [])
+                      if item.get("hash") and not item.get("pendente")}
+    conhecidos.update(diario)
+    
+    arquivos = listar_arquivos(path)
+    
+    # leitura, hash e AST de cada arquivo em paralelo (a ordem do resultado e a do os.walk)
+    def preparar(arquivo):
+        return preparar_arquivo(path, arquivo, conhecidos)
+    
+    with ThreadPoolExecutor(max_workers=PREPARO_WORKERS, thread_name_prefix="dds") as pool:
+        preparados = list(pool.map(preparar, arquivos))
+    
+    for info, _ in preparados:
+        resultado["estrutura"].append(info)
+    resultado["varredura"] = {
+        "arquivos": len(preparados),
+        "reaproveitados": sum(1 for info, _ in preparados if conhecidos.get(info.get("caminho")) is info),
+        "descritos": sum(1 for _, file_pedidos in preparados if file_pedidos),
+    }
+    pendentes, adiados = priorizar(path, preparados, orcamento)
+    resultado["varredura"]["descritos"] -= len(adiados)
+    resultado["varredura"]["adiados"] = len(adiados)
+    return resultado, pendentes
+
+
+def grau_de_importacao(infos):
+    """
+    {caminho: quantos outros arquivos do projeto o importam}, a partir da
+    lista "importa" de cada arquivo Python. Um import casa com o arquivo
+    cujo caminho termina no módulo importado (models.cohe -> .../models/cohe.py).
+    """
+    modulos = {}
+    for info in infos:
+        caminho = info.get("caminho", "")
+        if not caminho.endswith(".py"):
+            continue
+        partes = caminho[:-3].replace(os.sep, "/").split("/")
+        if partes[-1] == "__init__" and len(partes) > 1:
+            partes = partes[:-1]
+        for i in range(len(partes)):
+            modulos.setdefault(".".join(partes[i:]), set()).add(caminho)
+    
+    grau = {}
+    for info in infos:
+        alvos = set()
+        for modulo in info.get("importa", []):
+            alvos |= modulos.get(modulo, set())
+        alvos.discard(info.get("caminho"))
+        for alvo in alvos:
+            grau[alvo] = grau.get(alvo, 0) + 1
+    return grau
+
+
+def priorizar(path, preparados, orcamento=None):
+    """
+    Ordena os arquivos com descrições pendentes do mais central para o
+    menos: os mais importados pelo resto do projeto primeiro e, no empate,
+    os modificados mais recentemente. Com `orcamento` (máximo de chamadas ao
+    modelo; padrão: "scan_call_budget" do config.json, 0 = sem limite), os
+    arquivos que não cabem ficam com as descrições padrão e continuam
+    pendentes, para a próxima varredura incremental. A escolha conta só os
+    pedidos de cada arquivo; o limite de fato é a CotaDeChamadas passada a
+    resolver_pedidos, que conta também as novas tentativas item a item.
+    
+    Returns:
+        tuple: (pendentes na ordem, adiados)
+    """
+    orcamento = CotaDeChamadas(orcamento).limite
+    grau = grau_de_importacao([info for info, _ in preparados])
+    
+    def modificado(info):
+        try:
+            return os.path.getmtime(os.path.join(path, info["caminho"]))
+        except OSError:
+            return 0
     
-    # Coletar nomes de pastas e arquivos
+    pendentes = [(info, pedidos) for info, pedidos in preparados if pedidos]
+    pendentes.sort(key=lambda item: (grau.get(item[0]["caminho"], 0), modificado(item[0])), reverse=True)
+    if not orcamento:
+        return pendentes, []
+    
+    # cada pedido (simples ou em lote) e uma chamada; arquivos menores ainda aproveitam o que sobrar
+    escolhidos, adiados, chamadas = [], [], 0
+    for info, pedidos in pendentes:
+        if chamadas + len(pedidos) <= orcamento:
+            escolhidos.append((info, pedidos))
+            chamadas += len(pedidos)
+            continue
+        for pedido in _itens(pedidos):
+            _preencher(pedido, None)
+        pedidos.clear()
+        adiados.append((info, pedidos))
+    return escolhidos, adiados
+
+
+def _concluir(preparados):
+    # arquivo com alguma descricao que falhou continua pendente: e descrito de novo na proxima vez
+    for info, file_pedidos in preparados:
+        if file_pedidos and not any(p.get("falhou") for p in _itens(file_pedidos)):
+            info.pop("pendente", None)
+
+
+def _descrever(pendentes, api_key, concurrency=None, arquivos_por_vez=ARQUIVOS_POR_VEZ, cota=None):
+    # descreve os arquivos pendentes grupo a grupo, devolvendo cada grupo pronto; os pedidos
+    # (com o codigo de cada funcao) sao descartados em seguida para a memoria nao crescer com o projeto
+    for inicio in range(0, len(pendentes), arquivos_por_vez):
+        grupo = pendentes[inicio:inicio + arquivos_por_vez]
+        resolver_pedidos([p for _, pedidos in grupo for p in pedidos], api_key, concurrency, cota)
+        _concluir(grupo)
+        yield grupo
+        for _, pedidos in grupo:
+            pedidos.clear()
+
+
+def _anotar(f, grupo):
+    # so arquivos completos entram no diario; os que ficaram pendentes sao descritos de novo
+    for info, _ in grupo:
+        if not info.get("pendente"):
+            f.write(json.dumps(info, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+def ler_diario(path):
+    """
+    {caminho: info} dos arquivos no estrutura_projeto.jsonl de `path` (vazio
+    se não existir). Uma linha cortada por uma interrupção é ignorada.
+    """
+    arquivos = {}
+    try:
+        with open(os.path.join(path, ESTRUTURA_DIARIO), 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    info = json.loads(linha)
+                except ValueError:
+                    continue
+                if isinstance(info, dict) and info.get("caminho") and info.get("hash"):
+                    arquivos[info["caminho"]] = info
+    except OSError:
+        pass
+    return arquivos
+
+
+def compactar_diario(path, resultado):
+    """
+    Grava `resultado` no índice (estrutura_projeto.db) e no
+    estrutura_projeto.json de `path` e apaga o diário, já incorporado.
+    """
+    abrir_indice(path, criar=True).sincronizar(resultado)
+    salvar_estrutura(resultado, os.path.join(path, ESTRUTURA_ARQUIVO))
+    try:
+        os.remove(os.path.join(path, ESTRUTURA_DIARIO))
+    except OSError:
+        pass
+
+
+def salvar_estrutura(resultado, caminho):
+    """Grava a estrutura em JSON sem que um leitor veja o arquivo pela metade."""
+    tmp = f"{caminho}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, caminho)
+
+
+class Enriquecedor(threading.Thread):
+    """
+    Segunda etapa do cltdds em segundo plano: descreve os arquivos pendentes
+    de `arquivos_por_vez` em `arquivos_por_vez` e grava cada grupo no índice
+    do projeto, para as descrições aparecerem aos poucos; o JSON em
+    `destino` é regravado uma vez, no fim.
+    """
+    
+    def __init__(self, resultado, preparados, api_key, destino, concurrency=None,
+                 arquivos_por_vez=ARQUIVOS_POR_VEZ, cota=None):
+        super().__init__(name="dds-enriquecedor", daemon=True)
+        self.resultado = resultado
+        self.pendentes = [(info, pedidos) for info, pedidos in preparados if pedidos]
+        self.api_key = api_key
+        self.destino = destino
+        self.concurrency = concurrency
+        self.arquivos_por_vez = max(1, arquivos_por_vez)
+        self.cota = cota if cota is not None else CotaDeChamadas()
+        self.indice = abrir_indice(os.path.dirname(destino), criar=True)
+        self.feitos = 0
+        self.erro = None
+        self._parar = threading.Event()
+        self._descartar = False
+    
+    @property
+    def total(self):
+        return len(self.pendentes)
+    
+    def parar(self, descartar=False):
+        """
+        Para depois do grupo em andamento (o que já foi descrito fica
+        gravado). Com descartar=True nada mais é gravado, nem o grupo em
+        andamento nem o JSON final: uma varredura nova vai substituir esta.
+        """
+        self._descartar = self._descartar or descartar
+        self._parar.set()
+    
+    def run(self):
+        if self._parar.is_set():
+            return
+        try:
+            for grupo in _descrever(self.pendentes, self.api_key, self.concurrency, self.arquivos_por_vez,
+                                    self.cota):
+                if self._descartar:
+                    break
+                # upsert so dos arquivos do grupo: o custo nao cresce com o tamanho do projeto
+                self.indice.gravar([info for info, _ in grupo])
+                self.feitos += len(grupo)
+                if self._parar.is_set():
+                    break
+        except Exception as e:
+            # a estrutura ja gravada continua valida; os arquivos restantes ficam pendentes
+            self.erro = e
+        finally:
+            if self.feitos and not self._descartar:
+                salvar_estrutura(self.resultado, self.destino)
+
+
+def cltdds_em_segundo_plano(path, api_key, concurrency=None, incremental=True):
+    """
+    Grava na hora o estrutura_projeto.json só com o AST (indexar) e inicia
+    um Enriquecedor que preenche as descrições em segundo plano.
+    
+    Returns:
+        tuple: (estrutura, Enriquecedor já iniciado)
+    """
+    resultado, pendentes = indexar(path, incremental=incremental)
+    destino = os.path.join(path, ESTRUTURA_ARQUIVO)
+    # o indice ja incorpora o diario de um gerardds interrompido
+    compactar_diario(path, resultado)
+    enriquecedor = Enriquecedor(resultado, pendentes, api_key, destino, concurrency)
+    enriquecedor.start()
+    return resultado, enriquecedor
+
+
+def carregar_estrutura(path):
+    """
+    Estrutura salva de `path`: do índice (estrutura_projeto.db) ou, em
+    projetos varridos antes dele, do estrutura_projeto.json; None se não
+    existir ou estiver corrompida.
+    """
+    indice = abrir_indice(path)
+    if indice is not None and indice.contar():
+        return indice.para_estrutura()
+    try:
+        with open(os.path.join(path, ESTRUTURA_ARQUIVO), 'r', encoding='utf-8') as f:
+            estrutura = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return estrutura if isinstance(estrutura, dict) else None
+
+
+def listar_arquivos(path):
+    """(pasta relativa, nome) de cada arquivo analisado, na ordem do os.walk."""
+    arquivos = []
     for root, dirs, files in os.walk(path):
         # Ignorar __pycache__ e outras pastas desnecessárias
-        dirs[:] = [d for d in dirs if d not in ['__pycache__', '.git', 'node_modules', 'venv']]
-        
+        dirs[:] = [d for d in dirs if d not in PASTAS_IGNORADAS]
         rel_path = os.path.relpath(root, path)
-        
-        # Processar cada arquivo
         for file in files:
-            if file.endswith('.py'):
-                file_path = os.path.join(root, file)
-                file_info = processar_arquivo_python(file_path, rel_path, file, api_key)
-                resultado["estrutura"].append(file_info)
-            elif not file.startswith('.'):
-                # Outros arquivos (json, md, etc)
-                file_path = os.path.join(root, file)
-                file_info = processar_arquivo_generico(file_path, rel_path, file, api_key)
-                resultado["estrutura"].append(file_info)
+            if file.startswith((ESTRUTURA_ARQUIVO, INDICE_ARQUIVO)):
+                continue
+            if file.endswith('.py') or not file.startswith('.'):
+                arquivos.append((rel_path, file))
+    return arquivos
+
+
+def hash_arquivo(file_path):
+    """sha256 do conteúdo do arquivo (None se não puder ser lido)."""
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 16), b''):
+                digest.update(bloco)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def preparar_arquivo(path, arquivo, conhecidos=None):
+    """
+    Info e pedidos de descrição de um arquivo; se o hash bate com o de
+    `conhecidos` ({caminho: info anterior}), devolve a info anterior sem pedidos.
+    """
+    rel_path, file = arquivo
+    file_path = os.path.join(path, rel_path, file)
+    caminho = os.path.join(rel_path, file) if rel_path != '.' else file
+    digest = hash_arquivo(file_path)
+    anterior = (conhecidos or {}).get(caminho)
+    if digest is not None and anterior is not None and anterior.get("hash") == digest:
+        return anterior, []
     
-    return resultado
+    if file.endswith('.py'):
+        info, pedidos = preparar_arquivo_python(file_path, rel_path, file)
+    else:
+        # Outros arquivos (json, md, etc)
+        info, pedidos = preparar_arquivo_generico(file_path, rel_path, file)
+    if digest is not None:
+        info["hash"] = digest
+    if pedidos:
+        info["pendente"] = True
+    return info, pedidos
 
 
-def processar_arquivo_python(file_path, rel_path, filename, api_key):
+def _itens(pedidos):
+    # pedidos individuais, inclusive os de dentro dos pedidos em lote
+    for pedido in pedidos:
+        if pedido.get("itens") is None:
+            yield pedido
+        else:
+            for _, item in pedido["itens"]:
+                yield item
+
+
+def resolver_pedidos(pedidos, api_key, concurrency=None, cota=None):
     """
-    Processa um arquivo Python e extrai funções, classes e variáveis.
+    Gera as descrições pendentes em paralelo e preenche cada destino.
+    
+    Cada pedido é um dict com: destino (dict que recebe a "descricao"),
+    system_prompt, user_prompt, padrao (texto usado se a chamada falhar) e
+    sufixo (texto acrescentado à descrição gerada). Pedidos em lote
+    (ver agrupar_pedidos) descrevem vários itens em uma chamada; os itens
+    que faltarem na resposta são pedidos de novo, um a um. Com `cota`
+    (CotaDeChamadas), cada chamada é descontada antes de sair e os pedidos
+    que não couberem ficam com o texto padrão, como uma chamada que falhou.
+    """
+    pedidos = _dentro_da_cota(pedidos, cota)
+    if not pedidos:
+        return
+    respostas = _gerar(pedidos, api_key, concurrency)
+    
+    avulsos = []
+    for pedido, resposta in zip(pedidos, respostas):
+        if pedido.get("itens") is None:
+            _preencher(pedido, resposta)
+            continue
+        
+        descricoes = extrair_descricoes(resposta) if resposta is not None else {}
+        for item_id, item in pedido["itens"]:
+            descricao = descricoes.get(item_id)
+            if descricao:
+                _lembrar(item, descricao)
+                item["destino"]["descricao"] = descricao + item.get("sufixo", "")
+            else:
+                avulsos.append(item)
+    
+    # fallback: itens que o lote nao descreveu (ou resposta invalida)
+    avulsos = _dentro_da_cota(avulsos, cota)
+    if avulsos:
+        for pedido, resposta in zip(avulsos, _gerar(avulsos, api_key, concurrency)):
+            _preencher(pedido, resposta)
+
+
+def _dentro_da_cota(pedidos, cota):
+    # pedidos que cabem na cota; os outros recebem o texto padrao e o arquivo continua pendente
+    if cota is None:
+        return pedidos
+    cabem = cota.reservar(len(pedidos))
+    for pedido in pedidos[cabem:]:
+        for item in _itens([pedido]):
+            _preencher(item, None)
+    return pedidos[:cabem]
+
+
+class CotaDeChamadas:
+    """
+    Chamadas ao modelo que ainda restam em uma varredura: o lote, as novas
+    tentativas item a item e a descrição do projeto descontam da mesma cota.
+    `limite` None usa "scan_call_budget" do config.json; 0 = sem limite.
+    """
+    
+    def __init__(self, limite=None):
+        self.limite = get_dds_settings()["scan_call_budget"] if limite is None else max(0, int(limite))
+        self.usadas = 0
+        self._lock = threading.Lock()
+    
+    def reservar(self, n):
+        """Desconta até `n` chamadas e devolve quantas couberam."""
+        with self._lock:
+            cabem = n if not self.limite else max(0, min(n, self.limite - self.usadas))
+            self.usadas += cabem
+            return cabem
+
+
+def _gerar(pedidos, api_key, concurrency):
+    # respostas de erro viram None: a descricao fica com o texto padrao do pedido
+    try:
+        # label separa, na telemetria, os pedidos em lote dos pedidos de um item so
+        respostas = generate_many(
+            api_key,
+            [{"system_prompt": p["system_prompt"], "user_prompt": p["user_prompt"],
+              "label": "locate.dds:lote" if "itens" in p else "locate.dds:item", "step": "describe"}
+             for p in pedidos],
+            concurrency=concurrency
+        )
+    except Exception:
+        return [None] * len(pedidos)
+    return [None if is_error(r) else r for r in respostas]
+
+
+def _preencher(pedido, resposta):
+    pedido["falhou"] = resposta is None
+    if resposta is not None:
+        _lembrar(pedido, resposta)
+    descricao = resposta if resposta is not None else pedido.get("padrao", "")
+    pedido["destino"]["descricao"] = descricao + pedido.get("sufixo", "")
+
+
+_simbolos = None
+_simbolos_chave = None
+_simbolos_lock = threading.Lock()
+
+
+def get_dds_settings():
+    """Opções do cltdds no config.json (com os ajustes de models.cohe.configure)."""
+    config = get_config()
+    return {
+        # descricoes de funcoes/classes compartilhadas entre projetos
+        "symbol_cache": bool(config.get("symbol_cache", config.get("cache_enabled", True))),
+        "symbol_cache_dir": config.get("symbol_cache_dir") or SIMBOLOS_DIR,
+        "symbol_cache_max_entries": int(config.get("symbol_cache_max_entries", 100000)),
+        # varredura: maximo de chamadas por varredura (0 = sem limite), arquivos que nao sao Python
+        # acima de scan_max_file_kb (0 = sem limite) e extensoes extras tratadas como binarias
+        "scan_call_budget": max(0, int(config.get("scan_call_budget", 0) or 0)),
+        "scan_max_file_kb": max(0, int(config.get("scan_max_file_kb", 256) or 0)),
+        "scan_skip_extensions": [e.lower() for e in config.get("scan_skip_extensions") or []],
+    }
+
+
+def get_symbol_cache():
+    """
+    Cache global das descrições de funções e classes, compartilhado entre
+    projetos (padrão: ~/.chromabuddy/symbols); None quando desligado
+    ("symbol_cache": false no config.json).
+    """
+    global _simbolos, _simbolos_chave
+    settings = get_dds_settings()
+    if not settings["symbol_cache"]:
+        return None
+    chave = (settings["symbol_cache_dir"], settings["symbol_cache_max_entries"])
+    with _simbolos_lock:
+        if _simbolos is None or chave != _simbolos_chave:
+            _simbolos = ResponseCache(chave[0], SIMBOLOS_TTL, chave[1])
+            _simbolos_chave = chave
+        return _simbolos
+
+
+def hash_simbolo(node, tipo):
+    """
+    Hash do código normalizado de uma função ou classe: vem do AST (sem
+    linhas, espaços ou comentários), então o mesmo código copiado para outro
+    projeto, movido de lugar ou reindentado tem o mesmo hash.
+    """
+    normalizado = ast.dump(node, annotate_fields=False, include_attributes=False)
+    return hashlib.sha256(f"{tipo}\n{normalizado}".encode("utf-8")).hexdigest()
+
+
+def _lembrar(pedido, descricao):
+    # descricao nova de um simbolo vai para o cache global (sem o sufixo do pedido)
+    chave = pedido.get("simbolo")
+    cache = get_symbol_cache() if chave else None
+    if cache is not None:
+        cache.set(chave, descricao)
+
+
+def _pedido(destino, system_prompt, user_prompt, padrao="", sufixo="", instrucao="", codigo=""):
+    return {
+        "destino": destino,
+        "system_prompt": system_prompt,
+        "user_prompt": user_prompt,
+        "padrao": padrao,
+        "sufixo": sufixo,
+        # usados para montar o pedido em lote
+        "instrucao": instrucao,
+        "codigo": codigo
+    }
+
+
+def _grupos(pedidos, tamanho, tokens):
+    # grupos consecutivos de ate `tamanho` pedidos e `tokens` tokens de codigo
+    grupo, usados = [], 0
+    for pedido in pedidos:
+        custo = count_tokens(pedido.get("codigo", ""))
+        if grupo and (len(grupo) >= tamanho or usados + custo > tokens):
+            yield grupo
+            grupo, usados = [], 0
+        grupo.append(pedido)
+        usados += custo
+    if grupo:
+        yield grupo
+
+
+def agrupar_pedidos(pedidos, caminho, tamanho=LOTE_MAXIMO, tokens=LOTE_TOKENS):
+    """
+    Junta os pedidos de um arquivo em pedidos em lote de até `tamanho` itens
+    e `tokens` tokens de código, cada um respondido com um objeto JSON
+    {"id": "descrição"}. Grupos de um só item continuam como pedido simples.
+    """
+    lotes = []
+    inicio = 0
+    for grupo in _grupos(pedidos, tamanho, tokens):
+        primeiro, inicio = inicio, inicio + len(grupo)
+        if len(grupo) == 1 or not all(p.get("instrucao") for p in grupo):
+            lotes.extend(grupo)
+            continue
+        
+        itens = [(f"i{primeiro + n + 1}", p) for n, p in enumerate(grupo)]
+        blocos = [
+            f"[{item_id}] {p['instrucao']}:\n```python\n{p['codigo']}\n```"
+            for item_id, p in itens
+        ]
+        system_prompt = ("Você é um assistente que analisa código Python e cria descrições concisas. "
+                         "Responda apenas com JSON válido.")
+        user_prompt = (
+            f"Arquivo: {caminho}\n\n"
+            "Descreva cada item abaixo. Responda SOMENTE com um objeto JSON no formato "
+            '{"id": "descrição"}, com uma chave para cada id entre colchetes.\n\n'
+            + "\n\n".join(blocos)
+        )
+        lotes.append({
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "itens": itens
+        })
+    return lotes
+
+
+def extrair_descricoes(texto):
+    """
+    Lê a resposta de um pedido em lote: aceita JSON puro, dentro de bloco
+    ```json, com texto em volta ou, em último caso, pares "id": "descrição"
+    soltos. Devolve {id: descrição}, vazio se nada for aproveitável.
+    """
+    if not texto:
+        return {}
+    
+    candidatos = re.findall(r"```(?:json)?\s*(.*?)```", texto, re.S)
+    inicio, fim = texto.find("{"), texto.rfind("}")
+    if inicio != -1 and fim > inicio:
+        candidatos.append(texto[inicio:fim + 1])
+    
+    for candidato in candidatos:
+        try:
+            dados = json.loads(candidato)
+        except ValueError:
+            continue
+        if isinstance(dados, dict):
+            return _normalizar_descricoes(dados)
+    
+    # JSON quebrado: recupera o que der par a par
+    pares = re.findall(r'"\[?(i\d+)\]?"\s*:\s*"((?:[^"\\]|\\.)*)"', texto)
+    return _normalizar_descricoes({k: v.replace('\\"', '"') for k, v in pares})
+
+
+def _normalizar_descricoes(dados):
+    descricoes = {}
+    for chave, valor in dados.items():
+        if isinstance(valor, dict):
+            valor = valor.get("descricao") or valor.get("descrição") or valor.get("description")
+        if isinstance(valor, str) and valor.strip():
+            descricoes[str(chave).strip().strip("[]")] = valor.strip()
+    return descricoes
+
+
+def preparar_arquivo_python(file_path, rel_path, filename):
+    """
+    Extrai funções, classes e variáveis de um arquivo Python sem chamar a API.
+    
+    Returns:
+        tuple: (info do arquivo, lista de pedidos de descrição pendentes)
     """
     info = {
         "tipo": "arquivo_python",
@@ -96,22 +739,29 @@ def processar_arquivo_python(file_path, rel_path, filename, api_key):
         "descricao": "",
         "funcoes": [],
         "classes": [],
-        "variaveis": []
+        "variaveis": [],
+        # modulos importados: base do grau de importacao usado para priorizar as descricoes
+        "importa": []
     }
+    pedidos = []
     
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             conteudo = f.read()
             
-        # Gerar descrição do arquivo usando Cohere
+        # Descrição do arquivo usando Cohere
         system_prompt = "Você é um assistente que analisa código Python e cria descrições concisas."
-        user_prompt = f"Descreva brevemente (máximo 2 frases) o propósito deste arquivo Python:\n\n{conteudo[:1000]}"
-        
-        info["descricao"] = generate(api_key, system_prompt, user_prompt)
+        trecho = truncate_tokens(conteudo, ARQUIVO_TOKENS)
+        user_prompt = f"Descreva brevemente (máximo 2 frases) o propósito deste arquivo Python:\n\n{trecho}"
+        pedido_arquivo = _pedido(info, system_prompt, user_prompt, padrao="Descrição indisponível",
+                                 instrucao="propósito deste arquivo Python (máximo 2 frases)",
+                                 codigo=trecho)
+        pedidos.append(pedido_arquivo)
         
         # Analisar AST para extrair funções e classes
         try:
             tree = ast.parse(conteudo)
+            importa = set()
             
             for node in ast.walk(tree):
                 # Extrair funções
@@ -119,8 +769,9 @@ def processar_arquivo_python(file_path, rel_path, filename, api_key):
                     func_info = {
                         "nome": node.name,
                         "linha": node.lineno,
-                        "descricao": gerar_descricao_funcao(node, conteudo, api_key)
+                        "descricao": ""
                     }
+                    pedidos.extend(_preparar_descricao(func_info, node, conteudo, "função"))
                     info["funcoes"].append(func_info)
                 
                 # Extrair classes
@@ -128,9 +779,10 @@ def processar_arquivo_python(file_path, rel_path, filename, api_key):
                     class_info = {
                         "nome": node.name,
                         "linha": node.lineno,
-                        "descricao": gerar_descricao_classe(node, conteudo, api_key),
+                        "descricao": "",
                         "metodos": []
                     }
+                    pedidos.extend(_preparar_descricao(class_info, node, conteudo, "classe"))
                     
                     # Extrair métodos da classe
                     for item in node.body:
@@ -150,19 +802,71 @@ def processar_arquivo_python(file_path, rel_path, filename, api_key):
                                 "nome": target.id,
                                 "linha": node.lineno
                             })
+                
+                # Imports (from pkg import mod tambem pode importar o modulo pkg.mod)
+                elif isinstance(node, ast.Import):
+                    importa.update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom):
+                    if node.module:
+                        importa.add(node.module)
+                    prefixo = f"{node.module}." if node.module else ""
+                    importa.update(prefixo + alias.name for alias in node.names if alias.name != "*")
+            
+            info["importa"] = sorted(importa)
         
         except SyntaxError:
-            info["descricao"] += " [Arquivo contém erros de sintaxe]"
+            pedido_arquivo["sufixo"] = " [Arquivo contém erros de sintaxe]"
     
     except Exception as e:
         info["descricao"] = f"Erro ao processar arquivo: {str(e)}"
     
-    return info
+    # arquivo e simbolos sem docstring descritos juntos, em um pedido JSON por lote
+    return info, agrupar_pedidos(pedidos, info["caminho"])
 
 
-def processar_arquivo_generico(file_path, rel_path, filename, api_key):
+def _preparar_descricao(destino, node, conteudo, tipo):
     """
-    Processa arquivos não-Python (json, md, txt, etc).
+    Usa a primeira linha da docstring quando existe; caso contrário devolve
+    o pedido de descrição das primeiras linhas do código.
+    """
+    docstring = ast.get_docstring(node)
+    if docstring:
+        destino["descricao"] = docstring.split('\n')[0]  # Primeira linha da docstring
+        return []
+    
+    # o mesmo codigo ja descrito (neste ou em outro projeto) nao volta ao modelo
+    simbolo = hash_simbolo(node, tipo)
+    cache = get_symbol_cache()
+    descricao = cache.get(simbolo) if cache is not None else None
+    if descricao:
+        destino["descricao"] = descricao
+        return []
+    
+    linhas = conteudo.split('\n')
+    inicio = node.lineno - 1
+    fim = min(inicio + 10, len(linhas))  # Pegar até 10 linhas
+    codigo = '\n'.join(linhas[inicio:fim])
+    
+    system_prompt = "Você é um assistente que analisa código Python e cria descrições concisas."
+    if tipo == "classe":
+        instrucao = "propósito desta classe (1 frase)"
+        user_prompt = f"Descreva brevemente (1 frase) o propósito desta classe:\n\n{codigo}"
+        padrao = "Classe sem descrição"
+    else:
+        instrucao = "o que esta função faz (1 frase)"
+        user_prompt = f"Descreva brevemente (1 frase) o que esta função faz:\n\n{codigo}"
+        padrao = "Função sem descrição"
+    pedido = _pedido(destino, system_prompt, user_prompt, padrao, instrucao=instrucao, codigo=codigo)
+    pedido["simbolo"] = simbolo
+    return [pedido]
+
+
+def preparar_arquivo_generico(file_path, rel_path, filename):
+    """
+    Prepara arquivos não-Python (json, md, txt, etc) sem chamar a API.
+    
+    Returns:
+        tuple: (info do arquivo, lista de pedidos de descrição pendentes)
     """
     info = {
         "tipo": "arquivo_generico",
@@ -171,18 +875,70 @@ def processar_arquivo_generico(file_path, rel_path, filename, api_key):
         "descricao": ""
     }
     
+    # binarios e arquivos enormes nao vao ao modelo: o nome e o tamanho bastam
+    settings = get_dds_settings()
+    extensao = os.path.splitext(filename)[1].lower()
+    try:
+        tamanho = os.path.getsize(file_path)
+    except OSError:
+        tamanho = 0
+    if extensao in EXTENSOES_BINARIAS or extensao in settings["scan_skip_extensions"] or arquivo_binario(file_path):
+        info["descricao"] = f"Arquivo binário ({_tamanho(tamanho)})"
+        return info, []
+    if settings["scan_max_file_kb"] and tamanho > settings["scan_max_file_kb"] * 1024:
+        info["descricao"] = f"Arquivo grande ({_tamanho(tamanho)}), não descrito"
+        return info, []
+    
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
             conteudo = f.read(500)  # Ler apenas os primeiros 500 caracteres
-        
-        system_prompt = "Você é um assistente que analisa arquivos e cria descrições concisas."
-        user_prompt = f"Descreva brevemente (1 frase) o propósito deste arquivo '{filename}':\n\n{conteudo}"
-        
-        info["descricao"] = generate(api_key, system_prompt, user_prompt)
-    
-    except Exception as e:
-        info["descricao"] = f"Arquivo binário ou não legível"
+    except Exception:
+        info["descricao"] = "Arquivo binário ou não legível"
+        return info, []
     
+    system_prompt = "Você é um assistente que analisa arquivos e cria descrições concisas."
+    user_prompt = f"Descreva brevemente (1 frase) o propósito deste arquivo '{filename}':\n\n{conteudo}"
+    return info, [_pedido(info, system_prompt, user_prompt, padrao="Descrição indisponível")]
+
+
+def arquivo_binario(file_path):
+    """True quando o começo do arquivo tem bytes nulos ou não é UTF-8 (ou não pode ser lido)."""
+    try:
+        with open(file_path, 'rb') as f:
+            amostra = f.read(AMOSTRA_BYTES)
+    except OSError:
+        return True
+    if b'\0' in amostra:
+        return True
+    try:
+        amostra.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # a amostra pode cortar um caractere de varios bytes no fim
+        return e.start < len(amostra) - 3
+    return False
+
+
+def _tamanho(tamanho):
+    if tamanho >= 1024 * 1024:
+        return f"{tamanho / (1024 * 1024):.1f} MB"
+    return f"{max(1, round(tamanho / 1024))} KB"
+
+
+def processar_arquivo_python(file_path, rel_path, filename, api_key):
+    """
+    Processa um arquivo Python e extrai funções, classes e variáveis.
+    """
+    info, pedidos = preparar_arquivo_python(file_path, rel_path, filename)
+    resolver_pedidos(pedidos, api_key)
+    return info
+
+
+def processar_arquivo_generico(file_path, rel_path, filename, api_key):
+    """
+    Processa arquivos não-Python (json, md, txt, etc).
+    """
+    info, pedidos = preparar_arquivo_generico(file_path, rel_path, filename)
+    resolver_pedidos(pedidos, api_key)
     return info
 
 
@@ -190,46 +946,18 @@ def gerar_descricao_funcao(node, conteudo, api_key):
     """
     Gera descrição para uma função usando Cohere.
     """
-    # Extrair docstring se existir
-    docstring = ast.get_docstring(node)
-    if docstring:
-        return docstring.split('\n')[0]  # Primeira linha da docstring
-    
-    # Caso contrário, extrair código da função
-    linhas = conteudo.split('\n')
-    inicio = node.lineno - 1
-    fim = min(inicio + 10, len(linhas))  # Pegar até 10 linhas
-    codigo_funcao = '\n'.join(linhas[inicio:fim])
-    
-    system_prompt = "Você é um assistente que analisa código Python e cria descrições concisas."
-    user_prompt = f"Descreva brevemente (1 frase) o que esta função faz:\n\n{codigo_funcao}"
-    
-    try:
-        return generate(api_key, system_prompt, user_prompt)
-    except:
-        return "Função sem descrição"
+    destino = {"descricao": ""}
+    resolver_pedidos(_preparar_descricao(destino, node, conteudo, "função"), api_key)
+    return destino["descricao"]
 
 
 def gerar_descricao_classe(node, conteudo, api_key):
     """
     Gera descrição para uma classe usando Cohere.
     """
-    docstring = ast.get_docstring(node)
-    if docstring:
-        return docstring.split('\n')[0]
-    
-    linhas = conteudo.split('\n')
-    inicio = node.lineno - 1
-    fim = min(inicio + 10, len(linhas))
-    codigo_classe = '\n'.join(linhas[inicio:fim])
-    
-    system_prompt = "Você é um assistente que analisa código Python e cria descrições concisas."
-    user_prompt = f"Descreva brevemente (1 frase) o propósito desta classe:\n\n{codigo_classe}"
-    
-    try:
-        return generate(api_key, system_prompt, user_prompt)
-    except:
-        return "Classe sem descrição"
+    destino = {"descricao": ""}
+    resolver_pedidos(_preparar_descricao(destino, node, conteudo, "classe"), api_key)
+    return destino["descricao"]
 
 
 # Exemplo de uso
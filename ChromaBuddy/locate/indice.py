@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Índice do projeto em SQLite (estrutura_projeto.db).
+
+Guarda o que o cltdds descobre em tabelas com índices: arquivos (caminho,
+tipo, hash, descrição e a info completa em JSON), símbolos (funções,
+classes, métodos e variáveis com linha e descrição) e uma tabela FTS5 com
+nomes e descrições para busca por palavras. As consultas por caminho, nome
+ou palavra não carregam o projeto inteiro na memória, e gravar um arquivo
+só reescreve as linhas dele (upsert), então o índice acompanha projetos
+grandes. O estrutura_projeto.json continua sendo exportado no fim de cada
+varredura para quem ainda o lê.
+
+Importe sempre como locate.indice (o mesmo nome usado pelo dds): com dois
+nomes o módulo carregaria duas vezes, com duas conexões e dois locks para o
+mesmo banco.
+
+Uso:
+    indice = abrir_indice(path)          # None se o projeto ainda não foi varrido
+    indice.buscar("cache de respostas")  # caminhos mais relevantes
+    indice.arquivo("models/cohe.py")     # info do arquivo, como no JSON
+"""
+
+import os
+import re
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+INDICE_ARQUIVO = 'estrutura_projeto.db'
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    caminho TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    tipo TEXT,
+    hash TEXT,
+    descricao TEXT,
+    pendente INTEGER NOT NULL DEFAULT 0,
+    ordem INTEGER NOT NULL DEFAULT 0,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS arquivos_ordem ON arquivos(ordem);
+CREATE INDEX IF NOT EXISTS arquivos_nome ON arquivos(nome);
+CREATE TABLE IF NOT EXISTS simbolos (
+    id INTEGER PRIMARY KEY,
+    caminho TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    classe TEXT,
+    linha INTEGER,
+    descricao TEXT
+);
+CREATE INDEX IF NOT EXISTS simbolos_nome ON simbolos(nome);
+CREATE INDEX IF NOT EXISTS simbolos_caminho ON simbolos(caminho);
+CREATE TABLE IF NOT EXISTS meta (
+    chave TEXT PRIMARY KEY,
+    valor TEXT
+);
+CREATE TABLE IF NOT EXISTS textos (
+    id INTEGER PRIMARY KEY,
+    caminho TEXT NOT NULL,
+    nome TEXT,
+    descricao TEXT
+);
+CREATE INDEX IF NOT EXISTS textos_caminho ON textos(caminho);
+"""
+
+# busca por palavras em nomes e descricoes de arquivos e simbolos, sem acentos; o conteudo fica em
+# textos (indexada por caminho), para remover as linhas de um arquivo sem varrer a tabela FTS
+_ESQUEMA_FTS = """
+CREATE VIRTUAL TABLE IF NOT EXISTS busca USING fts5(
+    nome, descricao, content='textos', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+class IndiceProjeto:
+    """
+    Índice SQLite de um projeto. Uma conexão compartilhada entre threads
+    (o Enriquecedor grava enquanto o chat consulta), protegida por um lock;
+    em modo WAL, outros processos podem ler durante a gravação.
+    """
+
+    def __init__(self, banco: str, path: Optional[str] = None):
+        self.banco = banco
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(banco, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            if banco != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_ESQUEMA)
+            try:
+                self._conn.executescript(_ESQUEMA_FTS)
+                self.fts = True
+            except sqlite3.OperationalError:
+                # sqlite sem FTS5: a busca cai para LIKE
+                self.fts = False
+            if path is not None:
+                self._set_meta("path", path)
+
+    @property
+    def path(self) -> str:
+        return self._meta("path") or os.path.dirname(os.path.abspath(self.banco))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # gravacao
+
+    def gravar(self, infos: Iterable[Dict[str, Any]], ordem: Optional[Dict[str, int]] = None) -> int:
+        """
+        Upsert dos arquivos (info como no estrutura_projeto.json) numa
+        transação só; arquivos iguais aos já gravados são pulados. `ordem`
+        ({caminho: posição}) mantém a ordem da varredura na exportação.
+        Devolve quantos arquivos mudaram.
+        """
+        with self._lock, self._conn:
+            mudados = self._gravar(infos, ordem)
+            if mudados:
+                self._set_meta("atualizado", str(time.time()))
+            return mudados
+
+    def _gravar(self, infos, ordem):
+        mudados = 0
+        for info in infos:
+            caminho = info.get("caminho")
+            if not caminho:
+                continue
+            dados = json.dumps(info, ensure_ascii=False)
+            posicao = (ordem or {}).get(caminho)
+            atual = self._conn.execute("SELECT dados, ordem FROM arquivos WHERE caminho = ?",
+                                       (caminho,)).fetchone()
+            if atual is not None and atual["dados"] == dados:
+                if posicao is not None and posicao != atual["ordem"]:
+                    self._conn.execute("UPDATE arquivos SET ordem = ? WHERE caminho = ?", (posicao, caminho))
+                continue
+            if posicao is None:
+                posicao = atual["ordem"] if atual is not None else self._proxima_ordem()
+            self._remover(caminho)
+            self._conn.execute(
+                "INSERT INTO arquivos (caminho, nome, tipo, hash, descricao, pendente, ordem, dados) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (caminho, info.get("nome") or os.path.basename(caminho), info.get("tipo"), info.get("hash"),
+                 info.get("descricao", ""), int(bool(info.get("pendente"))), posicao, dados))
+            self._gravar_simbolos(caminho, info)
+            mudados += 1
+        return mudados
+
+    def sincronizar(self, resultado: Dict[str, Any]) -> int:
+        """
+        Deixa o índice igual a `resultado` (saída do cltdds): upsert de cada
+        arquivo, remoção dos que sumiram do projeto e os dados da varredura.
+        """
+        estrutura = resultado.get("estrutura", [])
+        ordem = {info.get("caminho"): i for i, info in enumerate(estrutura)}
+        with self._lock, self._conn:
+            mudados = self._gravar(estrutura, ordem)
+            presentes = set(ordem)
+            for (caminho,) in self._conn.execute("SELECT caminho FROM arquivos").fetchall():
+                if caminho not in presentes:
+                    self._remover(caminho)
+                    mudados += 1
+            if resultado.get("path"):
+                self._set_meta("path", resultado["path"])
+            self._set_meta("varredura", json.dumps(resultado.get("varredura", {})))
+            self._set_meta("atualizado", str(time.time()))
+        return mudados
+
+    def _proxima_ordem(self) -> int:
+        return self._conn.execute("SELECT COALESCE(MAX(ordem), -1) + 1 FROM arquivos").fetchone()[0]
+
+    def _remover(self, caminho: str) -> None:
+        self._conn.execute("DELETE FROM arquivos WHERE caminho = ?", (caminho,))
+        self._conn.execute("DELETE FROM simbolos WHERE caminho = ?", (caminho,))
+        if self.fts:
+            self._conn.executemany(
+                "INSERT INTO busca (busca, rowid, nome, descricao) VALUES ('delete', ?, ?, ?)",
+                self._conn.execute("SELECT id, nome, descricao FROM textos WHERE caminho = ?", (caminho,)).fetchall())
+        self._conn.execute("DELETE FROM textos WHERE caminho = ?", (caminho,))
+
+    def _gravar_simbolos(self, caminho: str, info: Dict[str, Any]) -> None:
+        linhas = []
+        for funcao in info.get("funcoes", []):
+            linhas.append(("funcao", funcao.get("nome", ""), None, funcao.get("linha"), funcao.get("descricao", "")))
+        for classe in info.get("classes", []):
+            linhas.append(("classe", classe.get("nome", ""), None, classe.get("linha"), classe.get("descricao", "")))
+            for metodo in classe.get("metodos", []):
+                linhas.append(("metodo", metodo.get("nome", ""), classe.get("nome"), metodo.get("linha"), ""))
+        for variavel in info.get("variaveis", []):
+            linhas.append(("variavel", variavel.get("nome", ""), None, variavel.get("linha"), ""))
+        self._conn.executemany(
+            "INSERT INTO simbolos (caminho, tipo, nome, classe, linha, descricao) VALUES (?, ?, ?, ?, ?, ?)",
+            [(caminho,) + linha for linha in linhas])
+
+        # o nome do arquivo entra com as palavras do caminho (models/cohe.py -> models cohe py)
+        textos = [(caminho, " ".join(re.findall(r"\w+", caminho)), info.get("descricao", ""))]
+        textos += [(caminho, nome, descricao) for tipo, nome, _, _, descricao in linhas if tipo != "variavel"]
+        for texto in textos:
+            cursor = self._conn.execute("INSERT INTO textos (caminho, nome, descricao) VALUES (?, ?, ?)", texto)
+            if self.fts:
+                self._conn.execute("INSERT INTO busca (rowid, nome, descricao) VALUES (?, ?, ?)",
+                                   (cursor.lastrowid,) + texto[1:])
+
+    def _meta(self, chave: str) -> Optional[str]:
+        with self._lock:
+            linha = self._conn.execute("SELECT valor FROM meta WHERE chave = ?", (chave,)).fetchone()
+        return linha["valor"] if linha is not None else None
+
+    def _set_meta(self, chave: str, valor: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (chave, valor) VALUES (?, ?)", (chave, valor))
+
+    # consultas
+
+    def arquivo(self, caminho: str) -> Optional[Dict[str, Any]]:
+        """Info do arquivo (como no estrutura_projeto.json), ou None."""
+        with self._lock:
+            linha = self._conn.execute("SELECT dados FROM arquivos WHERE caminho = ?", (caminho,)).fetchone()
+        return json.loads(linha["dados"]) if linha is not None else None
+
+    def arquivos(self, limite: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Infos na ordem da varredura (os `limite` primeiros; None = todos)."""
+        sql = "SELECT dados FROM arquivos ORDER BY ordem"
+        with self._lock:
+            linhas = self._conn.execute(sql + " LIMIT ?", (limite,)).fetchall() if limite else \
+                self._conn.execute(sql).fetchall()
+        for linha in linhas:
+            yield json.loads(linha["dados"])
+
+    def procurar_caminho(self, trecho: str, limite: int = 20) -> List[str]:
+        """Caminhos que contêm `trecho` (ex.: o nome de um arquivo citado pelo modelo)."""
+        padrao = "%" + trecho.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT caminho FROM arquivos WHERE caminho LIKE ? ESCAPE '\\' ORDER BY ordem LIMIT ?",
+                (padrao, limite)).fetchall()
+        return [linha["caminho"] for linha in linhas]
+
+    def simbolos(self, nome: str) -> List[Dict[str, Any]]:
+        """Funções, classes, métodos e variáveis chamados `nome`, em qualquer arquivo."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT caminho, tipo, nome, classe, linha, descricao FROM simbolos WHERE nome = ? "
+                "ORDER BY caminho, linha", (nome,)).fetchall()
+        return [dict(linha) for linha in linhas]
+
+    def buscar(self, texto: str, limite: int = 10) -> List[str]:
+        """
+        Caminhos dos arquivos cujo caminho, descrição ou símbolos mais
+        combinam com as palavras de `texto` (ranking BM25 do FTS5, entre os
+        melhores nomes e descrições encontrados).
+        """
+        palavras = [p for p in re.findall(r"\w+", texto.lower()) if len(p) > 3]
+        if not palavras:
+            return []
+        with self._lock:
+            if self.fts:
+                consulta = " OR ".join(f'"{p}"*' for p in palavras)
+                linhas = self._conn.execute(
+                    "SELECT textos.caminho AS caminho, MIN(achados.pontos) AS pontos FROM "
+                    "(SELECT rowid, rank AS pontos FROM busca WHERE busca MATCH ? ORDER BY rank LIMIT ?) AS achados "
+                    "JOIN textos ON textos.id = achados.rowid "
+                    "GROUP BY textos.caminho ORDER BY pontos LIMIT ?", (consulta, limite * 20, limite)).fetchall()
+                return [linha["caminho"] for linha in linhas]
+            # sem FTS5: quantas palavras aparecem nos nomes e descricoes do arquivo
+            pontos = {}
+            for palavra in palavras:
+                padrao = f"%{palavra}%"
+                linhas = self._conn.execute(
+                    "SELECT DISTINCT caminho FROM textos WHERE lower(nome) LIKE ? OR lower(descricao) LIKE ?",
+                    (padrao, padrao)).fetchall()
+                for linha in linhas:
+                    pontos[linha["caminho"]] = pontos.get(linha["caminho"], 0) + 1
+        return [caminho for caminho, _ in sorted(pontos.items(), key=lambda item: -item[1])[:limite]]
+
+    def contar(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM arquivos").fetchone()[0]
+
+    def contar_por_tipo(self) -> Dict[str, int]:
+        """{tipo: arquivos} (arquivo_python, arquivo_generico...)."""
+        with self._lock:
+            linhas = self._conn.execute("SELECT COALESCE(tipo, 'desconhecido'), COUNT(*) FROM arquivos "
+                                        "GROUP BY tipo").fetchall()
+        return {tipo: total for tipo, total in linhas}
+
+    def pendentes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM arquivos WHERE pendente = 1").fetchone()[0]
+
+    def atualizado(self) -> Optional[float]:
+        """Momento (time.time()) da última gravação, ou None."""
+        valor = self._meta("atualizado")
+        return float(valor) if valor else None
+
+    def varredura(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self._meta("varredura") or "{}")
+        except ValueError:
+            return {}
+
+    # compatibilidade com o estrutura_projeto.json
+
+    def para_estrutura(self) -> Dict[str, Any]:
+        """O índice no formato do estrutura_projeto.json."""
+        resultado = {"path": self.path, "estrutura": list(self.arquivos())}
+        varredura = self.varredura()
+        if varredura:
+            resultado["varredura"] = varredura
+        return resultado
+
+    def exportar(self, destino: str) -> None:
+        """Grava o estrutura_projeto.json equivalente em `destino` (sem leitor ver o arquivo pela metade)."""
+        tmp = f"{destino}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.para_estrutura(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, destino)
+
+
+_indices: Dict[str, IndiceProjeto] = {}
+_indices_lock = threading.Lock()
+
+
+def abrir_indice(path: str, criar: bool = False) -> Optional[IndiceProjeto]:
+    """
+    Índice de `path` (uma instância por projeto, reaproveitada). Sem
+    estrutura_projeto.db, devolve None, ou cria um vazio com criar=True.
+    """
+    arquivo = os.path.join(os.path.abspath(path), INDICE_ARQUIVO)
+    with _indices_lock:
+        existe = os.path.exists(arquivo)
+        indice = _indices.get(arquivo)
+        if indice is not None:
+            if existe:
+                return indice
+            # apagado por fora: a conexao aponta para um arquivo que nao existe mais
+            indice.close()
+            del _indices[arquivo]
+        if not existe and not criar:
+            return None
+        try:
+            indice = IndiceProjeto(arquivo, path)
+        except sqlite3.Error:
+            return None
+        _indices[arquivo] = indice
+        return indice
+
+
+def indice_de_estrutura(estrutura: Dict[str, Any]) -> IndiceProjeto:
+    """Índice em memória montado a partir de um estrutura_projeto.json (projetos varridos antes do índice)."""
+    indice = IndiceProjeto(":memory:", estrutura.get("path"))
+    indice.sincronizar(estrutura)
+    return indice
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+Backends de LLM usados por models.cohe.generate.
+
+O backend é escolhido em config.json ("backend"):
+    cohere  API da Cohere (padrão)
+    openai  qualquer servidor compatível com /v1/chat/completions ("base_url")
+    local   servidor local determinístico (models/local_server.py), sem rede
+"""
+
+import json
+import math
+import threading
+import http.client
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+from models.resilience import CallHandle, LLMError
+
+LOCAL_BASE_URL = "http://127.0.0.1:8765/v1"
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+
+
+class Backend:
+    """
+    Interface comum. `params` contém: model, messages, max_tokens,
+    temperature (podem ser None), timeout em segundos e, opcionalmente,
+    handle (CallHandle) para a chamada poder ser cancelada de outra thread.
+    `cancellable` diz se o cancelamento interrompe mesmo a chamada em
+    andamento; sem isso o hedging fica desligado (a duplicata perdedora
+    continuaria gastando tokens até o fim).
+    """
+
+    name = ""
+    cancellable = False
+
+    def chat(self, api_key: str, params: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def chat_stream(self, api_key: str, params: Dict[str, Any]) -> Iterator[str]:
+        # backends sem streaming devolvem a resposta inteira como um unico trecho
+        yield self.chat(api_key, params)
+
+    def close(self) -> None:
+        pass
+
+
+class CohereBackend(Backend):
+    """API da Cohere: um ClientV2 por chave, com sessão HTTP keep-alive compartilhada."""
+
+    name = "cohere"
+
+    def __init__(self, timeout: float, connect_timeout: float, max_connections: int):
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_connections = max_connections
+        self._clients = {}
+        self._http_clients = []
+        self._lock = threading.Lock()
+
+    def get_client(self, api_key: str):
+        client = self._clients.get(api_key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                import cohere
+                import httpx
+
+                http = httpx.Client(
+                    timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                        keepalive_expiry=60.0,
+                    ),
+                )
+                client = cohere.ClientV2(api_key=api_key, httpx_client=http, timeout=self.timeout)
+                self._http_clients.append(http)
+                self._clients[api_key] = client
+            return client
+
+    def _request(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        request = {"model": params["model"], "messages": params["messages"]}
+        if params.get("max_tokens") is not None:
+            request["max_tokens"] = int(params["max_tokens"])
+        if params.get("temperature") is not None:
+            request["temperature"] = float(params["temperature"])
+        timeout = params.get("timeout") or self.timeout
+        handle = params.get("handle")
+        if handle is not None:
+            # o SDK nao expoe a requisicao para ser fechada de outra thread: com prazo,
+            # a propria requisicao expira nele em vez de seguir depois que quem chamou desistiu
+            if handle.cancelled:
+                raise LLMError("chamada cancelada", retryable=False)
+            timeout = handle.timeout(timeout)
+            if timeout <= 0:
+                raise LLMError("prazo esgotado antes da chamada", retryable=False)
+        request["request_options"] = {"timeout_in_seconds": max(1, math.ceil(timeout))}
+        return request
+
+    def chat(self, api_key: str, params: Dict[str, Any]) -> str:
+        resposta = self.get_client(api_key).chat(**self._request(params))
+        return resposta.message.content[0].text
+
+    def chat_stream(self, api_key: str, params: Dict[str, Any]) -> Iterator[str]:
+        handle = params.get("handle")
+        for event in self.get_client(api_key).chat_stream(**self._request(params)):
+            # sair do laco fecha o stream do SDK (e a resposta HTTP por baixo)
+            if handle is not None and handle.cancelled:
+                break
+            if getattr(event, "type", None) == "content-delta":
+                text = event.delta.message.content.text
+                if text:
+                    yield text
+
+    def close(self) -> None:
+        with self._lock:
+            for http in self._http_clients:
+                try:
+                    http.close()
+                except Exception:
+                    pass
+            self._http_clients.clear()
+            self._clients.clear()
+
+
+class OpenAICompatibleBackend(Backend):
+    """
+    Servidor compatível com a API de chat da OpenAI (OpenAI, vLLM, llama.cpp,
+    Ollama, servidor local...). Usa só a biblioteca padrão, com uma conexão
+    keep-alive por thread para as chamadas simples. Um stream pode começar
+    numa thread (a do pool de corrida) e ser lido em outra, então cada stream
+    leva a sua conexão, emprestada de um conjunto livre e devolvida no fim.
+    """
+
+    name = "openai"
+    cancellable = True
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url.rstrip("/"))
+        self.scheme = parts.scheme or "http"
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port
+        self.path = (parts.path or "") + "/chat/completions"
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._idle = []  # conexoes livres para os streams
+        self._lock = threading.Lock()
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=timeout)
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _set_timeout(conn: http.client.HTTPConnection, timeout: float) -> http.client.HTTPConnection:
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn
+
+    def _connection(self, timeout: float) -> http.client.HTTPConnection:
+        # chamadas simples: comecam e terminam na mesma thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._new_connection(timeout)
+        return self._set_timeout(conn, timeout)
+
+    def _checkout(self, timeout: float) -> http.client.HTTPConnection:
+        # streams: a conexao pertence ao gerador, nao a thread que o comecou
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._new_connection(timeout)
+        return self._set_timeout(conn, timeout)
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if conn in self._connections:
+                self._idle.append(conn)
+
+    def _post(self, api_key: str, body: Dict[str, Any], conn: http.client.HTTPConnection,
+              handle: Optional[CallHandle] = None) -> http.client.HTTPResponse:
+        payload = json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+
+        # uma nova tentativa se o servidor fechou a conexao ociosa (depois de close() a conexao reabre)
+        for attempt in (1, 2):
+            if handle is not None and handle.cancelled:
+                raise LLMError("chamada cancelada", retryable=False)
+            if handle is not None:
+                handle.attach(conn)
+            try:
+                conn.request("POST", self.path, body=payload, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if attempt == 2 or (handle is not None and handle.cancelled):
+                    raise
+                continue
+            except Exception:
+                conn.close()
+                raise
+
+            if response.status >= 400:
+                detail = response.read().decode("utf-8", "replace")[:300]
+                try:
+                    retry_after = float(response.getheader("Retry-After"))
+                except (TypeError, ValueError):
+                    retry_after = None
+                raise LLMError(f"HTTP {response.status}: {detail}", status=response.status,
+                               retry_after=retry_after)
+            return response
+
+    def _body(self, params: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        body = {"model": params["model"], "messages": params["messages"], "stream": stream}
+        if params.get("max_tokens") is not None:
+            body["max_tokens"] = int(params["max_tokens"])
+        if params.get("temperature") is not None:
+            body["temperature"] = float(params["temperature"])
+        return body
+
+    def chat(self, api_key: str, params: Dict[str, Any]) -> str:
+        timeout = params.get("timeout") or self.timeout
+        handle = params.get("handle")
+        conn = self._connection(timeout)
+        try:
+            response = self._post(api_key, self._body(params, stream=False), conn, handle)
+            data = json.loads(response.read().decode("utf-8"))
+        except Exception:
+            # leitura interrompida (cancelamento, timeout): a conexao nao pode ser reaproveitada
+            conn.close()
+            raise
+        finally:
+            if handle is not None:
+                handle.detach()
+        return data["choices"][0]["message"]["content"] or ""
+
+    def chat_stream(self, api_key: str, params: Dict[str, Any]) -> Iterator[str]:
+        timeout = params.get("timeout") or self.timeout
+        handle = params.get("handle")
+        conn = self._checkout(timeout)
+        try:
+            response = self._post(api_key, self._body(params, stream=True), conn, handle)
+            # server-sent events: linhas "data: {...}" terminando em "data: [DONE]"
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                line = line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+            # esvazia o resto da resposta para reaproveitar a conexao
+            response.read()
+        except BaseException:
+            # consumidor parou no meio (ou leitura cancelada): a conexao nao pode ser reaproveitada
+            conn.close()
+            raise
+        finally:
+            if handle is not None:
+                handle.detach()
+            self._checkin(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._idle.clear()
+
+
+def create_backend(settings: Dict[str, Any]) -> Backend:
+    """Cria o backend descrito por get_settings() (config.json)."""
+    name = (settings.get("backend") or "cohere").lower()
+    if name == "cohere":
+        return CohereBackend(settings["timeout"], settings["connect_timeout"], settings["max_connections"])
+    if name == "openai":
+        return OpenAICompatibleBackend(settings.get("base_url") or OPENAI_BASE_URL, settings["timeout"])
+    if name == "local":
+        return OpenAICompatibleBackend(settings.get("base_url") or LOCAL_BASE_URL, settings["timeout"])
+    raise ValueError(f"backend desconhecido: {name} (use cohere, openai ou local)")
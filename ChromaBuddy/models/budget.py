@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Orçamento e contabilidade de tokens dos prompts.
+
+    count_tokens     estimativa de tokens (tiktoken quando instalado, senão ~4 caracteres/token)
+    truncate_tokens  corta um texto em fim de linha para caber em N tokens
+    fit_sections     distribui um orçamento entre partes do prompt por prioridade
+    request_budget   limite de tokens para um pedido inteiro (várias chamadas)
+    get_usage        tokens de prompt/resposta por chamada e totais do processo
+
+No config.json:
+    "max_prompt_tokens": 8000       limite por chamada (o prompt é cortado no fim)
+    "request_token_budget": 0       limite por pedido do chat (0 = sem limite)
+"""
+
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from models.resilience import LLMError
+
+TRUNCATION_MARKER = "\n[... truncado ...]"
+
+# tokenizador exato e opcional; sem ele a estimativa por caracteres basta para orcamento
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens de um texto (exato com tiktoken, senão ~4 caracteres por token)."""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4)
+
+
+def count_messages(messages: Sequence[Dict[str, Any]]) -> int:
+    # ~4 tokens de estrutura por mensagem (papel e separadores)
+    return sum(count_tokens(str(m.get("content", ""))) + 4 for m in messages)
+
+
+def truncate_tokens(text: str, max_tokens: Optional[int], marker: str = TRUNCATION_MARKER,
+                    keep_end: bool = False) -> str:
+    """
+    Corta `text` para caber em `max_tokens`, de preferência em fim de linha, e
+    marca o corte. keep_end=True mantém o final (ex.: a última linha de um
+    traceback). Textos que já cabem (ou max_tokens None) voltam intactos.
+    """
+    if not text or max_tokens is None or count_tokens(text) <= max_tokens:
+        return text
+    marker = marker.strip("\n") + "\n" if keep_end else marker
+    room = max_tokens - count_tokens(marker)
+    if room <= 0:
+        return ""
+
+    # busca binaria pelo maior trecho que cabe
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[-mid:] if keep_end else text[:mid]) <= room:
+            low = mid
+        else:
+            high = mid - 1
+    if keep_end:
+        cut = text[len(text) - low:]
+        line_start = cut.find("\n")
+        if 0 <= line_start < len(cut) // 2:
+            cut = cut[line_start + 1:]
+        return marker + cut
+    cut = text[:low]
+    line_end = cut.rfind("\n")
+    if line_end > len(cut) // 2:
+        cut = cut[:line_end]
+    return cut + marker
+
+
+class Section:
+    """Parte de um prompt: maior `priority` é cortada por último; `min_tokens` é preservado quando possível."""
+
+    def __init__(self, name: str, text: str, priority: int = 0, min_tokens: int = 0):
+        self.name = name
+        self.text = text or ""
+        self.priority = priority
+        self.min_tokens = min_tokens
+
+
+def fit_sections(sections: List[Section], budget: Optional[int]) -> Dict[str, str]:
+    """
+    Corta as partes de menor prioridade primeiro até o total caber em `budget`
+    tokens; devolve {nome: texto}. Entre partes de mesma prioridade, as do fim
+    da lista são cortadas antes. budget None não corta nada.
+    """
+    result = {s.name: s.text for s in sections}
+    if budget is None:
+        return result
+    sizes = {s.name: count_tokens(s.text) for s in sections}
+    excess = sum(sizes.values()) - budget
+    if excess <= 0:
+        return result
+
+    order = sorted(range(len(sections)), key=lambda i: (sections[i].priority, -i))
+    # primeira passada respeita min_tokens; a segunda corta o que faltar
+    for keep_minimum in (True, False):
+        for i in order:
+            if excess <= 0:
+                return result
+            section = sections[i]
+            floor = min(section.min_tokens, sizes[section.name]) if keep_minimum else 0
+            removable = sizes[section.name] - floor
+            if removable <= 0:
+                continue
+            target = sizes[section.name] - min(removable, excess)
+            result[section.name] = truncate_tokens(result[section.name], target) if target > 0 else ""
+            new_size = count_tokens(result[section.name])
+            excess -= sizes[section.name] - new_size
+            sizes[section.name] = new_size
+    return result
+
+
+class BudgetExceeded(LLMError):
+    """Pedido recusado sem ir à rede: orçamento de tokens esgotado ou prompt grande demais."""
+
+    def __init__(self, message: str):
+        super().__init__(message, retryable=False)
+
+
+class Usage:
+    """Contabilidade de tokens: totais e as últimas chamadas."""
+
+    def __init__(self, limit: int = 0, history: int = 200):
+        self.limit = limit
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.truncated = 0
+        self.recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def remaining(self) -> Optional[int]:
+        if not self.limit:
+            return None
+        with self._lock:
+            return self.limit - self.total_tokens
+
+    def add(self, model: str, prompt_tokens: int, completion_tokens: int, truncated: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.truncated += int(truncated)
+            self.recent.append({"model": model, "prompt_tokens": prompt_tokens,
+                                "completion_tokens": completion_tokens, "truncated": truncated})
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"calls": self.calls, "prompt_tokens": self.prompt_tokens,
+                    "completion_tokens": self.completion_tokens, "total_tokens": self.total_tokens,
+                    "truncated": self.truncated, "limit": self.limit}
+
+
+# totais do processo e o orcamento do pedido em andamento (se houver)
+_usage = Usage()
+_request: contextvars.ContextVar = contextvars.ContextVar("chromabuddy_request_budget", default=None)
+
+
+def get_usage() -> Usage:
+    return _usage
+
+
+def current_request() -> Optional[Usage]:
+    return _request.get()
+
+
+@contextmanager
+def request_budget(limit: int = 0) -> Iterator[Usage]:
+    """
+    Contabiliza os tokens de todas as chamadas feitas dentro do bloco,
+    inclusive as de generate_many. Com `limit` > 0, novas chamadas são
+    recusadas depois que o total passa do limite (as que já estão em
+    andamento terminam).
+    """
+    usage = Usage(limit)
+    token = _request.set(usage)
+    try:
+        yield usage
+    finally:
+        _request.reset(token)
+
+
+def record(model: str, prompt_tokens: int, completion_tokens: int, truncated: bool = False) -> None:
+    _usage.add(model, prompt_tokens, completion_tokens, truncated)
+    request = _request.get()
+    if request is not None:
+        request.add(model, prompt_tokens, completion_tokens, truncated)
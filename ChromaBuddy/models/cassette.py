@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação e reprodução (cassete) das chamadas ao LLM.
+
+Em modo "record" cada pedido passa pelo backend real e a resposta é gravada
+(hash do prompt normalizado e do modelo -> resposta, latência e tokens estimados) em um
+arquivo JSONL. Em modo "replay" as respostas vêm do arquivo, sem rede, e
+opcionalmente com a latência gravada. "auto" reproduz o que existe e grava o
+que faltar.
+
+No config.json:
+    "cassette": "caminho/para/chamadas.jsonl",
+    "cassette_mode": "record" | "replay" | "auto",
+    "cassette_latency": true
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Iterator, Optional
+
+from models.backends import Backend
+from models.budget import count_tokens
+
+MODES = ("record", "replay", "auto")
+
+
+class CassetteMiss(LookupError):
+    """Pedido sem resposta gravada no cassete (modo replay)."""
+
+
+def normalize(text: str) -> str:
+    # espacos repetidos e quebras de linha nas pontas nao mudam a resposta esperada
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def request_key(params: Dict[str, Any]) -> str:
+    """
+    Hash do prompt normalizado (mensagens, na ordem) e dos parâmetros que
+    mudam a resposta: modelo (o mesmo prompt pode ir ao modelo rápido ou ao
+    padrão, ver route), max_tokens e temperature.
+    """
+    messages = [[m.get("role", ""), normalize(str(m.get("content", "")))] for m in params["messages"]]
+    payload = {"messages": messages, "model": params.get("model"),
+               "max_tokens": params.get("max_tokens"), "temperature": params.get("temperature")}
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    # mesma contagem do orcamento de tokens (models.budget)
+    return count_tokens(text)
+
+
+class Cassette:
+    """Arquivo JSONL de chamadas; a última gravação de cada chave vale."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        self.entries.clear()
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+                except (ValueError, KeyError):
+                    continue  # linha truncada (ex.: processo interrompido durante a gravacao)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.entries[entry["key"]] = entry
+            folder = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(folder, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def compact(self) -> int:
+        """Reescreve o arquivo só com a última gravação de cada chave; devolve o total."""
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
+            return len(self.entries)
+
+
+class CassetteBackend(Backend):
+    """Envolve outro backend gravando ou reproduzindo as chamadas."""
+
+    name = "cassette"
+
+    def __init__(self, inner: Backend, path: str, mode: str = "replay", replay_latency: bool = False):
+        if mode not in MODES:
+            raise ValueError(f"modo de cassete desconhecido: {mode} (use {', '.join(MODES)})")
+        self.inner = inner
+        self.cassette = Cassette(path)
+        self.mode = mode
+        self.replay_latency = replay_latency
+
+    @property
+    def cancellable(self) -> bool:
+        return self.inner.cancellable
+
+    def _lookup(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.mode == "record":
+            return None
+        entry = self.cassette.get(request_key(params))
+        if entry is None and self.mode == "replay":
+            raise CassetteMiss(f"pedido não gravado no cassete {self.cassette.path}")
+        return entry
+
+    def _entry(self, params: Dict[str, Any], response: str, latency: float,
+               first_token: Optional[float] = None) -> Dict[str, Any]:
+        prompt = " ".join(str(m.get("content", "")) for m in params["messages"])
+        return {
+            "key": request_key(params),
+            "model": params.get("model"),
+            "response": response,
+            "latency": round(latency, 4),
+            "first_token": round(first_token, 4) if first_token is not None else None,
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(response),
+        }
+
+    def chat(self, api_key: str, params: Dict[str, Any]) -> str:
+        entry = self._lookup(params)
+        if entry is not None:
+            if self.replay_latency and entry.get("latency"):
+                time.sleep(entry["latency"])
+            return entry["response"]
+
+        start = time.perf_counter()
+        response = self.inner.chat(api_key, params)
+        self.cassette.record(self._entry(params, response, time.perf_counter() - start))
+        return response
+
+    def chat_stream(self, api_key: str, params: Dict[str, Any]) -> Iterator[str]:
+        entry = self._lookup(params)
+        if entry is not None:
+            yield from self._replay_stream(entry)
+            return
+
+        start = time.perf_counter()
+        first_token = None
+        parts = []
+        for chunk in self.inner.chat_stream(api_key, params):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            parts.append(chunk)
+            yield chunk
+        # so grava respostas completas (o consumidor pode parar no meio)
+        self.cassette.record(self._entry(params, "".join(parts), time.perf_counter() - start, first_token))
+
+    def _replay_stream(self, entry: Dict[str, Any]) -> Iterator[str]:
+        words = re.findall(r"\S+\s*|\s+", entry["response"])
+        if not self.replay_latency or not words:
+            yield from words
+            return
+
+        # reproduz o tempo ate o primeiro trecho e distribui o resto entre os trechos
+        latency = entry.get("latency") or 0.0
+        first = entry.get("first_token")
+        first = latency if first is None else first
+        step = max(0.0, latency - first) / max(1, len(words) - 1)
+        time.sleep(first)
+        for i, word in enumerate(words):
+            if i and step:
+                time.sleep(step)
+            yield word
+
+    def close(self) -> None:
+        self.inner.close()
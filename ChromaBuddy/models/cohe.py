@@ -1,27 +1,664 @@
 # -*- coding: utf-8 -*-
-import cohere
+import os
+import json
+import time
+import atexit
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
 
-def generate(api_key: str, system_prompt: str, user_prompt: str) -> str:
+from models.backends import Backend, create_backend
+from models.cassette import CassetteBackend
+from models.response_cache import DEFAULT_DIR as RESPONSE_CACHE_DIR, ResponseCache, response_key
+from models.budget import (BudgetExceeded, count_messages, count_tokens, current_request, get_usage,
+                           record, request_budget, truncate_tokens)
+from models.telemetry import CallTrace, caller_label, get_telemetry
+from models.singleflight import SingleFlight, WaitTimeout
+from models.resilience import (LLMError, LLMErrorResult, TokenBucket, CircuitBreaker, CallHandle,
+                               DeadlineExceeded, StepDisabled, backoff_delay, classify, is_error, skipped,
+                               timed_out, unwrap)
+
+# valores usados quando o config.json nao define a chave
+DEFAULT_MODEL = "command-a-03-2025"
+# modelo rapido quando "fast_model" fica vazio (nos outros backends os passos "fast" usam "model")
+DEFAULT_FAST_MODELS = {"cohere": "command-r7b-12-2024"}
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_MAX_CONNECTIONS = 10
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_MAX_PROMPT_TOKENS = 8000
+
+# modelo de cada passo (step= no generate): "fast", "default" (a chave "model"), "none" ou o nome de um
+# modelo; passos que so resumem/classificam vao ao modelo rapido e os que reescrevem codigo ao principal
+DEFAULT_ROUTES = {
+    "summarize": "fast",
+    "rank": "fast",
+    "describe": "fast",
+    "plan": "default",
+    "rewrite": "default",
+    "fix": "default",
+    "celebrate": "none",
+}
+
+# configuracao lida do config.json, recarregada quando o arquivo muda
+_config: Dict[str, Any] = {}
+_settings: Dict[str, Any] = {}
+_settings_mtime: Optional[float] = None
+_settings_lock = threading.Lock()
+# ajustes feitos em tempo de execucao (configure), aplicados sobre o config.json
+_overrides: Dict[str, Any] = {}
+
+# backend compartilhado pelo processo (clientes e conexoes keep-alive)
+_backend: Optional[Backend] = None
+_backend_key = None
+_backend_lock = threading.Lock()
+
+# limite de taxa e circuit breaker compartilhados por todas as chamadas
+_bucket: Optional[TokenBucket] = None
+_breaker: Optional[CircuitBreaker] = None
+_guards_key = None
+
+# cache de respostas compartilhado pelo processo
+_response_cache: Optional[ResponseCache] = None
+_response_cache_key = None
+
+# chamadas identicas em andamento (uma so vai ao modelo)
+_flights = SingleFlight()
+
+
+def _config_path() -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.json")
+
+
+def get_settings() -> Dict[str, Any]:
+    """Backend, modelo, max_tokens, temperature e timeouts do config.json (o mesmo do ConfigManager)."""
+    global _config, _settings, _settings_mtime
+    path = _config_path()
     try:
-        # Inicializar cliente
-        co = cohere.ClientV2(api_key)
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+
+    with _settings_lock:
+        if _settings and mtime == _settings_mtime:
+            return _settings
+        # le o arquivo direto: importar core.config carregaria todo o pacote core
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            config = {}
+        if not isinstance(config, dict):
+            config = {}
+        config = _config = {**config, **_overrides}
+
+        _settings = {
+            "backend": (config.get("backend") or "cohere").lower(),
+            "base_url": config.get("base_url") or "",
+            "model": config.get("model") or DEFAULT_MODEL,
+            # modelo rapido dos passos "fast" ("" = o padrao do backend, ou o mesmo de "model")
+            "fast_model": config.get("fast_model") or "",
+            "routes": {**DEFAULT_ROUTES, **(config.get("routes") or {})},
+            "max_tokens": config.get("max_tokens"),
+            "temperature": config.get("temperature"),
+            "timeout": float(config.get("timeout", DEFAULT_TIMEOUT)),
+            "connect_timeout": float(config.get("connect_timeout", DEFAULT_CONNECT_TIMEOUT)),
+            "max_connections": int(config.get("max_connections", DEFAULT_MAX_CONNECTIONS)),
+            "concurrency": max(1, int(config.get("concurrency", DEFAULT_CONCURRENCY))),
+            "max_retries": max(0, int(config.get("max_retries", DEFAULT_MAX_RETRIES))),
+            # 0 = sem limite; use o limite de pedidos por minuto do provedor
+            "requests_per_minute": float(config.get("requests_per_minute", 0) or 0),
+            "rate_burst": config.get("rate_burst"),
+            "breaker_threshold": int(config.get("breaker_threshold", 5)),
+            "breaker_reset": float(config.get("breaker_reset", 30)),
+            # 0 = sem limite; prompts maiores sao cortados no fim da mensagem do usuario
+            "max_prompt_tokens": int(config.get("max_prompt_tokens", DEFAULT_MAX_PROMPT_TOKENS) or 0),
+            "request_token_budget": int(config.get("request_token_budget", 0) or 0),
+            # cache de respostas (models/response_cache.py); desligado junto com "cache_enabled"
+            "response_cache": bool(config.get("response_cache", config.get("cache_enabled", True))),
+            "response_cache_ttl": float(config.get("response_cache_ttl", 7 * 24 * 3600)),
+            "response_cache_max_entries": int(config.get("response_cache_max_entries", 5000)),
+            "response_cache_dir": config.get("response_cache_dir") or RESPONSE_CACHE_DIR,
+            # pedidos identicos simultaneos compartilham uma chamada (models/singleflight.py)
+            "coalesce": bool(config.get("coalesce", True)),
+            # hedging: duplica chamadas lentas (p95 do local de origem, ou "hedge_after" segundos)
+            "hedge": bool(config.get("hedge", False)),
+            "hedge_after": float(config.get("hedge_after", 0) or 0),
+            "hedge_min_samples": int(config.get("hedge_min_samples", 20)),
+            # telemetria: arquivo JSONL com um evento por chamada ("" = desligado)
+            "trace_file": config.get("trace_file") or "",
+            "cassette": config.get("cassette") or "",
+            "cassette_mode": (config.get("cassette_mode") or "replay").lower(),
+            "cassette_latency": bool(config.get("cassette_latency", False)),
+        }
+        _settings_mtime = mtime
+        return _settings
+
+
+def get_config() -> Dict[str, Any]:
+    """
+    Chaves do config.json com os ajustes de configure(), para os módulos que
+    montam as suas próprias opções (ex.: locate/dds.py). Não altere o dict.
+    """
+    get_settings()
+    return _config
+
+
+def configure(**overrides) -> None:
+    """
+    Ajusta a configuração só neste processo, sem alterar o config.json
+    (ex.: configure(backend="local", base_url="http://127.0.0.1:8765/v1")).
+    Valores None removem o ajuste.
+    """
+    global _settings
+    with _settings_lock:
+        for key, value in overrides.items():
+            if value is None:
+                _overrides.pop(key, None)
+            else:
+                _overrides[key] = value
+        _settings = {}
+
+
+def get_backend() -> Backend:
+    """Backend configurado; recriado quando backend, base_url, limites ou cassete mudam."""
+    global _backend, _backend_key
+    settings = get_settings()
+    key = (settings["backend"], settings["base_url"], settings["timeout"],
+           settings["connect_timeout"], settings["max_connections"],
+           settings["cassette"], settings["cassette_mode"], settings["cassette_latency"])
+
+    with _backend_lock:
+        if _backend is None or key != _backend_key:
+            if _backend is not None:
+                _backend.close()
+            _backend = create_backend(settings)
+            # cassete: grava ou reproduz as chamadas do backend configurado
+            if settings["cassette"]:
+                _backend = CassetteBackend(_backend, settings["cassette"], settings["cassette_mode"],
+                                           settings["cassette_latency"])
+            _backend_key = key
+        return _backend
+
+
+def get_guards():
+    """(TokenBucket, CircuitBreaker) do processo; recriados quando os limites mudam no config.json."""
+    global _bucket, _breaker, _guards_key
+    settings = get_settings()
+    key = (settings["requests_per_minute"], settings["rate_burst"],
+           settings["breaker_threshold"], settings["breaker_reset"])
+    with _backend_lock:
+        if _bucket is None or key != _guards_key:
+            rate = settings["requests_per_minute"] / 60.0
+            burst = settings["rate_burst"] or settings["concurrency"]
+            _bucket = TokenBucket(rate, float(burst))
+            _breaker = CircuitBreaker(settings["breaker_threshold"], settings["breaker_reset"])
+            _guards_key = key
+        return _bucket, _breaker
+
+
+def get_response_cache() -> ResponseCache:
+    """Cache de respostas do processo; recriado quando pasta, validade ou limite mudam."""
+    global _response_cache, _response_cache_key
+    settings = get_settings()
+    key = (settings["response_cache_dir"], settings["response_cache_ttl"], settings["response_cache_max_entries"])
+    with _backend_lock:
+        if _response_cache is None or key != _response_cache_key:
+            _response_cache = ResponseCache(*key)
+            _response_cache_key = key
+        return _response_cache
+
+
+def _cache_key(params: Dict[str, Any], cache: bool) -> Optional[str]:
+    # None quando o cache esta desligado (config.json ou cache=False na chamada) e com cassete:
+    # o cassete fica dentro do backend, entao um acerto do cache nao seria gravado nem reproduzido
+    settings = get_settings()
+    if not cache or not settings["response_cache"] or settings["cassette"]:
+        return None
+    return response_key(settings["backend"], settings["base_url"], params)
+
+
+def get_flights() -> SingleFlight:
+    return _flights
+
+
+def _flight_key(params: Dict[str, Any], cache: bool) -> Optional[str]:
+    # mesma chave do cache de respostas; cache=False (quer outra resposta) nunca e agrupado,
+    # nem com cassete (cada chamada precisa passar pelo backend para ser gravada/reproduzida)
+    settings = get_settings()
+    if not cache or not settings["coalesce"] or settings["cassette"]:
+        return None
+    return response_key(settings["backend"], settings["base_url"], params)
+
+
+def _remaining(deadline_at: Optional[float]) -> Optional[float]:
+    return None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+
+
+def _with_retries(call, trace: Optional[CallTrace] = None, deadline: Optional[float] = None,
+                  hedge_after: Optional[float] = None):
+    """
+    Executa call(handle) respeitando o limite de taxa e o circuit breaker, com
+    novas tentativas (backoff exponencial com jitter, ou o Retry-After do
+    provedor) em 429, 5xx e falhas de rede. As novas tentativas são contadas
+    em `trace`. Com `deadline` (segundos) o conjunto das tentativas tem prazo
+    máximo; com `hedge_after`, cada tentativa ganha uma duplicata se passar
+    desse tempo (ver _attempt).
+    """
+    settings = get_settings()
+    bucket, breaker = get_guards()
+    deadline_at = time.monotonic() + deadline if deadline else None
+    attempt = 0
+    while True:
+        breaker.before_call()
+        if not bucket.acquire(_remaining(deadline_at)):
+            breaker.record_abandoned()
+            raise DeadlineExceeded(deadline)
+        try:
+            result = _attempt(call, bucket, trace, deadline, deadline_at, hedge_after)
+        except DeadlineExceeded:
+            # o prazo e escolha de quem chamou (ex.: 10s do tokenizer): nao e falha do provedor
+            breaker.record_abandoned()
+            raise
+        except Exception as e:
+            retryable, status, retry_after = classify(e)
+            if not retryable:
+                # o servico respondeu (ex.: 400/401): nao conta como indisponibilidade
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= settings["max_retries"]:
+                raise
+            delay = retry_after if retry_after is not None else backoff_delay(attempt)
+            if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                raise DeadlineExceeded(deadline) from e
+            time.sleep(delay)
+            attempt += 1
+            if trace is not None:
+                trace.retries = attempt
+            continue
+        breaker.record_success()
+        return result
+
+
+def _attempt(call, bucket: TokenBucket, trace: Optional[CallTrace], deadline: Optional[float],
+             deadline_at: Optional[float], hedge_after: Optional[float]):
+    """
+    Uma tentativa. Sem prazo nem hedging roda na thread atual; senão roda no
+    pool de corrida: ao passar de `hedge_after` segundos sai uma duplicata (se
+    o limite de taxa permitir), vale a primeira que terminar e as outras são
+    canceladas; ao fim do prazo todas são canceladas.
+    """
+    if deadline_at is None and not hedge_after:
+        return call(None)
+
+    pool = _get_race_executor()
+    started = time.monotonic()
+    running = {}  # future -> CallHandle
+    error = None
+
+    def launch():
+        handle = CallHandle(deadline_at)
+        running[pool.submit(call, handle)] = handle
+
+    launch()
+    pending = set(running)
+    try:
+        while pending:
+            can_hedge = bool(hedge_after) and len(running) == 1
+            waits = [] if deadline_at is None else [deadline_at - time.monotonic()]
+            if can_hedge:
+                waits.append(started + hedge_after - time.monotonic())
+            done, pending = wait(pending, timeout=max(0.0, min(waits)) if waits else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    # a vencedora nao e cancelada (um stream continua lendo pela conexao dela)
+                    running.pop(future)
+                    return future.result()
+                error = future.exception()
+            if done:
+                continue
+            if deadline_at is not None and time.monotonic() >= deadline_at:
+                raise DeadlineExceeded(deadline)
+            if can_hedge and bucket.acquire(0):
+                launch()
+                pending = {f for f in running if not f.done()}
+                if trace is not None:
+                    trace.hedged = True
+            elif can_hedge:
+                hedge_after = None  # sem ficha no limite de taxa: segue so com a original
+        raise error
+    finally:
+        # perdedoras: as que ainda estao na fila nem comecam; as em andamento sao interrompidas
+        for future, handle in running.items():
+            future.cancel()
+            handle.cancel()
+
+
+def _hedge_delay(label: str, hedge: Optional[bool]) -> Optional[float]:
+    # segundos ate a duplicata: "hedge_after" fixo ou o p95 das chamadas deste local de origem
+    settings = get_settings()
+    if not (settings["hedge"] if hedge is None else hedge):
+        return None
+    # backend que nao interrompe a chamada perdedora: a duplicata so dobraria o gasto
+    if not get_backend().cancellable:
+        return None
+    if settings["hedge_after"] > 0:
+        return settings["hedge_after"]
+    return get_telemetry().upstream_percentile(label, 95, settings["hedge_min_samples"])
+
+
+def close_clients() -> None:
+    """Fecha as conexões abertas do backend."""
+    global _executor, _race_executor, _backend
+    with _executor_lock:
+        for pool in (_executor, _race_executor):
+            if pool is not None:
+                pool.shutdown(wait=False)
+        _executor = _race_executor = None
+    with _backend_lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
+
 
-        # Criar lista de mensagens
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt}
-        ]
+atexit.register(close_clients)
 
-        # Fazer a requisição usando o método chat
-        resposta = co.chat(
-            model="command-a-03-2025",
-            messages=messages
-        )
 
-        return resposta.message.content[0].text
+def route(step: Optional[str]) -> Optional[str]:
+    """
+    Modelo do passo `step` segundo "routes" no config.json; None quando o passo
+    está configurado sem modelo ("none"). Passos sem rota usam "model".
+    """
+    settings = get_settings()
+    target = settings["routes"].get(step, "default") if step else "default"
+    target = (target or "default").strip()
+    if target.lower() == "none":
+        return None
+    if target.lower() == "fast":
+        return (settings["fast_model"] or DEFAULT_FAST_MODELS.get(settings["backend"])
+                or settings["model"])
+    if target.lower() == "default":
+        return settings["model"]
+    return target
 
+
+def _chat_params(system_prompt: str, user_prompt: str, model: Optional[str], max_tokens: Optional[int],
+                 temperature: Optional[float], timeout: Optional[float]) -> Dict[str, Any]:
+    settings = get_settings()
+
+    # Criar lista de mensagens
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+    # parametros da chamada: argumentos explicitos > config.json > padrao da API
+    return {
+        "model": model or settings["model"],
+        "messages": messages,
+        "max_tokens": max_tokens if max_tokens is not None else settings["max_tokens"],
+        "temperature": temperature if temperature is not None else settings["temperature"],
+        "timeout": timeout or settings["timeout"],
+    }
+
+
+def _prompt_limit() -> int:
+    # limite por chamada, reduzido ao que resta do orcamento do pedido em andamento (0 = sem limite)
+    limit = get_settings()["max_prompt_tokens"]
+    request = current_request()
+    remaining = request.remaining() if request is not None else None
+    if remaining is not None:
+        if remaining <= 0:
+            raise BudgetExceeded(f"orçamento de {request.limit} tokens do pedido esgotado")
+        limit = min(limit, remaining) if limit else remaining
+    return limit
+
+
+def _apply_budget(params: Dict[str, Any], truncate: bool = True):
+    """
+    Aplica o limite de tokens por chamada (max_prompt_tokens) e o que resta do
+    orçamento do pedido em andamento (request_budget), cortando o fim da
+    mensagem do usuário (ou recusando, com truncate=False). Devolve
+    (tokens do prompt, se foi cortado).
+    """
+    limit = _prompt_limit()
+    prompt_tokens = count_messages(params["messages"])
+    if not limit or prompt_tokens <= limit:
+        return prompt_tokens, False
+
+    if not truncate:
+        raise BudgetExceeded(f"prompt de {prompt_tokens} tokens excede o limite de {limit} tokens")
+    system, user = params["messages"]
+    room = limit - count_messages([system, {"content": ""}])
+    if room <= 0:
+        raise BudgetExceeded(f"prompt de sistema maior que o limite de {limit} tokens")
+    user["content"] = truncate_tokens(user["content"], room)
+    return count_messages(params["messages"]), True
+
+
+def prompt_room(system_prompt: str = "", template: str = "") -> Optional[int]:
+    """
+    Tokens disponíveis para o conteúdo variável da mensagem do usuário, dado o
+    prompt de sistema e o texto fixo em volta (None = sem limite).
+    """
+    try:
+        limit = _prompt_limit()
+    except BudgetExceeded:
+        return 1
+    if not limit:
+        return None
+    used = count_messages([{"content": system_prompt}, {"content": template}])
+    return max(1, limit - used)
+
+
+def _record_call(event: Dict[str, Any]) -> None:
+    get_telemetry().record(event, get_settings()["trace_file"])
+
+
+def generate(api_key: str, system_prompt: str, user_prompt: str,
+             model: Optional[str] = None, max_tokens: Optional[int] = None,
+             temperature: Optional[float] = None, timeout: Optional[float] = None,
+             stream: bool = False, truncate: bool = True, cache: bool = True,
+             label: Optional[str] = None, deadline: Optional[float] = None,
+             hedge: Optional[bool] = None, step: Optional[str] = None) -> Union[str, Iterator[str]]:
+    # stream=True devolve um iterador de trechos de texto (ver generate_stream)
+    # truncate=False: prompt acima do limite vira erro em vez de ser cortado
+    # (para quem pede o arquivo inteiro de volta e gravaria uma versao cortada)
+    # cache=False: sempre vai ao modelo (ex.: novas tentativas que precisam de outra resposta)
+    # label: nome do local de origem na telemetria (padrao: modulo:funcao de quem chamou)
+    # deadline: prazo maximo em segundos (novas tentativas incluidas); depois disso vem um erro
+    # DeadlineExceeded e quem chamou usa a sua alternativa barata
+    # hedge: liga/desliga a duplicata de chamadas lentas so nesta chamada (padrao: "hedge" do config)
+    # step: nome do passo ("summarize", "rewrite"...) que escolhe o modelo em "routes"; model= explicito vence;
+    # passo sem modelo devolve um erro StepDisabled sem ir a rede (reconhecivel com skipped())
+    label = label or caller_label()
+    if stream:
+        return generate_stream(api_key, system_prompt, user_prompt, model, max_tokens, temperature, timeout,
+                               truncate, cache, label, deadline, step)
+
+    if model is None and step:
+        model = route(step)
+        if model is None:
+            return LLMErrorResult(StepDisabled(step))
+    trace = CallTrace(label, False, _record_call)
+    try:
+        params = _chat_params(system_prompt, user_prompt, model, max_tokens, temperature, timeout)
+        prompt_tokens, truncated = _apply_budget(params, truncate)
+        trace.prompt(params, prompt_tokens, truncated)
+        key = _cache_key(params, cache)
+        if key is not None:
+            cached = get_response_cache().get(key)
+            trace.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                trace.finish(cached)
+                return cached
+
+        def call():
+            text = _with_retries(lambda handle: get_backend().chat(api_key, dict(params, handle=handle)),
+                                 trace, deadline, _hedge_delay(label, hedge))
+            record(params["model"], prompt_tokens, count_tokens(text), truncated)
+            # grava antes de liberar quem espera: quem chegar depois ja encontra no cache
+            if key is not None:
+                get_response_cache().set(key, text)
+            return text
+
+        flight = _flight_key(params, cache)
+        if flight is None:
+            text = call()
+        else:
+            try:
+                text, trace.coalesced = _flights.do(flight, call, deadline)
+            except WaitTimeout:
+                raise DeadlineExceeded(deadline)
+        # quem recebeu a resposta compartilhada nao gastou tokens
+        trace.finish(text, 0 if trace.coalesced else count_tokens(text))
+        return text
+
+    except Exception as e:
+        trace.fail(e)
+        # erro tipado: continua sendo o texto "Erro ao gerar resposta: ...", reconhecivel com is_error()
+        return LLMErrorResult(e)
+
+
+def generate_stream(api_key: str, system_prompt: str, user_prompt: str,
+                    model: Optional[str] = None, max_tokens: Optional[int] = None,
+                    temperature: Optional[float] = None, timeout: Optional[float] = None,
+                    truncate: bool = True, cache: bool = True, label: Optional[str] = None,
+                    deadline: Optional[float] = None, step: Optional[str] = None) -> Iterator[str]:
+    """
+    Igual ao generate, mas devolve os trechos de texto à medida que o modelo os
+    produz. Erros viram um trecho final LLMErrorResult, como no generate; só
+    há novas tentativas antes do primeiro trecho, e `deadline` vale até ele.
+    """
+    if model is None and step:
+        model = route(step)
+        if model is None:
+            return iter([LLMErrorResult(StepDisabled(step))])
+    # o label e resolvido aqui: dentro do gerador a pilha seria a de quem consome os trechos
+    trace = CallTrace(label or caller_label(), True, _record_call)
+    return _stream(api_key, _chat_params(system_prompt, user_prompt, model, max_tokens, temperature, timeout),
+                   truncate, cache, trace, deadline)
+
+
+def _stream(api_key: str, params: Dict[str, Any], truncate: bool, cache: bool, trace: CallTrace,
+            deadline: Optional[float]) -> Iterator[str]:
+    parts = []
+    trace.start = time.perf_counter()  # o relogio comeca quando o consumidor pede o primeiro trecho
+    try:
+        prompt_tokens, truncated = _apply_budget(params, truncate)
+        trace.prompt(params, prompt_tokens, truncated)
+        key = _cache_key(params, cache)
+        if key is not None:
+            cached = get_response_cache().get(key)
+            trace.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                trace.mark_first_token()
+                trace.finish(cached)
+                yield cached
+                return
+
+        def start(handle):
+            chunks = iter(get_backend().chat_stream(api_key, dict(params, handle=handle)))
+            return next(chunks, None), chunks
+
+        first, chunks = _with_retries(start, trace, deadline)
+        trace.mark_first_token()
+        if first is not None:
+            parts.append(first)
+            yield first
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        text = "".join(parts)
+        completion_tokens = count_tokens(text)
+        record(params["model"], prompt_tokens, completion_tokens, truncated)
+        # so respostas completas vao para o cache (o consumidor pode parar no meio)
+        if key is not None:
+            get_response_cache().set(key, text)
+        trace.finish(text, completion_tokens)
+
+    except GeneratorExit:
+        # consumidor parou no meio: mede o que chegou
+        trace.finish("".join(parts), count_tokens("".join(parts)))
+        raise
     except Exception as e:
-        return f"Erro ao gerar resposta: {str(e)}"
+        trace.fail(e)
+        yield LLMErrorResult(e)
+
+
+# pedido para generate_many: (system_prompt, user_prompt) ou dict com os argumentos de generate
+Prompt = Union[Sequence[str], Dict[str, Any]]
+
+# threads usadas pelo agenerate (o limite de concorrencia e o tamanho do pool)
+_executor: Optional[ThreadPoolExecutor] = None
+_race_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_settings()["concurrency"],
+                                           thread_name_prefix="cohere")
+        return _executor
+
+
+def _get_race_executor() -> ThreadPoolExecutor:
+    # pool separado das tentativas com prazo/hedging: generate pode rodar dentro do pool do agenerate
+    global _race_executor
+    with _executor_lock:
+        if _race_executor is None:
+            _race_executor = ThreadPoolExecutor(max_workers=max(8, get_settings()["concurrency"] * 4),
+                                                thread_name_prefix="cohere-race")
+        return _race_executor
+
+
+def _call(api_key: str, label: str, prompt: Prompt) -> str:
+    if isinstance(prompt, dict):
+        return generate(api_key, **{"label": label, **prompt})
+    system_prompt, user_prompt = prompt
+    return generate(api_key, system_prompt, user_prompt, label=label)
+
+
+async def agenerate(api_key: str, system_prompt: str, user_prompt: str, **kwargs) -> str:
+    """Versão assíncrona do generate; no máximo `concurrency` (config.json) chamadas simultâneas."""
+    loop = asyncio.get_running_loop()
+    kwargs.setdefault("label", caller_label())
+    # copia o contexto para a thread: o orcamento do pedido (request_budget) vale la tambem
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _get_executor(), partial(ctx.run, generate, api_key, system_prompt, user_prompt, **kwargs)
+    )
+
+
+def generate_many(api_key: str, prompts: Iterable[Prompt], concurrency: Optional[int] = None) -> List[str]:
+    """
+    Executa vários prompts independentes em paralelo e devolve as respostas na
+    mesma ordem dos pedidos. Cada pedido é (system_prompt, user_prompt) ou um
+    dict com os argumentos de generate (system_prompt, user_prompt, model, ...).
+    """
+    prompts = list(prompts)
+    if not prompts:
+        return []
+    workers = min(len(prompts), concurrency or get_settings()["concurrency"])
+    # nas threads do pool a pilha nao mostra quem chamou: o label e resolvido aqui
+    label = caller_label()
+    if workers <= 1:
+        return [_call(api_key, label, prompt) for prompt in prompts]
+
+    # pool proprio por chamada: generate_many pode ser chamado de dentro de outra thread do pool
+    # cada pedido roda numa copia do contexto atual (orcamento do pedido em andamento)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cohere") as pool:
+        futures = [pool.submit(contextvars.copy_context().run, _call, api_key, label, prompt) for prompt in prompts]
+        return [future.result() for future in futures]
+
 
 # Exemplo de uso
 if __name__ == "__main__":
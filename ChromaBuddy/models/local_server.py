@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita a API de chat compatível com OpenAI
+(/v1/chat/completions, com e sem streaming) e devolve respostas
+determinísticas: o mesmo prompt sempre gera o mesmo texto. A latência até o
+primeiro token e a vazão (tokens por segundo) são configuráveis, para testar
+e medir o ChromaBuddy sem rede.
+
+Uso:
+    python ChromaBuddy/models/local_server.py --port 8765 --latency 0.2 --tps 80
+
+E no config.json:
+    "backend": "local", "base_url": "http://127.0.0.1:8765/v1"
+
+Rotas extras: GET /health e GET /stats (pedidos atendidos e pico de
+pedidos simultâneos). Com --fail-every N, um a cada N pedidos responde com
+--fail-status (padrão 503), para exercitar novas tentativas e o circuit breaker;
+com --slow-every N, um a cada N pedidos demora --slow-latency segundos a
+mais (cauda lenta, para exercitar prazos e hedging).
+"""
+
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+# vocabulario das respostas sinteticas
+WORDS = (
+    "função classe módulo arquivo retorna valida processa carrega salva configuração "
+    "dados lista dicionário caminho projeto usuário erro resultado cache teste "
+    "estrutura comando repositório análise código descrição parâmetro chamada"
+).split()
+
+
+def _phrase(digest: bytes, words: int, salt: int = 0) -> str:
+    tokens = []
+    for i in range(words):
+        byte = digest[(i + salt) % len(digest)] ^ ((i + salt) * 31 & 0xFF)
+        tokens.append(WORDS[byte % len(WORDS)])
+    return " ".join(tokens)
+
+
+def fake_reply(messages, words: int = 40) -> str:
+    """
+    Resposta determinística derivada do hash das mensagens. Quando o prompt
+    de sistema pede JSON, responde um objeto com uma frase para cada id entre
+    colchetes ([i1], [i2]...) da última mensagem, como nos pedidos em lote.
+    """
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")).digest()
+    system = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    if "JSON" in system and messages:
+        ids = re.findall(r"^\[([\w-]+)\]", str(messages[-1].get("content", "")), re.M)
+        if ids:
+            return json.dumps({item_id: _phrase(digest, min(words, 12), n) for n, item_id in enumerate(ids)},
+                              ensure_ascii=False)
+    return f"[local {digest.hex()[:8]}] " + _phrase(digest, words) + "."
+
+
+class LocalLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0, tps: float = 0.0, words: int = 40,
+                 fail_every: int = 0, fail_status: int = 503, slow_every: int = 0, slow_latency: float = 0.0):
+        super().__init__(address, LocalLLMHandler)
+        self.latency = latency
+        self.tps = tps
+        self.words = words
+        self.fail_every = fail_every
+        self.fail_status = fail_status
+        self.slow_every = slow_every
+        self.slow_latency = slow_latency
+        self.failures = 0
+        self.requests = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def enter(self) -> Tuple[bool, int]:
+        # (False quando o pedido deve falhar de proposito (--fail-every), numero do pedido)
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            if self.fail_every and self.requests % self.fail_every == 0:
+                self.failures += 1
+                return False, self.requests
+            return True, self.requests
+
+    def leave(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def handle_error(self, request, client_address) -> None:
+        # cliente que fecha a conexao no meio de um stream nao e erro do servidor
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "active": self.active, "max_active": self.max_active,
+                    "failures": self.failures, "latency": self.latency, "tps": self.tps}
+
+
+class LocalLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # cabecalho e corpo saem em escritas separadas: sem isso o Nagle soma ~40ms por resposta
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, data: dict) -> None:
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats())
+        elif self.path.rstrip("/").endswith("/models"):
+            self._send_json(200, {"object": "list", "data": [{"id": "local", "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "rota não encontrada"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "rota não encontrada"}})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request["messages"]
+        except (ValueError, KeyError):
+            self._send_json(400, {"error": {"message": "JSON inválido"}})
+            return
+
+        server = self.server
+        ok, number = server.enter()
+        try:
+            if not ok:
+                self._send_json(server.fail_status, {"error": {"message": "falha simulada"}})
+                return
+            text = fake_reply(messages, server.words)
+            model = request.get("model", "local")
+            tokens = text.split(" ")
+            if request.get("max_tokens"):
+                tokens = tokens[:int(request["max_tokens"])]
+            delay = 1.0 / server.tps if server.tps > 0 else 0.0
+
+            latency = server.latency
+            if server.slow_every and number % server.slow_every == 0:
+                latency += server.slow_latency
+            if latency:
+                time.sleep(latency)
+
+            if request.get("stream"):
+                self._stream(tokens, model, delay)
+            else:
+                if delay:
+                    time.sleep(delay * len(tokens))
+                content = " ".join(tokens)
+                self._send_json(200, {
+                    "id": "local-" + hashlib.md5(content.encode("utf-8")).hexdigest()[:12],
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": sum(len(str(m.get("content", "")).split()) for m in messages),
+                              "completion_tokens": len(tokens)},
+                })
+        finally:
+            server.leave()
+
+    def _stream(self, tokens, model: str, delay: float) -> None:
+        # server-sent events com corpo em chunked transfer encoding
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(data: str) -> None:
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        for i, token in enumerate(tokens):
+            if delay and i:
+                time.sleep(delay)
+            chunk = {"object": "chat.completion.chunk", "model": model,
+                     "choices": [{"index": 0, "delta": {"content": token if i == 0 else " " + token}}]}
+            send(json.dumps(chunk, ensure_ascii=False))
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 tps: float = 0.0, words: int = 40, fail_every: int = 0, fail_status: int = 503,
+                 slow_every: int = 0, slow_latency: float = 0.0) -> LocalLLMServer:
+    """Sobe o servidor em uma thread de fundo (port=0 escolhe uma porta livre); pare com server.shutdown()."""
+    server = LocalLLMServer((host, port), latency=latency, tps=tps, words=words,
+                            fail_every=fail_every, fail_status=fail_status,
+                            slow_every=slow_every, slow_latency=slow_latency)
+    thread = threading.Thread(target=server.serve_forever, name="local-llm", daemon=True)
+    thread.start()
+    return server
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Servidor LLM local determinístico (API compatível com OpenAI)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="segundos até o primeiro token (padrão: 0)")
+    parser.add_argument("--tps", type=float, default=0.0, help="tokens por segundo; 0 = sem limite (padrão: 0)")
+    parser.add_argument("--words", type=int, default=40, help="palavras por resposta (padrão: 40)")
+    parser.add_argument("--fail-every", type=int, default=0, help="falhar um a cada N pedidos (padrão: nunca)")
+    parser.add_argument("--fail-status", type=int, default=503, help="status HTTP das falhas simuladas (padrão: 503)")
+    parser.add_argument("--slow-every", type=int, default=0, help="atrasar um a cada N pedidos (padrão: nunca)")
+    parser.add_argument("--slow-latency", type=float, default=2.0,
+                        help="segundos a mais nos pedidos atrasados (padrão: 2)")
+    args = parser.parse_args(argv)
+
+    server = LocalLLMServer((args.host, args.port), latency=args.latency, tps=args.tps, words=args.words,
+                            fail_every=args.fail_every, fail_status=args.fail_status,
+                            slow_every=args.slow_every, slow_latency=args.slow_latency)
+    print(f"Servidor local em {server.url} (latência {args.latency}s, {args.tps or 'sem limite'} tokens/s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+"""
+Proteções das chamadas ao LLM: erro tipado, limite de taxa (token bucket),
+novas tentativas com backoff exponencial e jitter, circuit breaker, prazo
+máximo (deadline) e cancelamento de chamadas em andamento.
+"""
+
+import time
+import socket
+import random
+import threading
+from typing import Optional, Tuple
+
+ERROR_PREFIX = "Erro ao gerar resposta: "
+
+# status HTTP que valem nova tentativa
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+
+class LLMError(Exception):
+    """Falha de uma chamada ao backend, com o status HTTP quando houver."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None,
+                 retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = retryable if retryable is not None else status in RETRYABLE_STATUS
+
+
+class LLMErrorResult(str):
+    """
+    Resposta de erro do generate. Continua sendo str (o texto é o de sempre,
+    "Erro ao gerar resposta: ..."), mas pode ser reconhecida com is_error()
+    para não ser tratada como saída do modelo nem ir para caches.
+    """
+
+    def __new__(cls, error: Exception):
+        result = super().__new__(cls, ERROR_PREFIX + str(error))
+        result.error = error
+        result.status = getattr(error, "status", None)
+        return result
+
+
+def is_error(text) -> bool:
+    """True para respostas de erro do generate (inclusive depois de .strip() ou fatiamento)."""
+    return isinstance(text, LLMErrorResult) or (isinstance(text, str) and text.startswith(ERROR_PREFIX.strip()))
+
+
+def timed_out(text) -> bool:
+    """True para respostas de erro do generate causadas pelo fim do prazo (deadline)."""
+    return isinstance(text, LLMErrorResult) and isinstance(text.error, DeadlineExceeded)
+
+
+def skipped(text) -> bool:
+    """True para respostas de erro do generate de um passo sem modelo ("none" em "routes")."""
+    return isinstance(text, LLMErrorResult) and isinstance(text.error, StepDisabled)
+
+
+def unwrap(text: str) -> str:
+    """Levanta o erro de uma resposta de erro do generate; caso contrário devolve o texto."""
+    if isinstance(text, LLMErrorResult):
+        raise text.error
+    if is_error(text):
+        raise LLMError(text[len(ERROR_PREFIX):].strip())
+    return text
+
+
+def classify(error: Exception) -> Tuple[bool, Optional[int], Optional[float]]:
+    """(vale nova tentativa?, status HTTP, segundos pedidos em Retry-After) de uma exceção."""
+    if isinstance(error, LLMError):
+        return error.retryable, error.status, error.retry_after
+
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        retry_after = None
+        headers = getattr(error, "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after") or headers.get("Retry-After"))
+        except (TypeError, ValueError, AttributeError):
+            pass
+        return status in RETRYABLE_STATUS, status, retry_after
+
+    # falhas de rede e timeouts (socket, http.client, httpx)
+    name = type(error).__name__
+    if isinstance(error, (ConnectionError, TimeoutError, OSError)) or \
+            any(word in name for word in ("Timeout", "Connect", "Network", "Transport", "RemoteProtocol")):
+        return True, None, None
+    return False, None, None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Backoff exponencial com jitter completo: uniforme entre 0 e min(cap, base * 2^tentativa)."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    Limite de taxa: `rate` pedidos por segundo, com rajadas de até `capacity`.
+    acquire() bloqueia até haver uma ficha; rate <= 0 desliga o limite.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        if self.rate <= 0:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitOpen(LLMError):
+    """Chamada recusada sem ir à rede: o circuito está aberto."""
+
+    def __init__(self, remaining: float):
+        super().__init__(f"serviço indisponível após falhas seguidas; nova tentativa em {remaining:.0f}s",
+                         retryable=False)
+
+
+class CircuitBreaker:
+    """
+    Depois de `threshold` falhas seguidas o circuito abre e as chamadas falham
+    na hora por `reset_timeout` segundos; então uma chamada de teste passa
+    (meio aberto) e o resultado dela fecha ou reabre o circuito.
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "fechado"
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return "meio aberto"
+            return "aberto"
+
+    def before_call(self) -> None:
+        """Levanta CircuitOpen se a chamada não deve sair."""
+        if self.threshold <= 0:
+            return
+        with self._lock:
+            if self.opened_at is None:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if elapsed < self.reset_timeout or self._probe:
+                raise CircuitOpen(max(0.0, self.reset_timeout - elapsed))
+            self._probe = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probe = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probe or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._probe = False
+
+    def record_abandoned(self) -> None:
+        """
+        A chamada acabou sem dizer nada sobre o provedor (ex.: o prazo curto
+        de quem chamou): não conta como falha nem como sucesso, só libera a
+        chamada de teste do meio aberto para a próxima.
+        """
+        with self._lock:
+            self._probe = False
+
+
+class DeadlineExceeded(LLMError):
+    """O prazo da chamada acabou antes de uma resposta."""
+
+    def __init__(self, deadline: float):
+        super().__init__(f"sem resposta dentro do prazo de {deadline:.1f}s", retryable=False)
+
+
+class StepDisabled(LLMError):
+    """O passo está configurado sem modelo ("none" em "routes"): quem chamou usa a sua alternativa."""
+
+    def __init__(self, step: str):
+        super().__init__(f"passo '{step}' sem modelo configurado", retryable=False)
+
+
+class CallHandle:
+    """
+    Permite cancelar uma chamada em andamento de outra thread: o backend
+    registra a conexão em uso (attach) e cancel() fecha o socket, o que
+    interrompe a leitura bloqueada. Backends sem suporte só veem `cancelled`
+    e limitam o tempo da chamada ao prazo (`deadline_at`, em time.monotonic()).
+    """
+
+    def __init__(self, deadline_at: Optional[float] = None):
+        self.cancelled = False
+        self.deadline_at = deadline_at
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def attach(self, conn) -> None:
+        with self._lock:
+            self._conn = conn
+            cancelled = self.cancelled
+        if cancelled:
+            self._abort(conn)
+
+    def timeout(self, default: float) -> float:
+        # segundos que a chamada ainda pode durar: o que falta ate o prazo, no maximo `default`
+        if self.deadline_at is None:
+            return default
+        return max(0.0, min(default, self.deadline_at - time.monotonic()))
+
+    def detach(self) -> None:
+        with self._lock:
+            self._conn = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            conn = self._conn
+        if conn is not None:
+            self._abort(conn)
+
+    @staticmethod
+    def _abort(conn) -> None:
+        sock = getattr(conn, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
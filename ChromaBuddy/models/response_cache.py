@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de respostas do LLM, logo abaixo de models.cohe.generate.
+
+A chave é o hash de (backend, base_url, modelo, max_tokens, temperature,
+prompt de sistema, prompt do usuário): o mesmo código enviado de novo (ex.:
+gerardds ou analyze em arquivos que não mudaram) volta do cache, e qualquer
+mudança no conteúdo gera outra chave. Respostas de erro nunca são gravadas.
+
+Um arquivo JSON por resposta (como o SmartCache), com validade (ttl) e
+limite de entradas: ao passar do limite, as mais antigas são apagadas.
+
+No config.json:
+    "response_cache": true               (padrão: o valor de "cache_enabled")
+    "response_cache_ttl": 604800         segundos
+    "response_cache_max_entries": 5000
+    "response_cache_dir": ""             (padrão: .chromabuddy_cache/responses)
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from models.resilience import is_error
+
+DEFAULT_DIR = os.path.join(".chromabuddy_cache", "responses")
+
+
+def response_key(backend: str, base_url: str, params: Dict[str, Any]) -> str:
+    """Hash do pedido completo (o timeout não muda a resposta e fica de fora)."""
+    data = [backend, base_url, params.get("model"), params.get("max_tokens"), params.get("temperature"),
+            [[m.get("role", ""), str(m.get("content", ""))] for m in params["messages"]]]
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache em memória (LRU) e em disco, seguro entre threads."""
+
+    def __init__(self, directory: str = DEFAULT_DIR, ttl: float = 604800, max_entries: int = 5000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._disk_entries: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[0] < self.ttl:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            timestamp, value = data["timestamp"], data["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            timestamp, value = None, None
+
+        with self._lock:
+            if timestamp is not None and now - timestamp < self.ttl:
+                self._remember(key, timestamp, value)
+                self.hits += 1
+                return value
+            self.memory.pop(key, None)
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        # erros do modelo e respostas vazias nunca vao para o cache
+        if not value or is_error(value):
+            return
+        timestamp = time.time()
+        with self._lock:
+            self._remember(key, timestamp, str(value))
+
+        path = self._path(key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            existed = os.path.exists(path)
+            # grava em arquivo temporario e troca: leitores nunca veem JSON pela metade
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"timestamp": timestamp, "value": str(value)}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            return
+
+        with self._lock:
+            if self._disk_entries is not None and not existed:
+                self._disk_entries += 1
+            prune = self._disk_entries is None or self._disk_entries > self.max_entries
+        if prune:
+            self._prune()
+
+    def _remember(self, key: str, timestamp: float, value: str) -> None:
+        self.memory[key] = (timestamp, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _prune(self) -> None:
+        # passou do limite: apaga as entradas mais antigas ate 90% dele (evita varrer a pasta a cada gravacao)
+        try:
+            files = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name.endswith(".json")]
+            files.sort(key=os.path.getmtime)
+        except OSError:
+            return
+        remove = len(files) - int(self.max_entries * 0.9) if len(files) > self.max_entries else 0
+        for path in files[:remove]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_entries = len(files) - remove
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            hit_rate = self.hits / total * 100 if total else 0.0
+            size = sum(len(value) for _, value in self.memory.values())
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": hit_rate, "rate": f"{hit_rate:.1f}%",
+                    "entries": len(self.memory), "memory_mb": size / (1024 * 1024)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self.memory.clear()
+            self._disk_entries = 0
+        try:
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
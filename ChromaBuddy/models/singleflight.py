@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+Agrupamento de chamadas idênticas em andamento (single-flight).
+
+Quando várias threads pedem o mesmo prompt ao mesmo tempo (ex.: funções com
+o mesmo corpo descritas em paralelo pelo cltdds, ou a mesma sugestão de
+cenários pedida duas vezes), só a primeira vai ao modelo; as outras esperam
+e recebem a mesma resposta (ou o mesmo erro). Fica logo abaixo do cache de
+respostas: ele atende quem chega depois, o single-flight quem chega durante.
+
+No config.json:
+    "coalesce": true     (padrão)
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class WaitTimeout(Exception):
+    """Quem esperava a chamada compartilhada passou do seu prazo."""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Uma execução por chave em andamento; as chamadas concorrentes compartilham o resultado."""
+
+    def __init__(self):
+        self.leaders = 0
+        self.shared = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Executa fn() ou espera a execução em andamento com a mesma chave.
+        Devolve (resultado, compartilhado); o erro de fn() vale para todos.
+        Quem espera e passa de `timeout` segundos recebe WaitTimeout (a
+        execução continua para os outros).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise WaitTimeout("sem resposta da chamada compartilhada dentro do prazo")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # sai do mapa antes de liberar quem espera: quem chegar agora faz uma chamada nova
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._flights)}
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Telemetria das chamadas ao LLM.
+
+Cada chamada de models.cohe.generate/generate_stream gera um evento com o
+local de origem (label), latência, tempo até o primeiro trecho (streams),
+novas tentativas, tamanhos do prompt e da resposta, tokens, acerto ou
+falta no cache de respostas e se a resposta veio de uma chamada idêntica
+em andamento (single-flight). Os eventos são agregados por label em
+histogramas de latência (p50/p95/p99), mostrados no /stats do chat, e
+opcionalmente gravados em um arquivo JSONL:
+
+    "trace_file": "chamadas_llm.jsonl"
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# modulos que nao sao o "local de origem" de uma chamada
+_SKIP_MODULES = ("models.cohe", "threading", "concurrent.futures", "asyncio", "functools", "contextvars")
+
+
+def caller_label(depth: int = 1) -> str:
+    """modulo:função de quem chamou o generate (ignora models.cohe e as threads de pool)."""
+    try:
+        frame = sys._getframe(depth)
+    except ValueError:
+        return "?"
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        if not module.startswith(_SKIP_MODULES):
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+class Histogram:
+    """
+    Histograma de latências em baldes exponenciais (cada balde 10% maior que o
+    anterior, de 1ms a ~1h): memória fixa e percentis com erro de até 10%.
+    """
+
+    BASE = 0.001
+    GROWTH = 1.1
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.BASE:
+            return 0
+        return int(math.ceil(math.log(seconds / self.BASE, self.GROWTH)))
+
+    def add(self, seconds: float) -> None:
+        bucket = self._bucket(seconds)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Limite superior do balde que contém o percentil q (0-100), dentro de [min, max]."""
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(q / 100.0 * self.count)))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                value = self.BASE * (self.GROWTH ** bucket)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+class SiteStats:
+    """Agregado das chamadas de um label."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.hedged = 0
+        self.coalesced = 0
+        self.latency = Histogram()
+        self.first_token = Histogram()
+        # so chamadas que foram ao modelo e deram certo: base do p95 usado pelo hedging
+        self.upstream = Histogram()
+
+    def add(self, event: Dict[str, Any]) -> None:
+        self.calls += 1
+        self.errors += int(bool(event.get("error")))
+        self.retries += event.get("retries", 0)
+        if event.get("cache") == "hit":
+            self.cache_hits += 1
+        elif event.get("cache") == "miss":
+            self.cache_misses += 1
+        self.prompt_chars += event.get("prompt_chars", 0)
+        self.response_chars += event.get("response_chars", 0)
+        self.prompt_tokens += event.get("prompt_tokens", 0)
+        self.completion_tokens += event.get("completion_tokens", 0)
+        self.hedged += int(bool(event.get("hedged")))
+        self.coalesced += int(bool(event.get("coalesced")))
+        self.latency.add(event["latency"])
+        if (event.get("cache") != "hit" and not event.get("coalesced") and not event.get("error")
+                and not event.get("stream")):
+            self.upstream.add(event["latency"])
+        if event.get("first_token") is not None:
+            self.first_token.add(event["first_token"])
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls, "errors": self.errors, "retries": self.retries, "hedged": self.hedged,
+            "coalesced": self.coalesced, "cache_hits": self.cache_hits, "cache_misses": self.cache_misses,
+            "prompt_chars": self.prompt_chars, "response_chars": self.response_chars,
+            "prompt_tokens": self.prompt_tokens, "completion_tokens": self.completion_tokens,
+            "total_s": self.latency.total, "mean_s": self.latency.mean,
+            "p50_s": self.latency.percentile(50), "p95_s": self.latency.percentile(95),
+            "p99_s": self.latency.percentile(99), "max_s": self.latency.max,
+            "first_token_p50_s": self.first_token.percentile(50),
+        }
+
+
+class Telemetry:
+    """Agrega eventos por label e grava o trace JSONL quando configurado."""
+
+    def __init__(self):
+        self.sites: Dict[str, SiteStats] = {}
+        self._lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+
+    def record(self, event: Dict[str, Any], trace_file: str = "") -> None:
+        with self._lock:
+            site = self.sites.get(event["label"])
+            if site is None:
+                site = self.sites[event["label"]] = SiteStats()
+            site.add(event)
+        if trace_file:
+            self._trace(event, trace_file)
+
+    def _trace(self, event: Dict[str, Any], trace_file: str) -> None:
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._trace_lock:
+            try:
+                folder = os.path.dirname(os.path.abspath(trace_file))
+                os.makedirs(folder, exist_ok=True)
+                with open(trace_file, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError:
+                pass  # telemetria nunca derruba uma chamada
+
+    def upstream_percentile(self, label: str, q: float, min_samples: int = 20) -> Optional[float]:
+        """Percentil q das chamadas de `label` que foram ao modelo; None com menos de min_samples."""
+        with self._lock:
+            site = self.sites.get(label)
+            if site is None or site.upstream.count < min_samples:
+                return None
+            return site.upstream.percentile(q)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{label: resumo}, do label com mais tempo total para o com menos."""
+        with self._lock:
+            items = [(label, site.summary()) for label, site in self.sites.items()]
+        items.sort(key=lambda item: item[1]["total_s"], reverse=True)
+        return dict(items)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.sites.clear()
+
+
+class CallTrace:
+    """Medição de uma chamada; finish()/fail() montam o evento e o entregam a `sink`."""
+
+    def __init__(self, label: str, stream: bool, sink: Callable[[Dict[str, Any]], None]):
+        self.label = label
+        self.stream = stream
+        self.sink = sink
+        self.start = time.perf_counter()
+        self.first_token: Optional[float] = None
+        self.retries = 0
+        self.hedged = False
+        self.coalesced = False
+        self.model: Optional[str] = None
+        self.prompt_chars = 0
+        self.prompt_tokens = 0
+        self.truncated = False
+        self.cache = "off"
+
+    def prompt(self, params: Dict[str, Any], prompt_tokens: int, truncated: bool) -> None:
+        self.model = params.get("model")
+        self.prompt_chars = sum(len(str(m.get("content", ""))) for m in params["messages"])
+        self.prompt_tokens = prompt_tokens
+        self.truncated = truncated
+
+    def mark_first_token(self) -> None:
+        if self.first_token is None:
+            self.first_token = time.perf_counter() - self.start
+
+    def _event(self, error: Optional[BaseException] = None) -> Dict[str, Any]:
+        return {
+            "ts": round(time.time(), 3),
+            "label": self.label,
+            "model": self.model,
+            "stream": self.stream,
+            "latency": round(time.perf_counter() - self.start, 4),
+            "first_token": round(self.first_token, 4) if self.first_token is not None else None,
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "coalesced": self.coalesced,
+            "cache": self.cache,
+            "prompt_chars": self.prompt_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "truncated": self.truncated,
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+        }
+
+    def finish(self, response: str, completion_tokens: int = 0) -> None:
+        event = self._event()
+        event["response_chars"] = len(response or "")
+        event["completion_tokens"] = completion_tokens
+        self.sink(event)
+
+    def fail(self, error: BaseException) -> None:
+        event = self._event(error)
+        event["response_chars"] = 0
+        event["completion_tokens"] = 0
+        self.sink(event)
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    return _telemetry
+
+
+def format_rows(snapshot: Dict[str, Dict[str, Any]]) -> List[List[str]]:
+    """Linhas de tabela (label, chamadas, p50/p95/p99 em ms, tempo total, cache, compartilhadas, erros) para o /stats."""
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+
+    rows = []
+    for label, s in snapshot.items():
+        cache = s["cache_hits"] + s["cache_misses"]
+        rows.append([
+            label, str(s["calls"]), ms(s["p50_s"]), ms(s["p95_s"]), ms(s["p99_s"]),
+            f"{s['total_s']:.1f}s",
+            f"{s['cache_hits'] / cache * 100:.0f}%" if cache else "-",
+            str(s["coalesced"]),
+            str(s["retries"]), str(s["errors"]),
+        ])
+    return rows
@@ -0,0 +1,161 @@
+# carga do pipeline de LLM contra o servidor local deterministico (sem rede)
+"""
+Sobe ChromaBuddy/models/local_server.py em segundo plano, aponta o backend
+para ele (models.cohe.configure, sem alterar o config.json) e mede:
+
+    generate      N chamadas sequenciais
+    generate_many N chamadas com concorrência limitada
+    cltdds        descrição completa de um projeto (padrão: a pasta ChromaBuddy)
+    cltdds (incr) a mesma varredura com um arquivo alterado (só ele vai ao modelo)
+
+Uso:
+    python benchmarks/llm.py
+    python benchmarks/llm.py --latency 0.3 --tps 60 --calls 32 --concurrency 8 --output llm.json
+    python benchmarks/llm.py --base-url http://127.0.0.1:8765/v1   # servidor já rodando
+    python benchmarks/llm.py --cassette chamadas.jsonl --cassette-mode record
+    python benchmarks/llm.py --cassette chamadas.jsonl --cassette-mode replay   # só o custo fora do LLM
+    python benchmarks/llm.py --response-cache   # cltdds de novo com o cache de respostas aquecido
+
+O cache de respostas fica desligado, a não ser com --response-cache (em uma
+pasta temporária), para que as chamadas repetidas cheguem ao servidor.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import shutil
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+CHROMABUDDY = os.path.join(ROOT, 'ChromaBuddy')
+if CHROMABUDDY not in sys.path:
+    sys.path.insert(0, CHROMABUDDY)
+
+from models import cohe
+from models.local_server import start_server
+from models.telemetry import get_telemetry
+
+
+def _measure(label, func):
+    start = time.perf_counter()
+    result = func()
+    wall = time.perf_counter() - start
+    return {'label': label, 'wall_s': wall}, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Carga do pipeline de LLM com o servidor local')
+    parser.add_argument('--latency', type=float, default=0.2, help='segundos até o primeiro token (padrão: 0.2)')
+    parser.add_argument('--tps', type=float, default=100.0, help='tokens por segundo do servidor (padrão: 100)')
+    parser.add_argument('--words', type=int, default=40, help='palavras por resposta (padrão: 40)')
+    parser.add_argument('--calls', type=int, default=16, help='chamadas em generate/generate_many (padrão: 16)')
+    parser.add_argument('--concurrency', type=int, default=None, help='limite de concorrência (padrão: config.json)')
+    parser.add_argument('--project', default=CHROMABUDDY, help='projeto descrito pelo cltdds')
+    parser.add_argument('--base-url', default=None, help='usar um servidor já rodando em vez de subir um')
+    parser.add_argument('--cassette', default=None, help='arquivo de cassete (gravação/reprodução das chamadas)')
+    parser.add_argument('--cassette-mode', choices=('record', 'replay', 'auto'), default='auto',
+                        help='modo do cassete (padrão: auto)')
+    parser.add_argument('--cassette-latency', action='store_true', help='reproduzir com a latência gravada')
+    parser.add_argument('--response-cache', action='store_true',
+                        help='ligar o cache de respostas e medir o cltdds também com o cache aquecido')
+    parser.add_argument('--output', default=None, help='gravar resultados em JSON neste arquivo')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server = start_server(latency=args.latency, tps=args.tps, words=args.words)
+        base_url = server.url
+    cohe.configure(backend='local', base_url=base_url)
+    if args.cassette:
+        cohe.configure(cassette=args.cassette, cassette_mode=args.cassette_mode,
+                       cassette_latency=args.cassette_latency)
+    if args.concurrency:
+        cohe.configure(concurrency=args.concurrency)
+    cache_dir = tempfile.mkdtemp(prefix='chromabuddy-cache-') if args.response_cache else None
+    cohe.configure(response_cache=args.response_cache, response_cache_dir=cache_dir)
+
+    from locate.dds import cltdds
+
+    prompts = [("Você é um assistente.", f"Pergunta {i}") for i in range(args.calls)]
+    results = []
+
+    metrics, _ = _measure('generate', lambda: [cohe.generate('local', s, u) for s, u in prompts])
+    metrics['calls'] = args.calls
+    results.append(metrics)
+
+    # prompts diferentes dos do generate: com --response-cache nao viriam do cache
+    prompts = [(s, u + " (paralela)") for s, u in prompts]
+    metrics, _ = _measure('generate_many', lambda: cohe.generate_many('local', prompts, args.concurrency))
+    metrics['calls'] = args.calls
+    results.append(metrics)
+
+    before = server.stats()['requests'] if server else None
+    metrics, estrutura = _measure('cltdds', lambda: cltdds(args.project, 'local', args.concurrency,
+                                                          incremental=False, diario=False))
+    metrics['files'] = len(estrutura['estrutura'])
+    if server:
+        metrics['calls'] = server.stats()['requests'] - before
+    results.append(metrics)
+
+    # varredura incremental: finge que o primeiro arquivo Python mudou desde a anterior
+    anterior = json.loads(json.dumps(estrutura))
+    alterado = next((item for item in anterior['estrutura'] if item.get('hash') and
+                     item['caminho'].endswith('.py')), None)
+    if alterado is not None:
+        alterado['hash'] = 'alterado'
+    before = server.stats()['requests'] if server else None
+    metrics, incremental = _measure('cltdds (incr)', lambda: cltdds(args.project, 'local', args.concurrency,
+                                                                   anterior=anterior, diario=False))
+    metrics.update(incremental['varredura'])
+    if server:
+        metrics['calls'] = server.stats()['requests'] - before
+    results.append(metrics)
+
+    if args.response_cache:
+        before = server.stats()['requests'] if server else None
+        metrics, _ = _measure('cltdds (cache)', lambda: cltdds(args.project, 'local', args.concurrency,
+                                                               incremental=False, diario=False))
+        if server:
+            metrics['calls'] = server.stats()['requests'] - before
+        metrics['cache'] = cohe.get_response_cache().stats()
+        results.append(metrics)
+
+    for m in results:
+        calls = m.get('calls')
+        rate = f"{calls / m['wall_s']:.1f} chamadas/s" if calls and m['wall_s'] else ""
+        print(f"  {m['label']:<14} {m['wall_s']:>8.3f}s  {calls if calls is not None else '-':>5} chamadas  {rate}")
+
+    report = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'base_url': base_url,
+        'latency': args.latency,
+        'tps': args.tps,
+        'concurrency': args.concurrency or cohe.get_settings()['concurrency'],
+        'server': server.stats() if server else None,
+        'cassette': {'path': args.cassette, 'mode': args.cassette_mode} if args.cassette else None,
+        'response_cache': args.response_cache,
+        'results': results,
+        # latencias por local de origem (p50/p95/p99), como no /stats do chat
+        'telemetry': get_telemetry().snapshot(),
+    }
+    if server:
+        print(f"  pico de pedidos simultâneos no servidor: {report['server']['max_active']}")
+        server.shutdown()
+    if cache_dir:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresultados salvos em: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# benchmark de inicializacao: tempo ate o prompt do main.py
+"""
+Mede o tempo de inicialização a frio do ChromaGit (processo novo até o prompt)
+e falha se passar do limite ou regredir em relação a uma linha de base.
+
+Uso:
+    python benchmarks/startup.py                      # mede e compara com --max-ms
+    python benchmarks/startup.py --save-baseline      # grava benchmarks/startup_baseline.json
+    python benchmarks/startup.py --baseline benchmarks/startup_baseline.json
+
+Também roda `python -X importtime` para listar os imports mais caros e
+verifica que módulos pesados (cohere, rich, ChromaBuddy) não são
+importados antes do primeiro uso.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MAIN = os.path.join(ROOT, 'main.py')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_baseline.json')
+
+# módulos que só devem ser carregados no primeiro uso de buddy/ask/analyze/gerardds
+FORBIDDEN_AT_STARTUP = ('cohere', 'rich', 'httpx', 'ChromaBuddy', 'models', 'core')
+
+
+def time_command(args, runs):
+    # mede o tempo de parede de `runs` execuções do comando (stdin vazio => o REPL sai no prompt)
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, cwd=ROOT, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def import_profile():
+    # executa o main com -X importtime e devolve ({modulo: (self_us, cumulativo_us)}, total_us)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', MAIN],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        cwd=ROOT, text=True, check=False
+    )
+    modules = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        except ValueError:
+            continue
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+        # imports de primeiro nível (sem recuo extra) somam o custo total do main.py
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative_us)
+    return modules, total_us
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de inicialização do ChromaGit')
+    parser.add_argument('--runs', type=int, default=15, help='execuções por medição (padrão: 15)')
+    parser.add_argument('--max-ms', type=float, default=100.0,
+                        help='limite para o tempo até o prompt, descontado o interpretador (padrão: 100)')
+    parser.add_argument('--baseline', default=None, help='arquivo JSON de linha de base para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.20,
+                        help='regressão máxima aceita sobre a linha de base (padrão: 0.20 = 20%%)')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, default=None,
+                        metavar='ARQUIVO', help='gravar o resultado como nova linha de base')
+    parser.add_argument('--top', type=int, default=10, help='imports mais caros a exibir')
+    args = parser.parse_args(argv)
+
+    # interpretador puro vs. interpretador + main.py até o prompt
+    interpreter = statistics.median(time_command([sys.executable, '-c', 'pass'], args.runs))
+    startup = statistics.median(time_command([sys.executable, MAIN], args.runs))
+    overhead = max(startup - interpreter, 0.0)
+
+    modules, total_us = import_profile()
+    main_cumulative = total_us / 1000
+    loaded_early = sorted(
+        name for name in modules
+        if name.split('.')[0] in FORBIDDEN_AT_STARTUP
+    )
+
+    print(f"interpretador (python -c pass): {interpreter:.1f} ms")
+    print(f"até o prompt (python main.py):  {startup:.1f} ms")
+    print(f"custo do ChromaGit:             {overhead:.1f} ms (limite {args.max_ms:.0f} ms)")
+    print(f"imports (cumulativo, -X importtime): {main_cumulative:.1f} ms")
+    print(f"\n{args.top} imports mais caros (self):")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda m: m[1][0], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:7.2f} ms  {cumulative_us / 1000:7.2f} ms  {name}")
+
+    result = {
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'interpreter_ms': round(interpreter, 2),
+        'startup_ms': round(startup, 2),
+        'overhead_ms': round(overhead, 2),
+        'import_ms': round(main_cumulative, 2),
+    }
+
+    failures = []
+    if loaded_early:
+        failures.append(f"módulos pesados importados na inicialização: {', '.join(loaded_early)}")
+    if overhead > args.max_ms:
+        failures.append(f"inicialização levou {overhead:.1f} ms (limite {args.max_ms:.0f} ms)")
+
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            limit = baseline['overhead_ms'] * (1 + args.tolerance)
+            print(f"\nlinha de base: {baseline['overhead_ms']:.1f} ms (limite com tolerância: {limit:.1f} ms)")
+            if overhead > limit:
+                failures.append(f"regressão: {overhead:.1f} ms contra {baseline['overhead_ms']:.1f} ms da linha de base")
+        except (OSError, KeyError, ValueError) as e:
+            failures.append(f"não foi possível ler a linha de base: {e}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nlinha de base salva em: {args.save_baseline}")
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"[FALHA] {failure}")
+        return 1
+
+    print("\n[OK] inicialização dentro do limite")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,355 @@
+# benchmark dos caminhos de copia (init, commit, save, duple) em arvores sinteticas
+"""
+Gera workspaces sintéticos reprodutíveis e mede `init`, `commit` (main.cmd_commit),
+`save` (Save.save) e `duple` (Duple) em cada um: tempo de parede, arquivos e bytes
+movidos e pico de memória (RSS). Cada operação roda em um processo próprio, com
+HOME apontando para uma pasta temporária, para que o pico de RSS seja só dela e
+nada toque em Documents/ChromaGithub do usuário.
+
+Cenários:
+    small      muitos arquivos pequenos (1-4 KB) em pastas de 100 arquivos
+    huge       poucos arquivos enormes (--huge-count x --huge-mb)
+    deep       aninhamento profundo (até 64 níveis)
+    gitignore  .gitignore extenso, metade dos arquivos ignorados
+
+Uso:
+    python benchmarks/trees.py --scale 10k
+    python benchmarks/trees.py --scenarios small,gitignore --scale 10k,100k --output bench.json
+    python benchmarks/trees.py --scale 10k --compare bench_anterior.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from utils.transfer import measure_tree
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+SCENARIOS = ('small', 'huge', 'deep', 'gitignore')
+OPERATIONS = ('init', 'commit', 'save', 'duple')
+
+GITIGNORE_PATTERNS = [
+    '*.log', '*.tmp', '*.pyc', '*.o', '*.class', '*.cache',
+    'build', 'dist', 'node_modules', '__pycache__', '.venv', 'coverage',
+] + [f'gerado_{i}_*' for i in range(100)]
+
+
+# ---------------------------------------------------------------------------
+# geracao de workspaces
+# ---------------------------------------------------------------------------
+
+class _Writer:
+    # escreve arquivos com conteudo deterministico a partir de um bloco aleatorio semeado
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.block = self.rng.randbytes(1024 * 1024)
+        self.files = 0
+        self.bytes = 0
+
+    def write(self, path, size):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        offset = self.rng.randrange(len(self.block))
+        with open(path, 'wb') as f:
+            remaining = size
+            while remaining > 0:
+                chunk = self.block[offset:offset + remaining] or self.block[:remaining]
+                f.write(chunk)
+                remaining -= len(chunk)
+                offset = 0
+        self.files += 1
+        self.bytes += size
+
+
+def generate_workspace(path, scenario, files, seed=42, huge_count=4, huge_mb=256):
+    """Cria o workspace do cenário em `path` e devolve {'files', 'bytes'} gerados."""
+    os.makedirs(path, exist_ok=True)
+    writer = _Writer(seed)
+
+    # init exige um .gitignore na raiz
+    patterns = GITIGNORE_PATTERNS if scenario == 'gitignore' else ['*.log']
+    with open(os.path.join(path, '.gitignore'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(patterns) + '\n')
+
+    if scenario == 'small':
+        for i in range(files):
+            folder = os.path.join(path, f'pkg{i // 1000:04d}', f'mod{(i // 100) % 10}')
+            writer.write(os.path.join(folder, f'arquivo_{i}.txt'), writer.rng.randint(1024, 4096))
+
+    elif scenario == 'huge':
+        for i in range(huge_count):
+            writer.write(os.path.join(path, 'dados', f'grande_{i}.bin'), huge_mb * 1024 * 1024)
+        for i in range(min(files, 100)):
+            writer.write(os.path.join(path, 'src', f'modulo_{i}.py'), writer.rng.randint(512, 2048))
+
+    elif scenario == 'deep':
+        depth = 64
+        for i in range(files):
+            level = i % depth
+            branch = (i // depth) % 8
+            parts = [f'n{d}' for d in range(level)]
+            folder = os.path.join(path, f'raiz{branch}', *parts)
+            writer.write(os.path.join(folder, f'arquivo_{i}.txt'), writer.rng.randint(256, 2048))
+
+    elif scenario == 'gitignore':
+        ignored = ['build', 'dist', 'node_modules', '__pycache__', 'coverage']
+        for i in range(files):
+            if i % 2:
+                # metade ignorada: pastas, extensoes e prefixos do .gitignore
+                kind = i % 3
+                if kind == 0:
+                    name = os.path.join(ignored[i % len(ignored)], f'd{i // 500}', f'f{i}.js')
+                elif kind == 1:
+                    name = os.path.join(f'src{i // 1000}', f'f{i}.log')
+                else:
+                    name = os.path.join(f'src{i // 1000}', f'gerado_{i % 100}_{i}.txt')
+            else:
+                name = os.path.join(f'src{i // 1000}', f'f{i}.py')
+            writer.write(os.path.join(path, name), writer.rng.randint(512, 4096))
+
+    else:
+        raise ValueError(f"cenário desconhecido: {scenario}")
+
+    return {'files': writer.files, 'bytes': writer.bytes}
+
+
+# ---------------------------------------------------------------------------
+# execucao de uma operacao (processo filho)
+# ---------------------------------------------------------------------------
+
+def _peak_rss_kb():
+    # pico de memoria residente do processo atual, em KB
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == 'darwin' else peak
+    except ImportError:
+        pass
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (n, ctypes.c_size_t) for n in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                    'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                    'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize // 1024
+    except Exception:
+        return None
+
+
+def _run_operation(op, workspace, duple_dir, result_path):
+    # roda uma operacao no processo atual e grava o resultado em JSON
+    name = os.path.basename(workspace)
+    devnull = open(os.devnull, 'w')
+    stdout = sys.stdout
+
+    if op == 'duple':
+        os.makedirs(duple_dir, exist_ok=True)
+        os.chdir(duple_dir)
+    else:
+        os.chdir(workspace)
+
+    ok = False
+    sys.stdout = devnull
+    start = time.perf_counter()
+    try:
+        if op == 'init':
+            from commands.init import init
+            ok = init(workspace)
+        elif op == 'commit':
+            import main
+            ok = main.cmd_commit("benchmark")
+        elif op == 'save':
+            from commands.save import Save
+            ok = Save().save()
+        elif op == 'duple':
+            from commands.duple import Duple
+            ok = Duple(name, assume_yes=True).run()
+    finally:
+        wall = time.perf_counter() - start
+        sys.stdout = stdout
+        devnull.close()
+
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({'ok': bool(ok), 'wall_s': wall, 'peak_rss_kb': _peak_rss_kb()}, f)
+
+
+def measure_operation(op, workspace, home, duple_dir):
+    """Roda `op` em um processo novo e devolve as métricas da operação."""
+    fd, result_path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--_op', op,
+             '--_workspace', workspace, '--_duple-dir', duple_dir, '--_result', result_path],
+            env=env, stdin=subprocess.DEVNULL, check=False
+        )
+        with open(result_path, 'r', encoding='utf-8') as f:
+            metrics = json.load(f)
+    except (OSError, ValueError):
+        metrics = {'ok': False, 'wall_s': None, 'peak_rss_kb': None}
+    finally:
+        os.remove(result_path)
+
+    # o que a operacao produziu no destino
+    name = os.path.basename(workspace)
+    destinations = {
+        'init': os.path.join(workspace, f'.hub_{name}'),
+        'commit': os.path.join(workspace, f'.hub_{name}'),
+        'save': os.path.join(home, 'Documents', 'ChromaGithub', name),
+        'duple': os.path.join(duple_dir, name),
+    }
+    files, nbytes = measure_tree(destinations[op]) if os.path.exists(destinations[op]) else (0, 0)
+    metrics['files_moved'] = files
+    metrics['bytes_moved'] = nbytes
+    return metrics
+
+
+# ---------------------------------------------------------------------------
+# suite
+# ---------------------------------------------------------------------------
+
+def _git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=False)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(scenarios, scales, workdir, seed=42, huge_count=4, huge_mb=256, keep=False):
+    results = []
+    for scenario in scenarios:
+        # o cenario "huge" e definido pelo tamanho dos arquivos, nao pela escala
+        for scale in (scales[:1] if scenario == 'huge' else scales):
+            label = scenario if scenario == 'huge' else f"{scenario}-{scale}"
+            base = os.path.join(workdir, label)
+            shutil.rmtree(base, ignore_errors=True)
+            workspace = os.path.join(base, 'ws', f'bench_{scenario}')
+            home = os.path.join(base, 'home')
+            duple_dir = os.path.join(base, 'duple')
+            os.makedirs(home, exist_ok=True)
+
+            print(f"[{label}] gerando workspace...", flush=True)
+            start = time.perf_counter()
+            generated = generate_workspace(workspace, scenario, SCALES[scale], seed, huge_count, huge_mb)
+            print(f"[{label}] {generated['files']} arquivos, {generated['bytes'] / 1e6:.1f} MB "
+                  f"({time.perf_counter() - start:.1f}s)", flush=True)
+
+            entry = {'scenario': scenario, 'scale': scale, 'label': label, 'generated': generated, 'ops': {}}
+            for op in OPERATIONS:
+                metrics = measure_operation(op, workspace, home, duple_dir)
+                entry['ops'][op] = metrics
+                wall = f"{metrics['wall_s']:.3f}s" if metrics['wall_s'] is not None else "n/d"
+                rss = f"{metrics['peak_rss_kb'] / 1024:.1f} MB" if metrics['peak_rss_kb'] else "n/d"
+                status = "ok" if metrics['ok'] else "FALHOU"
+                print(f"  {op:<7} {wall:>9}  {metrics['files_moved']:>8} arquivos  "
+                      f"{metrics['bytes_moved'] / 1e6:>9.1f} MB  pico {rss}  {status}", flush=True)
+            results.append(entry)
+
+            if not keep:
+                shutil.rmtree(base, ignore_errors=True)
+    return results
+
+
+def compare(current, previous_path):
+    # imprime a variacao de tempo por operacao em relacao a um resultado anterior
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = json.load(f)
+    old = {(r['label'], op): m for r in previous.get('results', []) for op, m in r['ops'].items()}
+
+    print(f"\ncomparação com {previous_path} (revisão {previous.get('revision') or '?'}):")
+    for entry in current['results']:
+        for op, metrics in entry['ops'].items():
+            before = old.get((entry['label'], op))
+            if not before or not before.get('wall_s') or metrics['wall_s'] is None:
+                continue
+            delta = (metrics['wall_s'] - before['wall_s']) / before['wall_s'] * 100
+            print(f"  {entry['label']:<18} {op:<7} {before['wall_s']:.3f}s -> {metrics['wall_s']:.3f}s ({delta:+.1f}%)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de init/commit/save/duple em árvores sintéticas')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"cenários separados por vírgula (padrão: {','.join(SCENARIOS)})")
+    parser.add_argument('--scale', default='10k', help="escalas separadas por vírgula: 10k, 100k, 1m (padrão: 10k)")
+    parser.add_argument('--seed', type=int, default=42, help='semente do gerador (padrão: 42)')
+    parser.add_argument('--huge-count', type=int, default=4, help='arquivos do cenário huge (padrão: 4)')
+    parser.add_argument('--huge-mb', type=int, default=256, help='tamanho de cada arquivo do cenário huge em MB (padrão: 256)')
+    parser.add_argument('--workdir', default=None, help='pasta de trabalho (padrão: pasta temporária)')
+    parser.add_argument('--keep', action='store_true', help='manter os workspaces gerados')
+    parser.add_argument('--output', default=None, help='gravar resultados em JSON neste arquivo')
+    parser.add_argument('--compare', default=None, help='JSON de uma execução anterior para comparar')
+    # execucao interna de uma operacao (processo filho)
+    parser.add_argument('--_op', choices=OPERATIONS, help=argparse.SUPPRESS)
+    parser.add_argument('--_workspace', help=argparse.SUPPRESS)
+    parser.add_argument('--_duple-dir', dest='_duple_dir', help=argparse.SUPPRESS)
+    parser.add_argument('--_result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args._op:
+        _run_operation(args._op, args._workspace, args._duple_dir, args._result)
+        return 0
+
+    scenarios = [s.strip() for s in args.scenarios.split(',') if s.strip()]
+    scales = [s.strip().lower() for s in args.scale.split(',') if s.strip()]
+    for s in scenarios:
+        if s not in SCENARIOS:
+            parser.error(f"cenário desconhecido: {s}")
+    for s in scales:
+        if s not in SCALES:
+            parser.error(f"escala desconhecida: {s}")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='chromagit_bench_')
+    results = run_suite(scenarios, scales, workdir, args.seed, args.huge_count, args.huge_mb, args.keep)
+
+    report = {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nresultados salvos em: {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        compare(report, args.compare)
+
+    if not args.workdir and not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    failed = [f"{r['label']}/{op}" for r in results for op, m in r['ops'].items() if not m['ok']]
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
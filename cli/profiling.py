@@ -0,0 +1,246 @@
+# medicao de tempo e profiling de comandos (prefixo `time` e flag --profile)
+import os
+import sys
+import time
+import cProfile
+import pstats
+from collections import defaultdict
+from datetime import datetime
+
+__path__ = os.path.abspath(os.path.dirname(__file__) + '/..')
+if __path__ not in sys.path:
+    sys.path.append(__path__)
+from cli.collor import yellow, cyan_bold
+
+# contadores de "syscalls" do comando em andamento
+_counters = defaultdict(int)
+_active = False
+_hook_installed = False
+
+# eventos de auditoria (sys.addaudithook) contados durante a medicao
+_AUDIT_EVENTS = {
+    'open': 'open',
+    'os.listdir': 'listdir',
+    'os.scandir': 'listdir',
+    'shutil.copyfile': 'copy',
+    'os.remove': 'remove',
+    'shutil.rmtree': 'remove',
+    'os.mkdir': 'mkdir',
+}
+
+def _audit_hook(event, args):
+    # ganchos de auditoria nao podem ser removidos: so contam com a medicao ativa
+    if _active:
+        name = _AUDIT_EVENTS.get(event)
+        if name:
+            _counters[name] += 1
+
+def _counting(func, name):
+    # embrulha os.stat/os.lstat (que nao geram evento de auditoria)
+    def wrapper(*args, **kwargs):
+        _counters[name] += 1
+        return func(*args, **kwargs)
+    wrapper.__wrapped__ = func
+    return wrapper
+
+def _io_counters():
+    # bytes lidos/escritos pelo processo (inclui copias via sendfile), ou None
+    try:
+        with open('/proc/self/io', 'r') as f:
+            data = dict(line.split(':', 1) for line in f.read().splitlines())
+        return int(data['rchar']), int(data['wchar'])
+    except (OSError, KeyError, ValueError):
+        pass
+
+    if os.name == 'nt':
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class IO_COUNTERS(ctypes.Structure):
+                _fields_ = [(n, ctypes.c_ulonglong) for n in (
+                    'ReadOperationCount', 'WriteOperationCount', 'OtherOperationCount',
+                    'ReadTransferCount', 'WriteTransferCount', 'OtherTransferCount')]
+
+            counters = IO_COUNTERS()
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            if kernel32.GetProcessIoCounters(kernel32.GetCurrentProcess(), ctypes.byref(counters)):
+                return counters.ReadTransferCount, counters.WriteTransferCount
+        except Exception:
+            pass
+    return None
+
+def _format_bytes(nbytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if nbytes < 1024:
+            return f"{nbytes:.0f}{unit}" if unit == "B" else f"{nbytes:.1f}{unit}"
+        nbytes /= 1024
+    return f"{nbytes:.1f}TB"
+
+def _frame_name(func):
+    filename, line, name = func
+    if filename == '~':
+        # funcoes embutidas: "<built-in method posix.stat>"
+        return name.strip('<>')
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+def write_collapsed(stats, path, min_seconds=1e-6, max_depth=64):
+    """
+    Converte um pstats.Stats em pilhas colapsadas (formato do flamegraph.pl / speedscope).
+
+    O cProfile não guarda pilhas completas: o tempo de cada função é distribuído
+    entre os caminhos de chamada proporcionalmente ao tempo de cada aresta
+    chamador -> chamado, que é a aproximação usual para gerar flamegraphs a partir
+    de perfis determinísticos.
+    """
+    raw = stats.stats
+    callees = defaultdict(dict)
+    for func, (cc, nc, tt, ct, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees[caller][func] = edge[3]
+
+    roots = [func for func, value in raw.items() if not any(c in raw for c in value[4])]
+
+    def reach(start, seen):
+        pending = list(start)
+        while pending:
+            func = pending.pop()
+            if func not in seen:
+                seen.add(func)
+                pending.extend(callees.get(func, ()))
+
+    # funcoes so chamadas dentro de um ciclo (a -> b -> a, com a entrada do
+    # ciclo fora do perfil) nao tem raiz: a de maior tempo acumulado de cada
+    # ciclo vira raiz, senao o tempo delas some do flamegraph
+    reached = set()
+    reach(roots, reached)
+    for func in sorted(raw, key=lambda f: raw[f][3], reverse=True):
+        if func not in reached:
+            roots.append(func)
+            reach([func], reached)
+
+    samples = defaultdict(float)
+
+    def emit(func, budget, stack, seen):
+        cc, nc, tt, ct, callers = raw[func]
+        scale = budget / ct if ct > 0 else 0.0
+        samples[';'.join(stack)] += tt * scale
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_ct in callees.get(func, {}).items():
+            share = edge_ct * scale
+            if callee in seen or share < min_seconds:
+                continue
+            emit(callee, share, stack + [_frame_name(callee)], seen | {callee})
+
+    for root in roots:
+        emit(root, raw[root][3], [_frame_name(root)], {root})
+
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, seconds in sorted(samples.items()):
+            micros = int(round(seconds * 1_000_000))
+            if micros > 0:
+                f.write(f"{stack} {micros}\n")
+
+class CommandTimer:
+    """
+    Mede um comando: tempo de parede, CPU (usuário/sistema), arquivos
+    consultados (stat), abertos, pastas listadas e bytes lidos/escritos.
+    Com profile_dir, grava também o perfil do cProfile (.prof, pstats) e as
+    pilhas colapsadas (.collapsed, para flamegraph).
+
+    Uso:
+        with CommandTimer("commit", profile_dir=".chromagit_profiles"):
+            cmd_commit("msg")
+    """
+
+    def __init__(self, label, profile_dir=None, report=True):
+        self.label = label
+        self.profile_dir = profile_dir
+        self.report = report
+        self.result = None
+        self._profiler = None
+
+    def __enter__(self):
+        global _active, _hook_installed
+        if not _hook_installed:
+            sys.addaudithook(_audit_hook)
+            _hook_installed = True
+
+        _counters.clear()
+        self._saved = (os.stat, os.lstat)
+        os.stat = _counting(os.stat, 'stat')
+        os.lstat = _counting(os.lstat, 'stat')
+        _active = True
+
+        self._io_start = _io_counters()
+        self._times_start = os.times()
+        self._wall_start = time.perf_counter()
+
+        if self.profile_dir:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _active
+        if self._profiler:
+            self._profiler.disable()
+
+        wall = time.perf_counter() - self._wall_start
+        times_end = os.times()
+        io_end = _io_counters()
+
+        _active = False
+        os.stat, os.lstat = self._saved
+
+        self.result = {
+            'command': self.label,
+            'wall': wall,
+            'user': times_end.user - self._times_start.user,
+            'system': times_end.system - self._times_start.system,
+            'stat': _counters['stat'],
+            'open': _counters['open'],
+            'listdir': _counters['listdir'],
+            'copy': _counters['copy'],
+            'bytes_read': io_end[0] - self._io_start[0] if io_end and self._io_start else None,
+            'bytes_written': io_end[1] - self._io_start[1] if io_end and self._io_start else None,
+        }
+
+        if self._profiler:
+            self.result['profile'] = self._save_profile()
+
+        if self.report:
+            self.print_report()
+        return False
+
+    def _save_profile(self):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        # milissegundos e pid: execucoes do mesmo comando no mesmo segundo (modo -f)
+        # nao podem sobrescrever o perfil uma da outra
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        base = os.path.join(self.profile_dir, f"{self.label}-{stamp}-{os.getpid()}")
+        n = 1
+        while os.path.exists(base + ".prof"):
+            n += 1
+            base = os.path.join(self.profile_dir, f"{self.label}-{stamp}-{os.getpid()}-{n}")
+
+        self._profiler.dump_stats(base + ".prof")
+        stats = pstats.Stats(self._profiler)
+        write_collapsed(stats, base + ".collapsed")
+        return base
+
+    def print_report(self):
+        r = self.result
+        cpu = r['user'] + r['system']
+        print(cyan_bold(f"\n[TEMPO] {r['command']}"))
+        print(f"  parede: {r['wall']:.3f}s | cpu: {cpu:.3f}s "
+              f"(usuário {r['user']:.3f}s, sistema {r['system']:.3f}s)")
+        print(f"  stat: {r['stat']} | open: {r['open']} | listdir: {r['listdir']} | copyfile: {r['copy']}")
+        if r['bytes_read'] is not None:
+            print(f"  lidos: {_format_bytes(r['bytes_read'])} | escritos: {_format_bytes(r['bytes_written'])}")
+        else:
+            print("  lidos/escritos: não disponível nesta plataforma")
+        if r.get('profile'):
+            print(yellow(f"  perfil: {r['profile']}.prof (pstats) e {r['profile']}.collapsed (flamegraph)"))
@@ -1,6 +1,7 @@
 # sistema de log de progresso em tempo real
 import sys
 import time
+import threading
 from datetime import datetime
 
 # importar cores
@@ -12,8 +13,11 @@ from cli.collor import yellow, green_bold, red_bold
 
 class ProgressLogger:
     # Log de progresso em tempo real com barra visual
+    # Conta itens e, opcionalmente, bytes; pode ser atualizado por várias threads
+    # ao mesmo tempo e redesenha a linha no máximo a cada redraw_interval segundos
     
-    def __init__(self, message, total=100, show_percentage=True, show_time=True):
+    def __init__(self, message, total=100, show_percentage=True, show_time=True,
+                 total_bytes=None, redraw_interval=0.1):
         self.message = message
         self.total = total
         self.current = 0
@@ -21,6 +25,15 @@ class ProgressLogger:
         self.show_time = show_time
         self.start_time = None
         self.last_update_time = None
+        # progresso em bytes: quando total_bytes é informado, porcentagem,
+        # velocidade e tempo restante são calculados pelos bytes
+        self.total_bytes = total_bytes
+        self.bytes_done = 0
+        # limite de redesenho (~10 Hz): a saída do terminal não vira gargalo
+        self.redraw_interval = redraw_interval
+        self._last_draw_time = 0.0
+        self._last_message = None
+        self._lock = threading.Lock()
         
     def __enter__(self):
         self.start()
@@ -37,31 +50,52 @@ class ProgressLogger:
         sys.stdout.write(f"\n{yellow('chromagit >')} {self.message}\n")
         sys.stdout.flush()
     
-    def update(self, increment=1, custom_message=None):
-        # atualizar o progresso
-        self.current = min(self.current + increment, self.total)
-        self.last_update_time = time.time()
-        self._display(custom_message)
+    def update(self, increment=1, custom_message=None, nbytes=0):
+        # atualizar o progresso (seguro entre threads)
+        with self._lock:
+            self.current = min(self.current + increment, self.total)
+            self.bytes_done += nbytes
+            now = time.time()
+            self.last_update_time = now
+            if custom_message:
+                self._last_message = custom_message
+            
+            # só redesenha se passou o intervalo mínimo (ou se chegou ao fim)
+            if now - self._last_draw_time < self.redraw_interval and self.current < self.total:
+                return
+            self._last_draw_time = now
+            self._display(self._last_message)
+    
+    def add_bytes(self, nbytes, custom_message=None):
+        # registrar bytes transferidos sem contar um novo item
+        self.update(0, custom_message, nbytes)
+    
+    def _fraction(self):
+        # fração concluída: por bytes quando conhecidos, senão por itens
+        if self.total_bytes:
+            return min(self.bytes_done / self.total_bytes, 1.0)
+        if self.total > 0:
+            return self.current / self.total
+        return 0.0
     
     def _display(self, custom_message=None):
         # exibir o progresso atual
-        # Calcula porcentagem
-        percentage = (self.current / self.total * 100) if self.total > 0 else 0
+        fraction = self._fraction()
+        percentage = fraction * 100
         
         # Calcula tempo decorrido
         elapsed = time.time() - self.start_time if self.start_time else 0
         
-        # Calcula tempo estimado restante
-        if self.current > 0 and elapsed > 0:
-            rate = self.current / elapsed
-            remaining = (self.total - self.current) / rate if rate > 0 else 0
+        # Calcula tempo estimado restante (pelos bytes quando disponíveis)
+        if fraction > 0 and elapsed > 0:
+            remaining = elapsed * (1 - fraction) / fraction
             remaining_str = self._format_time(remaining)
         else:
             remaining_str = "calculando..."
         
         # Barra de progresso visual (20 caracteres)
         bar_width = 20
-        filled = int(bar_width * self.current / self.total) if self.total > 0 else 0
+        filled = int(bar_width * fraction)
         bar = "█" * filled + "░" * (bar_width - filled)
         
         # Monta a mensagem
@@ -74,15 +108,28 @@ class ProgressLogger:
             elapsed_str = self._format_time(elapsed)
             parts.append(f"({elapsed_str} / {remaining_str})")
         
+        if self.total_bytes is not None:
+            rate = self.bytes_done / elapsed if elapsed > 0 else 0
+            parts.append(f"{self._format_bytes(self.bytes_done)}/{self._format_bytes(self.total_bytes)}"
+                         f" {self._format_bytes(rate)}/s")
+        
         progress_line = " ".join(parts)
         
         # Mensagem customizada ou padrão
         message = custom_message if custom_message else f"{self.current}/{self.total}"
         
         # Move cursor para o início da linha e sobrescreve
-        sys.stdout.write(f"\r{yellow('chromagit >')} {self.message} {progress_line} | {message}")
+        sys.stdout.write(f"\r{yellow('chromagit >')} {self.message} {progress_line} | {message}\033[K")
         sys.stdout.flush()
     
+    def _format_bytes(self, nbytes):
+        # formatar tamanho em string legível
+        for unit in ("B", "KB", "MB", "GB"):
+            if nbytes < 1024:
+                return f"{nbytes:.0f}{unit}" if unit == "B" else f"{nbytes:.1f}{unit}"
+            nbytes /= 1024
+        return f"{nbytes:.1f}TB"
+    
     def _format_time(self, seconds):
         # formatar tempo em string legível
         if seconds < 60:
@@ -98,16 +145,23 @@ class ProgressLogger:
     
     def finish(self, success_message=None):
         # finalizar o log de progresso
-        # Garante que chegou a 100%
-        if self.current < self.total:
-            self.current = self.total
-            self._display()
+        with self._lock:
+            # Garante que chegou a 100%
+            if self.current < self.total:
+                self.current = self.total
+            if self.total_bytes is not None and self.bytes_done < self.total_bytes:
+                self.bytes_done = self.total_bytes
+            self._display(self._last_message)
         
         elapsed = time.time() - self.start_time if self.start_time else 0
         elapsed_str = self._format_time(elapsed)
         
         # Limpa a linha de progresso e mostra resultado final
-        sys.stdout.write("\r" + " " * 100 + "\r")  # Limpa a linha
+        sys.stdout.write("\r\033[K")  # Limpa a linha
+        
+        if self.total_bytes:
+            rate = self.total_bytes / elapsed if elapsed > 0 else 0
+            elapsed_str += f", {self._format_bytes(self.total_bytes)} a {self._format_bytes(rate)}/s"
         
         if success_message:
             print(f"{green_bold('[OK]')} {success_message} ({elapsed_str})")
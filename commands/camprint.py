@@ -13,6 +13,7 @@ sys.path.append(__path__)
 from cli.collor import *
 from utils.config import find_documents_folder, locate_university_folder
 from cli.progress import ProgressLogger
+from utils.transfer import measure_items, copy_item
 
 class Camprint:
     def __init__(self):
@@ -86,6 +87,10 @@ if __name__ == "__main__":
             "*.pyc",          # Arquivos compilados Python
             ".vscode",        # Configurações VS Code
             "*.git",          # Qualquer arquivo .git
+            "estrutura_projeto.jsonl",  # Diário do cltdds (reescrito a cada varredura)
+            "estrutura_projeto.db",     # Índice do ChromaBuddy (SQLite em WAL, sempre aberto)
+            "estrutura_projeto.db-wal",
+            "estrutura_projeto.db-shm",
         ]
         
         # Função auxiliar para verificar se deve ignorar
@@ -130,23 +135,18 @@ if __name__ == "__main__":
             except PermissionError:
                 print(yellow(f"[AVISO] Permissão negada ao limpar: {item}"))
         
-        # Depois copia os novos arquivos com barra de progresso
+        # Depois copia os novos arquivos com barra de progresso (arquivos e bytes)
+        files, total_bytes = measure_items(camprint.path, items_to_copy)
         files_copied = []
-        with ProgressLogger("Copiando arquivos para área invisível...", total=len(items_to_copy)) as p:
+        with ProgressLogger("Copiando arquivos para área invisível...", total=files, total_bytes=total_bytes) as p:
             for item in items_to_copy:
                 s = os.path.join(camprint.path, item)
                 d = os.path.join(camprint.invisible_folder, item)
                 try:
-                    if os.path.isdir(s):
-                        shutil.copytree(s, d, dirs_exist_ok=True)
-                        files_copied.append(f"{item}/")
-                    else:
-                        shutil.copy2(s, d)
-                        files_copied.append(item)
+                    copy_item(s, d, p)
+                    files_copied.append(f"{item}/" if os.path.isdir(s) else item)
                 except PermissionError:
                     print(yellow(f"[AVISO] Permissão negada: {item}"))
-                finally:
-                    p.update(1, custom_message=item)
                 
         # Salva o log do commit
         camprint.save_commit_log(args.message, files_copied)
@@ -10,10 +10,19 @@ from cli.collor import yellow, green_bold, red_bold
 from utils.config import find_documents_folder
 
 class Duple:
-    def __init__(self, repo_name_or_path=None):
+    def __init__(self, repo_name_or_path=None, assume_yes=False):
         self.chroma_folder = find_documents_folder()
         self.current_workspace = os.getcwd()
         self.repo_name = repo_name_or_path
+        # responder "sim" a todas as confirmações (modo não interativo)
+        self.assume_yes = assume_yes
+
+    def confirm(self, question):
+        """Pede confirmação ao usuário, a menos que assume_yes esteja ativo"""
+        if self.assume_yes:
+            return True
+        answer = input(f"{question} (s/n): ").strip().lower()
+        return answer in ['s', 'sim', 'y', 'yes']
 
     def normalize_path(self, path):
         """Normaliza o caminho, removendo aspas e convertendo barras"""
@@ -62,8 +71,7 @@ class Duple:
         
         # Verificar se já existe no destino
         if os.path.exists(dest_path):
-            overwrite = input(f"'{dest_name}' já existe. Sobrescrever? (s/n): ").strip().lower()
-            if overwrite not in ['s', 'sim', 'y', 'yes']:
+            if not self.confirm(f"'{dest_name}' já existe. Sobrescrever?"):
                 print(yellow("Operação cancelada"))
                 return False
             
@@ -89,13 +97,13 @@ class Duple:
         
         if not self.repo_name:
             print(red_bold("Nome do repositório não pode ser vazio"))
-            return
+            return False
         
         # Encontrar o repositório
         repo_path = self.find_repository_path(self.repo_name)
         if not repo_path:
             print(red_bold(f"Repositório '{self.repo_name}' não encontrado"))
-            return
+            return False
         
         repo_name = self.get_repo_name_from_path(repo_path)
         
@@ -103,19 +111,20 @@ class Duple:
         print(f"📁 {repo_path}")
         
         # Confirmar cópia
-        confirm = input(f"Copiar para '{self.current_workspace}'? (s/n): ").strip().lower()
-        if confirm not in ['s', 'sim', 'y', 'yes']:
+        if not self.confirm(f"Copiar para '{self.current_workspace}'?"):
             print(yellow("Operação cancelada"))
-            return
+            return False
         
         # Copiar
         result = self.copy_repository_to_workspace(repo_path, repo_name)
         if result:
             print(green_bold(f"✅ Repositório copiado para: {result}"))
+            return True
         else:
             print(red_bold("❌ Falha ao copiar repositório"))
+            return False
 
 # função para uso rápido
-def duple(repo_name=None):
-    d = Duple(repo_name)
-    d.run()
\ No newline at end of file
+def duple(repo_name=None, assume_yes=False):
+    d = Duple(repo_name, assume_yes)
+    return d.run()
\ No newline at end of file
@@ -6,7 +6,6 @@ __path__ = os.path.abspath(os.path.dirname(__file__) + '/..')
 sys.path.append(__path__)
 from cli.collor import red_bold, green_bold, yellow
 from utils.config import find_documents_folder
-from .noctis_map import scan_map, view_map, ide_map
 
 class Hub:
     def __init__(self):
@@ -114,6 +113,7 @@ class Hub:
             print(red_bold(f"Repositório '{repo_name}' não encontrado"))
             return
         print(green_bold(f"Visualizando estrutura de {repo_name}"))
+        from .noctis_map import view_map
         view_map(repo_path)
 
     def scan_repository(self, repo_name):
@@ -123,6 +123,7 @@ class Hub:
             print(red_bold(f"Repositório '{repo_name}' não encontrado"))
             return
         print(green_bold(f"Escaneando conteúdo de {repo_name}"))
+        from .noctis_map import scan_map
         scan_map(repo_path)
 
     def edit_file_in_repository(self, repo_name):
@@ -152,6 +153,7 @@ class Hub:
                 if 0 <= index < len(files):
                     file_path = os.path.join(repo_path, files[index])
                     print(green_bold(f"Editando {files[index]}"))
+                    from .noctis_map import ide_map
                     ide_map(file_path)
                 else:
                     print(red_bold("Número inválido"))
@@ -160,8 +162,36 @@ class Hub:
         except PermissionError:
             print(red_bold("Sem permissão para acessar os arquivos"))
 
-    def run(self):
-        """Executa o hub interativo"""
+    def run_action(self, action, repo_name=None):
+        """Executa uma ação do hub sem menus (modo não interativo)"""
+        if action == 'list':
+            self.print_repositories()
+            return True
+        
+        if not repo_name:
+            print(red_bold(f"[ERRO] A ação '{action}' precisa do nome do repositório"))
+            return False
+        
+        if repo_name not in self.list_repositories():
+            print(red_bold(f"Repositório '{repo_name}' não encontrado"))
+            return False
+        
+        if action == 'info':
+            self.show_repository_info(repo_name)
+        elif action == 'view':
+            self.view_repository(repo_name)
+        elif action == 'scan':
+            self.scan_repository(repo_name)
+        else:
+            print(red_bold(f"[ERRO] Ação desconhecida: {action}"))
+            return False
+        return True
+
+    def run(self, repo_name=None, action=None):
+        """Executa o hub interativo (ou uma única ação, se informada)"""
+        if action:
+            return self.run_action(action, repo_name)
+        
         print(green_bold("ChromaGit Hub"))
         
         repos = self.list_repositories()
@@ -203,6 +233,6 @@ class Hub:
                 break
 
 # função para uso rápido
-def hub():
+def hub(repo_name=None, action=None):
     h = Hub()
-    h.run()
\ No newline at end of file
+    return h.run(repo_name, action)
\ No newline at end of file
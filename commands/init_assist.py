@@ -6,7 +6,6 @@ Coleta dados do repositório, configura o assistente e gera estrutura do projeto
 
 import os
 import sys
-import json
 import subprocess
 from pathlib import Path
 from typing import Dict, Any, Optional
@@ -18,7 +17,8 @@ sys.path.insert(0, CHROMABUDDY_PATH)
 from ChromaBuddy.core.config import ConfigManager
 from ChromaBuddy.core.ui import get_ui, get_logger
 from ChromaBuddy.core.git import GitIntegration
-from ChromaBuddy.locate.dds import cltdds
+from locate.dds import cltdds
+from locate.indice import abrir_indice
 
 
 class AssistantInitializer:
@@ -108,14 +108,11 @@ class AssistantInitializer:
         try:
             api_key = self.config.get_api_key()
             
+            # o cltdds grava o indice (estrutura_projeto.db) e o estrutura_projeto.json
             with self.ui.spinner("Analisando estrutura do repositório..."):
                 self.repo_structure = cltdds(self.repo_path, api_key)
             
-            # Salvar estrutura em arquivo
             output_path = os.path.join(self.repo_path, 'estrutura_projeto.json')
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(self.repo_structure, f, indent=2, ensure_ascii=False)
-            
             self.logger.success(f"Estrutura salva em: {output_path}")
             return self.repo_structure
             
@@ -132,12 +129,10 @@ class AssistantInitializer:
         if not self.repo_structure:
             return {}
         
-        counts = {}
-        for item in self.repo_structure.get('estrutura', []):
-            tipo = item.get('tipo', 'desconhecido')
-            counts[tipo] = counts.get(tipo, 0) + 1
-        
-        return counts
+        indice = abrir_indice(self.repo_path)
+        if indice is None:
+            return {}
+        return indice.contar_por_tipo()
     
     def display_summary(self):
         """Exibe resumo bonito da inicialização"""
@@ -168,8 +163,8 @@ class AssistantInitializer:
         
         # Estatísticas da estrutura
         if self.repo_structure:
-            total_files = len(self.repo_structure.get('estrutura', []))
             file_counts = self.count_files_by_type()
+            total_files = sum(file_counts.values())
             
             stats_content = f"[bold]Total de arquivos analisados:[/bold] {total_files}\n\n"
             for tipo, count in file_counts.items():
@@ -1,7 +1,6 @@
 # new => novo repositorio
 import os
 import sys
-import urllib.request
 import json
 
 __path__ = os.path.abspath(os.path.dirname(__file__) + '/..')
@@ -72,6 +71,8 @@ dist/
                 if not filename:
                     return "# Arquivos a ignorar\n"
                 
+                # importado aqui: urllib.request (http.client, email, ssl) pesa na inicialização
+                import urllib.request
                 url = f"https://raw.githubusercontent.com/github/gitignore/main/{filename}"
                 with urllib.request.urlopen(url) as response:
                     template = response.read().decode('utf-8')
@@ -158,12 +159,23 @@ dist/
                     f.write(f"# {self.repo_name}\n\nDescrição do projeto.\n")
             print(green_bold(f"[SUCESSO] Arquivo '{file_name}' criado"))
 
-    def create(self):
+    def create(self, repo_name=None, initial_files=None):
+        """
+        Cria o repositório. Sem argumentos pergunta tudo ao usuário;
+        com repo_name e initial_files roda sem nenhum prompt.
+        """
         print("Criando novo repositório ChromaGit...")
         
-        self.get_repo_name()
+        if repo_name:
+            if os.path.exists(os.path.join(self.chroma_folder, repo_name)):
+                print(red_bold(f"[ERRO] Repositório '{repo_name}' já existe"))
+                return False
+            self.repo_name = repo_name
+        else:
+            self.get_repo_name()
         
-        initial_files = self.ask_initial_files()
+        if initial_files is None:
+            initial_files = self.ask_initial_files()
         
         repo_path = self.create_repo_folder()
         
@@ -171,8 +183,9 @@ dist/
             self.add_initial_files(repo_path, initial_files)
         
         print(green_bold(f"[SUCESSO] Repositório '{self.repo_name}' criado com sucesso!"))
+        return True
 
 # função para uso rápido
-def new():
+def new(repo_name=None, initial_files=None):
     n = New()
-    n.create()
\ No newline at end of file
+    return n.create(repo_name, initial_files)
\ No newline at end of file
@@ -10,6 +10,11 @@ sys.path.append(__path__)
 from cli.collor import red_bold, green_bold, yellow
 from utils.config import locate_university_folder, find_documents_folder
 from cli.progress import ProgressLogger
+from utils.transfer import measure_items, copy_item
+
+# arquivos de trabalho do ChromaBuddy: o diario do cltdds e o indice (SQLite em WAL: copiados no
+# meio de uma escrita ficam inconsistentes)
+SKIP_ITEMS = {"estrutura_projeto.jsonl", "estrutura_projeto.db", "estrutura_projeto.db-wal", "estrutura_projeto.db-shm"}
 
 class Save:
     def __init__(self):
@@ -71,18 +76,15 @@ class Save:
             else:
                 os.makedirs(destination, exist_ok=True)
             
-            # lista itens a copiar
-            items = [i for i in os.listdir(invisible_folder) if i != ".git"]
-            # copia o conteúdo da pasta invisível para o destino com barra de progresso
-            with ProgressLogger("Salvando no ChromaGithub...", total=len(items)) as p:
+            # lista itens a copiar (sem o diario e o indice do ChromaBuddy, que o commit tambem ignora)
+            items = [i for i in os.listdir(invisible_folder) if i != ".git" and i not in SKIP_ITEMS]
+            files, total_bytes = measure_items(invisible_folder, items)
+            # copia o conteúdo da pasta invisível para o destino com barra de progresso (arquivos e bytes)
+            with ProgressLogger("Salvando no ChromaGithub...", total=files, total_bytes=total_bytes) as p:
                 for item in items:
                     src_path = os.path.join(invisible_folder, item)
                     dst_path = os.path.join(destination, item)
-                    if os.path.isdir(src_path):
-                        shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
-                    else:
-                        shutil.copy2(src_path, dst_path)
-                    p.update(1, custom_message=item)
+                    copy_item(src_path, dst_path, p)
             
             print(green_bold("[OK] Alterações salvas em ChromaGithub"))
             print(yellow("Destino: ") + destination)
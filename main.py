@@ -1,5 +1,7 @@
 import os
 import sys
+import shlex
+import argparse
 
 # importar cores
 __path__ = os.path.abspath(os.path.dirname(__file__))
@@ -7,20 +9,31 @@ if __path__ not in sys.path:
     sys.path.append(__path__)
 from cli.collor import yellow, green_bold, red_bold, blue_bold, cyan_bold
 from commands import init as init_cmd, Camprint, Save, New, Hub, Duple
+from cli.progress import ProgressLogger
+from utils.transfer import measure_items, copy_item
 
-# Importar ChromaBuddy
-try:
-    chromabuddy_path = os.path.join(__path__, 'ChromaBuddy')
-    if chromabuddy_path not in sys.path:
-        sys.path.insert(0, chromabuddy_path)
-    from ChromaBuddy.chat import ChromaBuddyPro
-    from ChromaBuddy.core.config import ConfigManager
-    from ChromaBuddy.core.ui import get_ui, get_logger
-    from ChromaBuddy.models.cohe import generate
-    CHROMABUDDY_AVAILABLE = True
-except ImportError as e:
-    CHROMABUDDY_AVAILABLE = False
-    CHROMABUDDY_ERROR = str(e)
+# ChromaBuddy (cohere, rich e todos os módulos core) só é importado no primeiro
+# uso de buddy/ask/analyze/gerardds, para o prompt abrir rápido
+CHROMABUDDY_AVAILABLE = None
+CHROMABUDDY_ERROR = None
+
+def load_chromabuddy():
+    global CHROMABUDDY_AVAILABLE, CHROMABUDDY_ERROR
+    global ChromaBuddyPro, ConfigManager, generate, generate_stream, is_error, prompt_room
+    if CHROMABUDDY_AVAILABLE is None:
+        try:
+            chromabuddy_path = os.path.join(__path__, 'ChromaBuddy')
+            if chromabuddy_path not in sys.path:
+                sys.path.insert(0, chromabuddy_path)
+            from ChromaBuddy.chat import ChromaBuddyPro
+            from ChromaBuddy.core.config import ConfigManager
+            # mesmo modulo que o ChromaBuddy usa internamente (pool de clientes compartilhado)
+            from models.cohe import generate, generate_stream, is_error, prompt_room
+            CHROMABUDDY_AVAILABLE = True
+        except ImportError as e:
+            CHROMABUDDY_AVAILABLE = False
+            CHROMABUDDY_ERROR = str(e)
+    return CHROMABUDDY_AVAILABLE
 
 # util: formatar prompt com nome da pasta atual
 def prompt():
@@ -29,19 +42,20 @@ def prompt():
     return f"{yellow('chromagit >')} {folder} $ "
 
 # comando: cd
-def cmd_cd(args):
-    if not args:
+def cmd_cd(path=None):
+    if not path:
         print(red_bold("[ERRO] Uso: cd <caminho>"))
-        return
-    path = args[0]
+        return False
     try:
         os.chdir(path)
+        return True
     except FileNotFoundError:
         print(red_bold("[ERRO] Caminho não encontrado"))
     except NotADirectoryError:
         print(red_bold("[ERRO] Não é um diretório"))
     except PermissionError:
         print(red_bold("[ERRO] Permissão negada"))
+    return False
 
 # comando: pwd
 def cmd_pwd():
@@ -53,9 +67,12 @@ def cmd_help():
     print("  cd <pasta>     - mudar de diretório")
     print("  pwd            - mostrar diretório atual")
     print("  init [path]    - inicializar repositório ChromaGit")
-    print("  new            - criar novo repositório em Documents/ChromaGithub")
+    print("  new [nome]     - criar novo repositório em Documents/ChromaGithub")
+    print("                   (--gitignore <tipo> --readme para não perguntar)")
     print("  hub            - explorar repositórios em Documents/ChromaGithub")
+    print("                   (hub --list | hub <repo> --info/--view/--scan)")
     print("  duple <repo>   - copiar repositório do ChromaGithub para workspace")
+    print("                   (--yes para não pedir confirmação)")
     print("  commit [-m msg]- copiar para área invisível e registrar log")
     print("  save           - salvar em Documents/ChromaGithub/<repo>")
     print()
@@ -63,29 +80,29 @@ def cmd_help():
     print("  buddy          - iniciar ChromaBuddy (assistente interativo)")
     print("  ask <pergunta> - fazer pergunta rápida ao assistente")
     print("  analyze <file> - analisar arquivo com IA")
-    print("  gerardds       - gerar estrutura_projeto.json para o workspace atual")
+    print("  gerardds       - gerar estrutura_projeto.json para o workspace atual (--full: tudo de novo)")
     print()
+    print("  time <comando> - executar comando medindo tempo, CPU e E/S")
     print("  help           - listar comandos")
     print("  exit | quit    - sair")
+    print()
+    print(cyan_bold("fora do prompt:"))
+    print("  chromagit <comando> [args]   - executar um comando e sair")
+    print("  chromagit -f script.txt      - executar um comando por linha e sair")
+    print("  chromagit --profile          - medir todos os comandos e gravar perfis cProfile")
+    print("  chromagit --profile-dir PASTA - idem, gravando os perfis na pasta")
 
 # comando: init (wrapper)
-def cmd_init(args):
-    path = args[0] if args else None
-    init_cmd(path)
+def cmd_init(path=None):
+    return init_cmd(path)
 
 # comando: commit (usa Camprint)
-def cmd_commit(args):
-    # extrair mensagem simples: -m <msg>
-    message = "Commit sem mensagem"
-    if args:
-        if args[0] in ("-m", "--message") and len(args) >= 2:
-            message = " ".join(args[1:])
-        else:
-            message = " ".join(args)
+def cmd_commit(message=None):
+    message = message or "Commit sem mensagem"
 
     camprint = Camprint()
     if not camprint.locate_invisible_folder():
-        return
+        return False
 
     print(yellow("\nchromagit >") + " Commitando alterações...")
 
@@ -98,6 +115,10 @@ def cmd_commit(args):
             "*.pyc",
             ".vscode",
             "*.git",
+            "estrutura_projeto.jsonl",
+            "estrutura_projeto.db",
+            "estrutura_projeto.db-wal",
+            "estrutura_projeto.db-shm",
         ]
 
         def should_ignore(name, full_path):
@@ -132,56 +153,56 @@ def cmd_commit(args):
                 print(yellow(f"[AVISO] Permissão negada ao limpar: {item}"))
 
         # copiar arquivos
+        items_to_copy = [
+            item for item in os.listdir(camprint.path)
+            if not should_ignore(item, os.path.join(camprint.path, item))
+        ]
+        files, total_bytes = measure_items(camprint.path, items_to_copy)
+
         files_copied = []
-        for item in os.listdir(camprint.path):
-            item_path = os.path.join(camprint.path, item)
-            if should_ignore(item, item_path):
-                continue
-            s = os.path.join(camprint.path, item)
-            d = os.path.join(camprint.invisible_folder, item)
-            try:
-                import shutil
-                if os.path.isdir(s):
-                    shutil.copytree(s, d, dirs_exist_ok=True)
-                    files_copied.append(f"{item}/")
-                else:
-                    shutil.copy2(s, d)
-                    files_copied.append(item)
-            except PermissionError:
-                print(yellow(f"[AVISO] Permissão negada: {item}"))
+        with ProgressLogger("Copiando arquivos para área invisível...", total=files, total_bytes=total_bytes) as p:
+            for item in items_to_copy:
+                s = os.path.join(camprint.path, item)
+                d = os.path.join(camprint.invisible_folder, item)
+                try:
+                    copy_item(s, d, p)
+                    files_copied.append(f"{item}/" if os.path.isdir(s) else item)
+                except PermissionError:
+                    print(yellow(f"[AVISO] Permissão negada: {item}"))
 
         camprint.save_commit_log(message, files_copied)
         print(green_bold("[OK] Commit realizado com sucesso"))
+        return True
     except Exception as e:
         print(red_bold(f"[ERRO] {str(e)}"))
+        return False
 
 # comando: save (usa Save)
 def cmd_save():
     s = Save()
-    s.save()
+    return s.save()
 
 # comando: new (usa New)
-def cmd_new():
+def cmd_new(repo_name=None, initial_files=None):
     n = New()
-    n.create()
+    return n.create(repo_name, initial_files)
 
 # comando: hub (usa Hub)
-def cmd_hub():
+def cmd_hub(repo_name=None, action=None):
     h = Hub()
-    h.run()
+    return h.run(repo_name, action)
 
 # comando: duple (usa Duple)
-def cmd_duple(args):
-    repo_name = ' '.join(args) if args else None
-    d = Duple(repo_name)
-    d.run()
+def cmd_duple(repo_name=None, assume_yes=False):
+    d = Duple(repo_name, assume_yes)
+    return d.run()
 
 # comando: buddy (ChromaBuddy interativo)
 def cmd_buddy():
-    if not CHROMABUDDY_AVAILABLE:
+    if not load_chromabuddy():
         print(red_bold("[ERRO] ChromaBuddy não disponível"))
         print(f"Detalhes: {CHROMABUDDY_ERROR}")
-        return
+        return False
     
     try:
         print(cyan_bold("\n=== ChromaBuddy PRO ==="))
@@ -196,37 +217,30 @@ def cmd_buddy():
         if not api_key:
             print(yellow("[AVISO] API key não configurada"))
             print("Configure em ChromaBuddy/config.json")
-            return
+            return False
         
         # Obter diretório de trabalho atual
         project_root = os.getcwd()
         
-        # Gerar estrutura do projeto automaticamente
-        estrutura_path = os.path.join(project_root, 'estrutura_projeto.json')
-        if not os.path.exists(estrutura_path):
-            print(yellow(f"Analisando workspace: {project_root}"))
-            print(yellow("Gerando estrutura do projeto... (isso pode levar alguns segundos)"))
+        # Gerar estrutura do projeto automaticamente: o indice do AST sai na hora e as
+        # descricoes dos arquivos novos ou alterados sao geradas em segundo plano
+        enriquecedor = None
+        try:
+            from locate.dds import cltdds_em_segundo_plano
             
-            try:
-                from ChromaBuddy.locate.dds import cltdds
-                import json
-                
-                estrutura = cltdds(project_root, api_key)
-                
-                # Salvar estrutura
-                with open(estrutura_path, 'w', encoding='utf-8') as f:
-                    json.dump(estrutura, f, indent=2, ensure_ascii=False)
-                
-                num_arquivos = len(estrutura.get('estrutura', []))
-                print(green_bold(f"✓ Estrutura gerada! {num_arquivos} arquivos analisados.\n"))
-            except Exception as e:
-                print(yellow(f"[AVISO] Não foi possível gerar estrutura completa: {e}"))
-                print(yellow("Continuando sem estrutura (funcionalidade limitada).\n"))
-        else:
-            print(green_bold(f"✓ Usando estrutura existente: {estrutura_path}\n"))
+            estrutura, enriquecedor = cltdds_em_segundo_plano(project_root, api_key)
+            num_arquivos = len(estrutura.get('estrutura', []))
+            print(green_bold(f"✓ Estrutura indexada: {num_arquivos} arquivos."))
+            if enriquecedor.total:
+                print(yellow(f"  Descrevendo {enriquecedor.total} arquivos em segundo plano (veja /pwd)."))
+            print()
+        except Exception as e:
+            print(yellow(f"[AVISO] Não foi possível gerar estrutura completa: {e}"))
+            print(yellow("Continuando sem estrutura (funcionalidade limitada).\n"))
         
         # Inicializar ChromaBuddy
         buddy = ChromaBuddyPro(config, project_root)
+        buddy.enriquecedor = enriquecedor
         
         print(green_bold("ChromaBuddy iniciado. Digite /help para ver comandos."))
         print(yellow("Digite 'exit' ou pressione Ctrl+C para sair.\n"))
@@ -256,22 +270,40 @@ def cmd_buddy():
                 break
             except EOFError:
                 break
+        # o que ja foi descrito fica salvo; o resto e descrito na proxima vez
+        buddy.stop_enrichment()
+        return True
                 
     except Exception as e:
         print(red_bold(f"[ERRO] Falha ao iniciar ChromaBuddy: {e}"))
+        return False
+
+# util: imprime a resposta do modelo trecho a trecho, a medida que chega; False se algum trecho
+# for um erro (o erro chega como trecho LLMErrorResult, que deixa de ser reconhecivel depois do join)
+def print_stream(chunks):
+    ok = True
+    ultimo = ''
+    for trecho in chunks:
+        if is_error(trecho):
+            ok = False
+        sys.stdout.write(trecho)
+        sys.stdout.flush()
+        ultimo = trecho or ultimo
+    if ultimo and not ultimo.endswith('\n'):
+        sys.stdout.write('\n')
+    return ok
 
 # comando: ask (pergunta rápida ao assistente)
-def cmd_ask(args):
-    if not CHROMABUDDY_AVAILABLE:
+def cmd_ask(question=None):
+    if not load_chromabuddy():
         print(red_bold("[ERRO] ChromaBuddy não disponível"))
-        return
+        return False
     
-    if not args:
+    if not question:
         print(red_bold("[ERRO] Uso: ask <sua pergunta>"))
-        return
+        return False
     
     try:
-        question = ' '.join(args)
         
         # Carregar configuração
         config_path = os.path.join(__path__, 'ChromaBuddy', 'config.json')
@@ -280,38 +312,36 @@ def cmd_ask(args):
         
         if not api_key:
             print(red_bold("[ERRO] API key não configurada"))
-            return
+            return False
         
         print(yellow(f"\nPergunta: {question}"))
         print(cyan_bold("Processando...\n"))
         
         # Gerar resposta
         system_prompt = "Você é um assistente útil para desenvolvimento de software. Responda de forma clara e concisa."
-        resposta = generate(api_key, system_prompt, question)
-        
         print(green_bold("Resposta:"))
-        print(resposta)
+        ok = print_stream(generate_stream(api_key, system_prompt, question))
         print()
+        return ok
         
     except Exception as e:
         print(red_bold(f"[ERRO] {e}"))
+        return False
 
 # comando: analyze (analisar arquivo com IA)
-def cmd_analyze(args):
-    if not CHROMABUDDY_AVAILABLE:
+def cmd_analyze(file_path=None):
+    if not load_chromabuddy():
         print(red_bold("[ERRO] ChromaBuddy não disponível"))
-        return
+        return False
     
-    if not args:
+    if not file_path:
         print(red_bold("[ERRO] Uso: analyze <arquivo>"))
-        return
+        return False
     
     try:
-        file_path = ' '.join(args)
-        
         if not os.path.exists(file_path):
             print(red_bold(f"[ERRO] Arquivo não encontrado: {file_path}"))
-            return
+            return False
         
         # Ler arquivo
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -324,29 +354,45 @@ def cmd_analyze(args):
         
         if not api_key:
             print(red_bold("[ERRO] API key não configurada"))
-            return
+            return False
         
         print(cyan_bold(f"\nAnalisando: {file_path}"))
         print(yellow("Processando...\n"))
         
-        # Gerar análise
+        # arquivos grandes: partes nas fronteiras do AST analisadas em paralelo e juntadas num relatorio
+        # (partes que nao mudaram desde a ultima analise voltam do cache de respostas)
+        from core.chunking import dividir_codigo, analisar_partes, relatorio, cabe_inteiro
         system_prompt = "Você é um especialista em análise de código. Analise o código fornecido e forneça insights sobre qualidade, possíveis melhorias e problemas."
-        user_prompt = f"Analise este código:\n\n```\n{content}\n```"
-        
-        analise = generate(api_key, system_prompt, user_prompt)
-        
-        print(green_bold("Análise:"))
-        print(analise)
+        template = "Analise este código:\n\n```\n\n```"
+        if not cabe_inteiro(content, prompt_room(system_prompt, template)):
+            partes = dividir_codigo(content)
+            print(yellow(f"[INFO] Arquivo grande: {len(partes)} partes analisadas em paralelo"))
+            analises = analisar_partes(api_key, partes, os.path.basename(file_path))
+            falhas = sum(1 for a in analises if a is None)
+            if falhas == len(analises):
+                print(red_bold("[ERRO] Nenhuma parte pôde ser analisada"))
+                return False
+            if falhas:
+                print(yellow(f"[AVISO] {falhas} parte(s) sem análise"))
+            print(green_bold("Análise:"))
+            ok = print_stream(relatorio(api_key, partes, analises, os.path.basename(file_path)))
+        else:
+            user_prompt = f"Analise este código:\n\n```\n{content}\n```"
+            print(green_bold("Análise:"))
+            ok = print_stream(generate_stream(api_key, system_prompt, user_prompt))
         print()
+        return ok
         
     except Exception as e:
         print(red_bold(f"[ERRO] {e}"))
+        return False
 
 # comando: gerardds (gerar estrutura_projeto.json)
-def cmd_gerardds():
-    if not CHROMABUDDY_AVAILABLE:
+# incremental: so arquivos novos ou alterados desde o ultimo estrutura_projeto.json vao ao modelo
+def cmd_gerardds(full=False):
+    if not load_chromabuddy():
         print(red_bold("[ERRO] ChromaBuddy não disponível"))
-        return
+        return False
     
     try:
         # Carregar configuração
@@ -357,7 +403,7 @@ def cmd_gerardds():
         if not api_key:
             print(red_bold("[ERRO] API key não configurada"))
             print(yellow("Configure em ChromaBuddy/config.json"))
-            return
+            return False
         
         # Obter diretório de trabalho atual
         project_root = os.getcwd()
@@ -368,37 +414,213 @@ def cmd_gerardds():
         print(yellow("Analisando arquivos... (isso pode levar alguns segundos)\n"))
         
         # Importar e executar cltdds
-        from ChromaBuddy.locate.dds import cltdds
-        import json
+        from locate.dds import cltdds
+        from locate.indice import abrir_indice
         
-        # Gerar estrutura
-        estrutura = cltdds(project_root, api_key)
+        # Gerar e salvar estrutura (cada arquivo descrito vai para estrutura_projeto.jsonl na hora;
+        # interrompido, o proximo gerardds continua de onde parou)
+        estrutura = cltdds(project_root, api_key, incremental=not full)
         
-        # Salvar estrutura
-        with open(estrutura_path, 'w', encoding='utf-8') as f:
-            json.dump(estrutura, f, indent=2, ensure_ascii=False)
-        
-        # Estatísticas
-        num_arquivos = len(estrutura.get('estrutura', []))
-        num_python = sum(1 for item in estrutura.get('estrutura', []) if item.get('arquivo', '').endswith('.py'))
+        # Estatísticas (consultas no indice estrutura_projeto.db)
+        por_tipo = abrir_indice(project_root, criar=True).contar_por_tipo()
+        num_arquivos = sum(por_tipo.values())
+        num_python = por_tipo.get('arquivo_python', 0)
         num_outros = num_arquivos - num_python
+        varredura = estrutura.get('varredura', {})
         
         print(green_bold("✓ Estrutura gerada com sucesso!\n"))
         print(f"  Arquivo: {estrutura_path}")
+        print(f"  Índice: {os.path.join(project_root, 'estrutura_projeto.db')}")
         print(f"  Total de arquivos analisados: {num_arquivos}")
         print(f"    - Arquivos Python: {num_python}")
         print(f"    - Outros arquivos: {num_outros}")
+        print(f"  Descritos agora: {varredura.get('descritos', 0)} "
+              f"(sem mudanças desde a última vez: {varredura.get('reaproveitados', 0)})")
+        if varredura.get('adiados'):
+            print(yellow(f"  Adiados pelo limite de chamadas (scan_call_budget): {varredura['adiados']} "
+                         f"(rode 'gerardds' de novo para continuar)"))
         print()
         print(green_bold("Agora você pode usar o comando 'buddy' com @mentions otimizados!"))
         print()
+        return True
         
+    except KeyboardInterrupt:
+        print(yellow("\n[AVISO] Interrompido: o que já foi descrito está em estrutura_projeto.jsonl; "
+                     "rode 'gerardds' de novo para continuar"))
+        return False
     except Exception as e:
         print(red_bold(f"[ERRO] Falha ao gerar estrutura: {e}"))
         import traceback
         print(yellow(traceback.format_exc()))
+        return False
+
+# pasta dos perfis cProfile quando iniciado com --profile/--profile-dir (None = desligado)
+PROFILE_DIR = None
+
+# parser único: usado pela linha de comando, pelo prompt interativo e por scripts (-f)
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="chromagit",
+        description="ChromaGit - versionamento local. Sem comando abre o prompt interativo.",
+    )
+    parser.add_argument("-f", "--file", metavar="SCRIPT",
+                        help="executar os comandos do arquivo (um por linha; '-' lê da entrada padrão) e sair")
+    parser.add_argument("--profile", action="store_true",
+                        help="medir todos os comandos e gravar perfis cProfile (.prof e .collapsed)")
+    parser.add_argument("--profile-dir", metavar="PASTA",
+                        help="pasta dos perfis (implica --profile; padrão: .chromagit_profiles)")
+    sub = parser.add_subparsers(dest="command", metavar="<comando>")
+
+    p = sub.add_parser("cd", help="mudar de diretório")
+    p.add_argument("path", nargs="?")
+    p.set_defaults(handler=lambda ns: cmd_cd(ns.path))
+
+    p = sub.add_parser("pwd", help="mostrar diretório atual")
+    p.set_defaults(handler=lambda ns: cmd_pwd())
+
+    p = sub.add_parser("help", help="listar comandos")
+    p.set_defaults(handler=lambda ns: cmd_help())
+
+    p = sub.add_parser("time", help="executar um comando medindo tempo, CPU e E/S")
+    p.add_argument("argv", nargs=argparse.REMAINDER, metavar="<comando> [args]")
+    p.set_defaults(handler=lambda ns: cmd_time(parser, ns.argv))
+
+    p = sub.add_parser("init", help="inicializar repositório ChromaGit")
+    p.add_argument("path", nargs="?")
+    p.set_defaults(handler=lambda ns: cmd_init(ns.path))
+
+    p = sub.add_parser("new", help="criar novo repositório em Documents/ChromaGithub")
+    p.add_argument("name", nargs="?", help="nome do repositório (sem ele, tudo é perguntado)")
+    p.add_argument("--gitignore", choices=["python", "java", "javascript", "cpp", "generic"],
+                   help="adicionar .gitignore do tipo informado")
+    p.add_argument("--readme", action="store_true", help="adicionar README.md")
+    p.set_defaults(handler=_handle_new)
 
-def main():
-    # loop principal
+    p = sub.add_parser("hub", help="explorar repositórios em Documents/ChromaGithub")
+    p.add_argument("repo", nargs="?")
+    action = p.add_mutually_exclusive_group()
+    action.add_argument("--list", dest="action", action="store_const", const="list",
+                        help="listar repositórios")
+    action.add_argument("--info", dest="action", action="store_const", const="info",
+                        help="mostrar informações do repositório")
+    action.add_argument("--view", dest="action", action="store_const", const="view",
+                        help="mostrar a árvore do repositório")
+    action.add_argument("--scan", dest="action", action="store_const", const="scan",
+                        help="escanear conteúdo do repositório")
+    p.set_defaults(handler=lambda ns: cmd_hub(ns.repo, ns.action))
+
+    p = sub.add_parser("duple", help="copiar repositório do ChromaGithub para workspace")
+    p.add_argument("repo", nargs="*")
+    p.add_argument("-y", "--yes", action="store_true", help="não pedir confirmação")
+    p.set_defaults(handler=lambda ns: cmd_duple(" ".join(ns.repo) or None, ns.yes))
+
+    p = sub.add_parser("commit", aliases=["camprint"], help="copiar para área invisível e registrar log")
+    p.add_argument("words", nargs="*", help="mensagem do commit")
+    p.add_argument("-m", "--message", nargs="+", help="mensagem do commit")
+    p.set_defaults(handler=lambda ns: cmd_commit(" ".join((ns.message or []) + ns.words) or None))
+
+    p = sub.add_parser("save", help="salvar em Documents/ChromaGithub/<repo>")
+    p.set_defaults(handler=lambda ns: cmd_save())
+
+    p = sub.add_parser("buddy", help="iniciar ChromaBuddy (assistente interativo)")
+    p.set_defaults(handler=lambda ns: cmd_buddy())
+
+    p = sub.add_parser("ask", help="fazer pergunta rápida ao assistente")
+    p.add_argument("question", nargs=argparse.REMAINDER)
+    p.set_defaults(handler=lambda ns: cmd_ask(" ".join(ns.question)))
+
+    p = sub.add_parser("analyze", help="analisar arquivo com IA")
+    p.add_argument("file", nargs=argparse.REMAINDER)
+    p.set_defaults(handler=lambda ns: cmd_analyze(" ".join(ns.file)))
+
+    p = sub.add_parser("gerardds", help="gerar estrutura_projeto.json para o workspace atual")
+    p.add_argument("--full", action="store_true", help="descrever todos os arquivos de novo")
+    p.set_defaults(handler=lambda ns: cmd_gerardds(ns.full))
+
+    parser.command_names = set(sub.choices)
+    return parser
+
+def _handle_new(ns):
+    # com nome informado o comando não pergunta nada
+    if not ns.name:
+        return cmd_new()
+    initial_files = []
+    if ns.gitignore:
+        initial_files.append(('.gitignore', ns.gitignore))
+    if ns.readme:
+        initial_files.append('README.md')
+    return cmd_new(ns.name, initial_files)
+
+# separar uma linha em argumentos (respeitando aspas)
+def split_line(line):
+    try:
+        return shlex.split(line, posix=(os.name != "nt"))
+    except ValueError:
+        return line.split()
+
+# executar um comando já interpretado (medido quando iniciado com --profile)
+def execute(ns):
+    if PROFILE_DIR and ns.command != "time":
+        from cli.profiling import CommandTimer
+        with CommandTimer(ns.command, profile_dir=PROFILE_DIR):
+            return ns.handler(ns) is not False
+    return ns.handler(ns) is not False
+
+# executar um comando já separado em argumentos; retorna False em caso de falha
+def run_command(parser, argv):
+    try:
+        ns = parser.parse_args(argv)
+    except SystemExit as e:
+        # argparse sai após erro de uso ou após -h
+        return e.code == 0
+
+    if ns.command is None:
+        print(yellow("[INFO]") + " nenhum comando informado. Use 'help'.")
+        return False
+
+    return execute(ns)
+
+# comando: time <comando> (tempo de parede, CPU, stat/open e bytes lidos/escritos)
+def cmd_time(parser, argv):
+    if not argv:
+        print(red_bold("[ERRO] Uso: time <comando> [args]"))
+        return False
+    try:
+        ns = parser.parse_args(argv)
+    except SystemExit as e:
+        return e.code == 0
+
+    from cli.profiling import CommandTimer
+    with CommandTimer(ns.command, profile_dir=PROFILE_DIR):
+        return ns.handler(ns) is not False
+
+# executar um arquivo de comandos no mesmo processo
+def run_script(parser, path):
+    try:
+        if path == "-":
+            lines = sys.stdin.read().splitlines()
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+    except OSError as e:
+        print(red_bold(f"[ERRO] Não foi possível ler o script: {e}"))
+        return False
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line in ("exit", "quit"):
+            break
+
+        print(yellow("chromagit >") + f" {line}")
+        if not run_command(parser, split_line(line)):
+            print(red_bold(f"[ERRO] {path}:{number}: falha em '{line}'"))
+            return False
+    return True
+
+# loop principal (prompt interativo)
+def repl(parser):
     while True:
         try:
             line = input(prompt()).strip()
@@ -409,41 +631,31 @@ def main():
         if not line:
             continue
 
-        parts = line.split()
-        cmd, args = parts[0], parts[1:]
-
-        if cmd in ("exit", "quit"):
+        if line in ("exit", "quit"):
             break
-        elif cmd == "cd":
-            cmd_cd(args)
-        elif cmd == "pwd":
-            cmd_pwd()
-        elif cmd == "help":
-            cmd_help()
-        elif cmd == "init":
-            cmd_init(args)
-        elif cmd in ("commit", "camprint"):
-            cmd_commit(args)
-        elif cmd == "save":
-            cmd_save()
-        elif cmd == "new":
-            cmd_new()
-        elif cmd == "hub":
-            cmd_hub()
-        elif cmd == "duple":
-            cmd_duple(args)
-        elif cmd == "buddy":
-            cmd_buddy()
-        elif cmd == "ask":
-            cmd_ask(args)
-        elif cmd == "analyze":
-            cmd_analyze(args)
-        elif cmd == "gerardds":
-            cmd_gerardds()
-        else:
-            print(yellow("[INFO]") + f" comando desconhecido: {cmd}. Use 'help'.")
 
-if __name__ == "__main__":
-    main()
+        argv = split_line(line)
+        if argv and argv[0] not in parser.command_names:
+            print(yellow("[INFO]") + f" comando desconhecido: {argv[0]}. Use 'help'.")
+            continue
+
+        run_command(parser, argv)
 
+def main(argv=None):
+    global PROFILE_DIR
+    parser = build_parser()
+    ns = parser.parse_args(argv)
+    if ns.profile or ns.profile_dir:
+        PROFILE_DIR = ns.profile_dir or ".chromagit_profiles"
 
+    if ns.file:
+        return 0 if run_script(parser, ns.file) else 1
+
+    if ns.command:
+        return 0 if execute(ns) else 1
+
+    repl(parser)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# utils/transfer: copy_tree/measure_tree devem copiar como o shutil.copytree(symlinks=False)
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.transfer import copy_tree, measure_tree
+
+
+def _files(root):
+    return sorted(os.path.relpath(os.path.join(r, f), root) for r, _, fs in os.walk(root) for f in fs)
+
+
+@unittest.skipUnless(hasattr(os, 'symlink'), "sem symlink nesta plataforma")
+class SymlinkTreeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.src = os.path.join(self.tmp, 'src')
+        os.makedirs(os.path.join(self.src, 'a'))
+        with open(os.path.join(self.src, 'a', 'f.txt'), 'w') as f:
+            f.write('x')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_diamond_copies_every_path(self):
+        # b -> a e c -> a: a mesma pasta por tres caminhos, sem ciclo
+        os.symlink('a', os.path.join(self.src, 'b'))
+        os.symlink('a', os.path.join(self.src, 'c'))
+        expected = os.path.join(self.tmp, 'expected')
+        shutil.copytree(self.src, expected, symlinks=False)
+
+        dst = os.path.join(self.tmp, 'dst')
+        copy_tree(self.src, dst)
+        self.assertEqual(_files(dst), _files(expected))
+        self.assertEqual(_files(dst), ['a/f.txt', 'b/f.txt', 'c/f.txt'])
+        self.assertEqual(measure_tree(self.src), (3, 3))
+
+    def test_cycle_is_not_followed(self):
+        # a/volta -> .. : link para um ancestral
+        os.symlink('..', os.path.join(self.src, 'a', 'volta'))
+        dst = os.path.join(self.tmp, 'dst')
+        copy_tree(self.src, dst)
+        self.assertIn('a/f.txt', _files(dst))
+        self.assertEqual(measure_tree(self.src)[0], len(_files(dst)))
+
+
+if __name__ == '__main__':
+    unittest.main()
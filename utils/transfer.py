@@ -0,0 +1,151 @@
+# funcoes de copia com progresso por arquivo e por byte
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+# numero padrao de threads de copia (copia de arquivos pequenos e limitada por I/O)
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+# arquivos a partir deste tamanho sao copiados em blocos (no kernel), reportando bytes a cada bloco
+LARGE_FILE = 64 * 1024 * 1024
+CHUNK_SIZE = 8 * 1024 * 1024
+
+def _walk(path: str, skip: Optional[Callable[[str, str], bool]] = None):
+    # os.walk seguindo links para pastas, como o shutil.copytree(symlinks=False) copia o conteudo
+    # delas (uma pasta ligada por varios caminhos aparece em todos); so nao entra em uma pasta
+    # que ja esta na cadeia de ancestrais (link que aponta para um ancestral: ciclo)
+    ancestors = {}
+    for root, dirs, files in os.walk(path, followlinks=True):
+        chain = ancestors.pop(root, frozenset())
+        try:
+            st = os.stat(root)
+        except OSError:
+            dirs[:] = []
+            continue
+        key = (st.st_dev, st.st_ino)
+        if key in chain:
+            dirs[:] = []
+            continue
+        if skip:
+            dirs[:] = [d for d in dirs if not skip(d, os.path.join(root, d))]
+            files = [f for f in files if not skip(f, os.path.join(root, f))]
+        chain = chain | {key}
+        for d in dirs:
+            ancestors[os.path.join(root, d)] = chain
+        yield root, dirs, files
+
+def measure_tree(path: str, skip: Optional[Callable[[str, str], bool]] = None) -> Tuple[int, int]:
+    # conta arquivos e bytes de um arquivo ou pasta (skip(nome, caminho) ignora entradas);
+    # percorre a pasta com a mesma regra do copy_tree, para o total bater com o copiado
+    if not os.path.isdir(path):
+        try:
+            return 1, os.path.getsize(path)
+        except OSError:
+            return 0, 0
+
+    files = 0
+    total_bytes = 0
+    for root, _, names in _walk(path, skip):
+        for name in names:
+            try:
+                total_bytes += os.path.getsize(os.path.join(root, name))
+                files += 1
+            except OSError:
+                continue
+    return files, total_bytes
+
+def measure_items(base: str, items: List[str]) -> Tuple[int, int]:
+    # soma arquivos e bytes de varios itens de uma pasta
+    files = 0
+    total_bytes = 0
+    for item in items:
+        f, b = measure_tree(os.path.join(base, item))
+        files += f
+        total_bytes += b
+    return files, total_bytes
+
+def copy_file(src: str, dst: str, progress=None) -> int:
+    # copia um arquivo (com metadados) e reporta 1 arquivo + bytes ao progresso
+    name = os.path.basename(src)
+    size = os.path.getsize(src)
+    if progress is None or size < LARGE_FILE:
+        shutil.copy2(src, dst)
+        if progress is not None:
+            progress.update(1, custom_message=name, nbytes=size)
+        return size
+
+    # arquivos grandes: a copia continua no kernel, em blocos, para o progresso andar durante a copia
+    copied = 0
+
+    def on_chunk(nbytes):
+        nonlocal copied
+        copied += nbytes
+        progress.add_bytes(nbytes, custom_message=name)
+
+    if not _kernel_copy(src, dst, on_chunk):
+        # sistema sem copia arquivo -> arquivo no kernel: o shutil escolhe o melhor caminho
+        shutil.copyfile(src, dst)
+        on_chunk(size)
+    shutil.copystat(src, dst)
+    progress.update(1, custom_message=name)
+    return copied
+
+def _kernel_copy(src: str, dst: str, on_chunk: Callable[[int], None]) -> bool:
+    # copia com copy_file_range ou sendfile em blocos de CHUNK_SIZE (sem passar os dados pelo Python);
+    # False quando nenhum dos dois funciona para estes arquivos (nada foi copiado)
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        for method in ("copy_file_range", "sendfile"):
+            func = getattr(os, method, None)
+            if func is None:
+                continue
+            offset = 0
+            try:
+                while True:
+                    if method == "copy_file_range":
+                        sent = func(infd, outfd, CHUNK_SIZE)
+                    else:
+                        sent = func(outfd, infd, offset, CHUNK_SIZE)
+                    if not sent:
+                        return True
+                    offset += sent
+                    on_chunk(sent)
+            except OSError:
+                # ex.: sistemas de arquivos diferentes ou sendfile so para sockets
+                if offset:
+                    raise
+    return False
+
+def copy_tree(src: str, dst: str, progress=None, workers: Optional[int] = None) -> int:
+    # copia uma pasta arquivo a arquivo em varias threads, reportando cada arquivo ao progresso;
+    # equivale a shutil.copytree(src, dst, dirs_exist_ok=True)
+    workers = workers or DEFAULT_WORKERS
+    jobs = []
+    folders = []
+    for root, dirs, files in _walk(src):
+        rel_root = os.path.relpath(root, src)
+        target_root = dst if rel_root == '.' else os.path.join(dst, rel_root)
+        os.makedirs(target_root, exist_ok=True)
+        folders.append((root, target_root))
+        for name in files:
+            jobs.append((os.path.join(root, name), os.path.join(target_root, name)))
+
+    if workers <= 1 or len(jobs) < 2:
+        total = sum(copy_file(s, d, progress) for s, d in jobs)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            total = sum(pool.map(lambda job: copy_file(job[0], job[1], progress), jobs))
+
+    # preserva metadados das pastas como o copytree (depois dos arquivos, que alteram o mtime)
+    for root, target_root in folders:
+        try:
+            shutil.copystat(root, target_root)
+        except OSError:
+            pass
+    return total
+
+def copy_item(src: str, dst: str, progress=None, workers: Optional[int] = None) -> int:
+    # copia arquivo ou pasta; retorna o total de bytes copiados
+    if os.path.isdir(src):
+        return copy_tree(src, dst, progress, workers)
+    return copy_file(src, dst, progress)